@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CadProcessingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cad_processing'
 
+    def ready(self):
+        if getattr(settings, 'CAD_CONVERTER_PROBE_ON_STARTUP', True):
+            from .converters import get_converter_registry
+            get_converter_registry().start_probes()
@@ -0,0 +1,199 @@
+"""
+Content-addressed cache for CAD conversion results.
+
+Entries are keyed by the SHA-256 of the original file bytes combined with the
+pipeline parameters, so re-uploading the same vendor model skips the
+STEP/STL/OBJ -> GLB pipeline entirely. Each entry stores the converted GLB
+levels of detail and the extracted geometry_data. The cache lives on local
+disk and is bounded in size with least-recently-used eviction.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+ENTRY_META_NAME = 'meta.json'
+
+
+def file_sha256(file_path):
+    """Return the hex SHA-256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_cache_key(content_sha256, parameters):
+    """
+    Build a cache key from the content hash and the pipeline parameters.
+
+    Args:
+        content_sha256: SHA-256 hex digest of the original file bytes
+        parameters: JSON-serializable dict of pipeline parameters
+
+    Returns:
+        Hex digest identifying the conversion result
+    """
+    payload = json.dumps({'sha256': content_sha256, 'parameters': parameters}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ConversionCache:
+    """
+    Disk-backed conversion cache with size-bounded LRU eviction.
+
+    Layout: <root>/<key[:2]>/<key>/{lod0.glb, lod1.glb, ..., meta.json}. An
+    entry is only visible once meta.json exists; entries are assembled in a
+    staging directory and moved into place atomically, so concurrent writers
+    never expose half-written files. The mtime of meta.json is bumped on every hit and is
+    used as the recency for eviction.
+    """
+
+    def __init__(self, root, max_size):
+        self.root = Path(root)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+
+    def get(self, key):
+        """
+        Look up a conversion result.
+
+        Returns:
+            dict with geometry_data and lods (paths point into the cache),
+            or None on a miss
+        """
+        entry_dir = self._entry_dir(key)
+        meta_path = entry_dir / ENTRY_META_NAME
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            lods = []
+            for lod in meta['lods']:
+                lod = dict(lod)
+                lod['path'] = entry_dir / lod.pop('file')
+                lods.append(lod)
+            if not lods or not all(lod['path'].exists() for lod in lods):
+                return None
+            # Mark as recently used
+            os.utime(meta_path, None)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable conversion cache entry {key}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        logger.info(f"Conversion cache hit: {key}")
+        return {
+            'geometry_data': meta.get('geometry_data'),
+            'lods': lods,
+        }
+
+    def put(self, key, geometry_data, lods):
+        """
+        Store a conversion result. Existing entries for the key are kept.
+
+        Args:
+            key: cache key from build_cache_key
+            geometry_data: geometry dict extracted by the pipeline
+            lods: list of LOD dicts (level, face_count, geometric_error, path)
+        """
+        entry_dir = self._entry_dir(key)
+        if (entry_dir / ENTRY_META_NAME).exists():
+            return
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(prefix='.staging-', dir=self.root))
+        try:
+            stored_lods = []
+            for lod in lods:
+                file_name = f"lod{lod['level']}.glb"
+                shutil.copyfile(lod['path'], staging_dir / file_name)
+                stored_lods.append({
+                    'level': lod['level'],
+                    'face_count': lod['face_count'],
+                    'geometric_error': lod['geometric_error'],
+                    'size': lod['size'],
+                    'file': file_name,
+                })
+            meta = {
+                'geometry_data': geometry_data,
+                'lods': stored_lods,
+                'size': sum(lod['size'] for lod in stored_lods),
+                'created_at': time.time(),
+            }
+            with open(staging_dir / ENTRY_META_NAME, 'w') as f:
+                json.dump(meta, f)
+
+            entry_dir.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(staging_dir, entry_dir)
+            except OSError:
+                # Another worker stored the same key first
+                return
+            logger.info(f"Stored conversion result in cache: {key} ({meta['size'] / 1024:.2f} KB)")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        self._evict()
+
+    def _iter_entries(self):
+        """Yield (mtime, size, entry_dir) for every complete entry"""
+        if not self.root.exists():
+            return
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or shard.name.startswith('.'):
+                continue
+            for entry_dir in shard.iterdir():
+                meta_path = entry_dir / ENTRY_META_NAME
+                try:
+                    mtime = meta_path.stat().st_mtime
+                    size = sum(p.stat().st_size for p in entry_dir.iterdir())
+                except OSError:
+                    continue
+                yield mtime, size, entry_dir
+
+    def _evict(self):
+        """Remove least-recently-used entries until the cache fits in max_size"""
+        with self._lock:
+            entries = sorted(self._iter_entries(), key=lambda entry: entry[0])
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, entry_dir in entries:
+                if total_size <= self.max_size:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total_size -= size
+                logger.info(f"Evicted conversion cache entry: {entry_dir.name}")
+
+    def clear(self):
+        """Remove every cache entry"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+_conversion_cache = None
+
+
+def get_conversion_cache():
+    """Return the configured conversion cache, or None when caching is disabled"""
+    global _conversion_cache
+    if not getattr(settings, 'CAD_CONVERSION_CACHE_ENABLED', True):
+        return None
+    if _conversion_cache is None:
+        _conversion_cache = ConversionCache(
+            getattr(settings, 'CAD_CONVERSION_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'conversions'),
+            getattr(settings, 'CAD_CONVERSION_CACHE_MAX_SIZE', 2 * 1024 * 1024 * 1024),
+        )
+    return _conversion_cache
@@ -0,0 +1,364 @@
+"""
+Registry of STEP -> STL/OBJ converter backends.
+
+Backends are tried in a configured order (CAD_STEP_CONVERTERS) until one
+succeeds. For each backend the registry keeps:
+
+- a cached availability probe: probes run in a background thread, started
+  when the app loads (CAD_CONVERTER_PROBE_ON_STARTUP) or on first use;
+  results are reused for CAD_CONVERTER_PROBE_TTL seconds and a stale result
+  is refreshed in the background while callers keep getting the previous
+  answer. Until the first probe has finished the backend counts as available,
+  so requests never wait on a health check; conversions, which run in
+  workers, do wait for it;
+- a circuit breaker: after CAD_CONVERTER_FAILURE_THRESHOLD consecutive
+  backend faults (timeouts, connection errors, a missing executable) the
+  backend is skipped for CAD_CONVERTER_COOLDOWN seconds, then a single
+  trial conversion decides whether it is closed again;
+- the moving average of its successful conversion times.
+
+Failures caused by the file itself (the backend answered, but could not
+convert it) fall through to the next backend without tripping the breaker.
+
+State is kept per process.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from . import utils
+from .occ_tessellation import PYTHONOCC_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONVERTER_ORDER = ('pythonocc', 'freecad_service', 'freecad_local', 'freecad_docker', 'cloudconvert')
+
+# Weight of the newest sample in the conversion time moving average
+LATENCY_SMOOTHING = 0.3
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_backend_fault(error):
+    """
+    Whether a conversion error means the backend itself is unhealthy.
+
+    The convert_step_via_* functions re-raise everything as ValueError, so
+    the exceptions they were raised from are inspected as well.
+    """
+    while error is not None:
+        if isinstance(error, (requests.RequestException, subprocess.TimeoutExpired, OSError, TimeoutError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class ConverterBackend:
+    """
+    One way of converting STEP files, with its probe and health state.
+
+    Args:
+        name: identifier used in CAD_STEP_CONVERTERS and logs
+        convert: callable(step_file_path, output_format, triangle_budget, output_dir) -> output path
+        probe: callable() -> bool, True when the backend can be used
+        formats: output formats the backend can produce
+    """
+
+    def __init__(self, name, convert, probe, formats=('stl', 'obj')):
+        self.name = name
+        self._convert = convert
+        self._probe = probe
+        self.formats = formats
+        self.available = None  # Result of the last probe, None until probed
+        self.probed_at = None
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.latency = None  # Moving average of successful conversion times (seconds)
+        self.conversions = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._probed = threading.Event()
+
+    def _run_probe(self):
+        try:
+            available = bool(self._probe())
+        except Exception as e:
+            logger.debug(f"Converter '{self.name}' probe failed: {e}")
+            available = False
+        with self._lock:
+            if available != self.available:
+                logger.info(f"Converter '{self.name}' is {'available' if available else 'unavailable'}")
+            self.available = available
+            self.probed_at = time.monotonic()
+            self._refreshing = False
+        self._probed.set()
+        return available
+
+    def _start_probe(self):
+        # Called with the lock held
+        if not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._run_probe, daemon=True).start()
+
+    def start_probe(self):
+        """Probe in the background unless a probe result exists or one is running"""
+        with self._lock:
+            if self.available is None:
+                self._start_probe()
+
+    def is_available(self, probe_ttl, wait=False):
+        """
+        Cached probe result; refreshed in the background once older than probe_ttl.
+
+        Args:
+            probe_ttl: seconds a probe result is reused
+            wait: wait for the first probe instead of answering optimistically
+
+        Returns:
+            The last probe result, or True while the first probe is still running
+            (unless wait is set)
+        """
+        with self._lock:
+            if self.available is None:
+                self._start_probe()
+            else:
+                if time.monotonic() - self.probed_at >= probe_ttl:
+                    self._start_probe()
+                return self.available
+        if not wait:
+            return True
+        self._probed.wait()
+        return self.available
+
+    def is_tripped(self, cooldown):
+        """Whether the breaker is open and still cooling down"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < cooldown
+
+    def allows_request(self, cooldown):
+        """Circuit breaker check; moves an open breaker to half-open after the cooldown"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= cooldown:
+                logger.info(f"Converter '{self.name}' cooldown over, allowing a trial conversion")
+                self.state = HALF_OPEN
+                return True
+            # Half-open: one trial conversion at a time
+            return False
+
+    def record_success(self, seconds):
+        with self._lock:
+            self.conversions += 1
+            self.consecutive_failures = 0
+            self.latency = seconds if self.latency is None else (
+                LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+            if self.state != CLOSED:
+                logger.info(f"Converter '{self.name}' recovered, closing its circuit breaker")
+            self.state = CLOSED
+            # A working backend is available whatever the last probe said
+            self.available = True
+            self.probed_at = time.monotonic()
+
+    def record_failure(self, backend_fault, failure_threshold):
+        with self._lock:
+            self.failures += 1
+            if not backend_fault:
+                if self.state == HALF_OPEN:
+                    # The backend answered, so it is up again
+                    self.state = CLOSED
+                return
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= failure_threshold:
+                logger.warning(
+                    f"Converter '{self.name}' failed {self.consecutive_failures} times in a row, "
+                    f"opening its circuit breaker"
+                )
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def convert(self, step_file_path, output_format, triangle_budget=None, output_dir=None):
+        return self._convert(step_file_path, output_format, triangle_budget, output_dir)
+
+    def status(self):
+        """Diagnostic snapshot of the backend"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'available': self.available,
+                'circuit': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'conversions': self.conversions,
+                'failures': self.failures,
+                'latency': self.latency,
+            }
+
+
+class ConverterRegistry:
+    """Ordered converter backends with cached probes, circuit breakers and fallback"""
+
+    def __init__(self, backends, probe_ttl=60, failure_threshold=3, cooldown=300):
+        self.backends = list(backends)
+        self.probe_ttl = probe_ttl
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+    def is_available(self, output_format='stl'):
+        """
+        Whether any backend can convert to the format.
+
+        Backends are checked in order and the first available one answers.
+        Never waits on a probe: backends still being probed count as available.
+        """
+        for backend in self.backends:
+            if output_format not in backend.formats or backend.is_tripped(self.cooldown):
+                continue
+            if backend.is_available(self.probe_ttl):
+                return True
+        return False
+
+    def convert(self, step_file_path, output_format='stl', triangle_budget=None, output_dir=None):
+        """
+        Convert with the first backend that succeeds.
+
+        Returns:
+            Path to the converted file (temporary location)
+
+        Raises:
+            ValueError: when no backend is usable or all of them failed
+        """
+        if not os.path.exists(step_file_path):
+            raise FileNotFoundError(f"STEP file not found: {step_file_path}")
+        errors = []
+        for backend in self.backends:
+            if output_format not in backend.formats or not backend.is_available(self.probe_ttl, wait=True):
+                continue
+            if not backend.allows_request(self.cooldown):
+                logger.info(f"Skipping converter '{backend.name}': circuit breaker open")
+                continue
+            start = time.monotonic()
+            try:
+                output_path = backend.convert(step_file_path, output_format, triangle_budget, output_dir)
+            except Exception as e:
+                backend.record_failure(is_backend_fault(e), self.failure_threshold)
+                logger.warning(f"Converter '{backend.name}' failed, trying the next one: {e}")
+                errors.append(f"{backend.name}: {e}")
+                continue
+            elapsed = time.monotonic() - start
+            backend.record_success(elapsed)
+            logger.info(f"Converted {step_file_path} with '{backend.name}' in {elapsed:.1f}s")
+            return output_path
+
+        if errors:
+            raise ValueError("All STEP converters failed:\n" + "\n".join(errors))
+        raise ValueError(
+            "No STEP converter available. Set FREECAD_DOCKER_URL to a FreeCAD conversion service, "
+            "install FreeCAD or pythonocc-core, or set CLOUDCONVERT_API_KEY for CloudConvert."
+        )
+
+    def start_probes(self):
+        """Start the first probe of every backend in the background"""
+        for backend in self.backends:
+            backend.start_probe()
+
+    def status(self):
+        return [backend.status() for backend in self.backends]
+
+
+def _probe_freecad_service():
+    service_url = (getattr(settings, 'FREECAD_DOCKER_URL', None) or '').rstrip('/')
+    if not service_url:
+        return False
+    # Not through the retrying session: one attempt, bounded by the timeout
+    response = requests.get(f"{service_url}/health", timeout=2)
+    return response.status_code == 200
+
+
+def _probe_freecad_local():
+    script_path = utils.freecad_converter_script()
+    if script_path is None:
+        return False
+    # The script exits with an error before parsing arguments when FreeCAD cannot be imported
+    result = subprocess.run(
+        ['python', str(script_path), '--help'],
+        capture_output=True,
+        timeout=30,
+    )
+    return result.returncode == 0
+
+
+def _probe_freecad_docker():
+    if shutil.which('docker') is None:
+        return False
+    image = getattr(settings, 'FREECAD_DOCKER_IMAGE', 'freecad-converter:latest')
+    result = subprocess.run(['docker', 'image', 'inspect', image], capture_output=True, timeout=5)
+    return result.returncode == 0
+
+
+def build_default_backends():
+    """All known backends, keyed by name"""
+    backends = [
+        ConverterBackend(
+            'pythonocc',
+            utils.convert_step_via_pythonocc,
+            lambda: PYTHONOCC_AVAILABLE,
+            formats=('stl',),
+        ),
+        ConverterBackend(
+            'freecad_service',
+            lambda step_file_path, output_format, triangle_budget, output_dir: utils.convert_step_via_freecad_service(
+                step_file_path, output_format, triangle_budget=triangle_budget, output_dir=output_dir
+            ),
+            _probe_freecad_service,
+        ),
+        ConverterBackend('freecad_local', utils.convert_step_via_freecad_local, _probe_freecad_local),
+        ConverterBackend('freecad_docker', utils.convert_step_via_freecad_docker, _probe_freecad_docker),
+        ConverterBackend(
+            'cloudconvert',
+            lambda step_file_path, output_format, triangle_budget, output_dir: utils.convert_step_via_cloudconvert(
+                step_file_path, output_format, output_dir
+            ),
+            lambda: bool(getattr(settings, 'CLOUDCONVERT_API_KEY', None)),
+        ),
+    ]
+    return {backend.name: backend for backend in backends}
+
+
+_registry = None
+_registry_pid = None
+
+
+def get_converter_registry():
+    """
+    Return the converter registry of this process.
+
+    Created lazily, and again after a fork, so probe threads and breaker
+    state are never shared between processes.
+    """
+    global _registry, _registry_pid
+    if _registry is None or _registry_pid != os.getpid():
+        available = build_default_backends()
+        order = getattr(settings, 'CAD_STEP_CONVERTERS', DEFAULT_CONVERTER_ORDER)
+        unknown = [name for name in order if name not in available]
+        if unknown:
+            logger.warning(f"Ignoring unknown STEP converters in CAD_STEP_CONVERTERS: {', '.join(unknown)}")
+        _registry = ConverterRegistry(
+            [available[name] for name in order if name in available],
+            probe_ttl=getattr(settings, 'CAD_CONVERTER_PROBE_TTL', 60),
+            failure_threshold=getattr(settings, 'CAD_CONVERTER_FAILURE_THRESHOLD', 3),
+            cooldown=getattr(settings, 'CAD_CONVERTER_COOLDOWN', 300),
+        )
+        _registry_pid = os.getpid()
+    return _registry
@@ -0,0 +1,308 @@
+"""
+Process-pool executor for CAD conversion jobs.
+
+Conversions run in a bounded pool of spawned worker processes instead of the
+web request. Each job gets a wall-clock limit (SIGALRM), a CPU-time backstop
+(RLIMIT_CPU, enforced by the kernel even inside native OCC/trimesh code) and
+an address-space limit (RLIMIT_AS). Worker processes are replaced after a
+fixed number of jobs so memory leaked by native libraries does not accumulate.
+
+Job state is kept in memory in the submitting process; the durable status of
+a conversion is whatever the job function writes to the database.
+"""
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; jobs run without memory/CPU limits
+    resource = None
+
+# Extra CPU seconds allowed past the wall-clock limit before the kernel kills the worker
+CPU_LIMIT_GRACE = 30
+
+# Jobs are resubmitted this many times when their worker process dies
+# (another job in the same pool may have been the one that crashed it)
+MAX_CRASH_RETRIES = 1
+
+# Finished jobs remembered for status lookups
+JOB_HISTORY_SIZE = 1000
+
+
+class ExecutorBusy(Exception):
+    """Raised when the executor queue is full"""
+
+
+class ConversionTimeout(Exception):
+    """Raised inside a worker when a job exceeds its wall-clock limit"""
+
+
+def _import_function(path):
+    module_name, function_name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _init_worker():
+    """Worker process initializer: set up Django so jobs can use the ORM"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cadbuilder.settings')
+    import django
+    django.setup()
+
+
+def _on_alarm(signum, frame):
+    raise ConversionTimeout("Conversion exceeded its time limit")
+
+
+def _apply_limits(time_limit, memory_limit):
+    """Set the per-job limits; returns the previous soft limits for _restore_limits"""
+    if time_limit:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(int(time_limit))
+    previous = {}
+    if resource is None:
+        return previous
+    if time_limit:
+        # RLIMIT_CPU counts the whole life of the process, so extend it from the current usage
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_limit = int(usage.ru_utime + usage.ru_stime + time_limit + CPU_LIMIT_GRACE)
+        previous[resource.RLIMIT_CPU] = _set_soft_limit(resource.RLIMIT_CPU, cpu_limit)
+    if memory_limit:
+        previous[resource.RLIMIT_AS] = _set_soft_limit(resource.RLIMIT_AS, memory_limit)
+    return previous
+
+
+def _set_soft_limit(limit, value):
+    soft, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, hard))
+    return soft
+
+
+def _restore_limits(previous):
+    signal.alarm(0)
+    for limit, soft in previous.items():
+        _, hard = resource.getrlimit(limit)
+        resource.setrlimit(limit, (soft, hard))
+
+
+def _run_job(function_path, args, time_limit, memory_limit):
+    """Run one job inside a worker process under its limits"""
+    previous_limits = _apply_limits(time_limit, memory_limit)
+    try:
+        return _import_function(function_path)(*args)
+    finally:
+        _restore_limits(previous_limits)
+        connections.close_all()
+
+
+class ConversionExecutor:
+    """
+    Bounded pool of conversion worker processes.
+
+    Jobs are identified by a dotted path to a module-level function plus
+    picklable arguments, so they can be run in a freshly spawned process.
+    A max_workers of 0 runs jobs inline in the calling thread.
+    """
+
+    def __init__(self, max_workers=2, max_jobs_per_worker=20, max_pending=32,
+                 time_limit=600, memory_limit=None):
+        self.max_workers = max_workers
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_pending = max_pending
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self._pool = None
+        self._pool_job_count = 0
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._futures = {}
+
+    def _get_pool(self):
+        # Recycle the whole pool rather than using max_tasks_per_child, which can
+        # hang the executor when a worker exits on Python < 3.12. The retired pool
+        # finishes its queued jobs and then its processes exit.
+        if self._pool is not None and self.max_jobs_per_worker and \
+                self._pool_job_count >= self.max_workers * self.max_jobs_per_worker:
+            logger.info("Recycling conversion worker pool")
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+            self._pool_job_count = 0
+        self._pool_job_count += 1
+        return self._pool
+
+    def _reset_pool(self, broken_pool):
+        with self._lock:
+            if self._pool is broken_pool:
+                logger.warning("Conversion worker pool broke, starting a new one")
+                self._pool = None
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _pending_count(self):
+        return len(self._futures)
+
+    def submit(self, function_path, *args, job_id=None, on_failure=None):
+        """
+        Submit a job.
+
+        Args:
+            function_path: dotted path of a module-level function
+            *args: picklable arguments for the function
+            job_id: identifier to use for the job (a UUID is generated if omitted)
+            on_failure: optional callable(job_id, error_message, *args), run in this
+                process when the job raises or its worker dies
+
+        Returns:
+            The job dict (id, function, status, submitted_at, ...)
+
+        Raises:
+            ExecutorBusy: if max_pending jobs are already queued or running
+        """
+        job = {
+            'id': job_id or uuid.uuid4().hex,
+            'function': function_path,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'finished_at': None,
+            'error': None,
+            'attempts': 0,
+        }
+        with self._lock:
+            if self.max_pending and self._pending_count() >= self.max_pending:
+                raise ExecutorBusy(f"Conversion queue is full ({self.max_pending} jobs pending)")
+            self._jobs[job['id']] = job
+            while len(self._jobs) > JOB_HISTORY_SIZE:
+                self._jobs.popitem(last=False)
+
+        if self.max_workers == 0:
+            job['status'] = 'running'
+            try:
+                _import_function(function_path)(*args)
+            except Exception as e:
+                self._finish(job, e, args, on_failure)
+            else:
+                self._finish(job, None, args, on_failure)
+            return dict(job)
+
+        self._dispatch(job, args, on_failure)
+        logger.info(f"Queued conversion job {job['id']} ({function_path})")
+        return dict(job)
+
+    def _dispatch(self, job, args, on_failure):
+        with self._lock:
+            pool = self._get_pool()
+        job['attempts'] += 1
+        try:
+            future = pool.submit(_run_job, job['function'], args, self.time_limit, self.memory_limit)
+        except BrokenProcessPool:
+            # The pool broke between jobs; start a new one and try once more
+            self._reset_pool(pool)
+            with self._lock:
+                pool = self._get_pool()
+            future = pool.submit(_run_job, job['function'], args, self.time_limit, self.memory_limit)
+
+        submitting_thread = threading.current_thread()
+
+        def on_done(done_future):
+            try:
+                handle_result(done_future)
+            finally:
+                if threading.current_thread() is not submitting_thread:
+                    # Callbacks normally run in the pool's management thread; do not
+                    # leave database connections opened by failure handlers behind
+                    connections.close_all()
+
+        def handle_result(done_future):
+            if done_future.cancelled():
+                error = BrokenProcessPool("Job was cancelled")
+            else:
+                error = done_future.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._reset_pool(pool)
+                if job['attempts'] <= MAX_CRASH_RETRIES:
+                    logger.warning(f"Worker for conversion job {job['id']} died, retrying")
+                    job['status'] = 'queued'
+                    self._dispatch(job, args, on_failure)
+                    return
+                error = BrokenProcessPool("Conversion worker process died (memory or CPU limit exceeded?)")
+            self._finish(job, error, args, on_failure)
+
+        self._futures[job['id']] = future
+        future.add_done_callback(on_done)
+
+    def _finish(self, job, error, args, on_failure):
+        self._futures.pop(job['id'], None)
+        job['finished_at'] = time.time()
+        if error is None:
+            job['status'] = 'completed'
+            logger.info(f"Conversion job {job['id']} completed in {job['finished_at'] - job['submitted_at']:.1f}s")
+            return
+        job['status'] = 'failed'
+        job['error'] = str(error) or error.__class__.__name__
+        logger.error(f"Conversion job {job['id']} failed: {job['error']}")
+        if on_failure is not None:
+            try:
+                on_failure(job['id'], job['error'], *args)
+            except Exception as e:
+                logger.error(f"Failure handler for conversion job {job['id']} raised: {e}", exc_info=True)
+
+    def job_status(self, job_id):
+        """Copy of the job dict, or None if the job is unknown to this process"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job = dict(job)
+        future = self._futures.get(job_id)
+        if job['status'] == 'queued' and future is not None and future.running():
+            job['status'] = 'running'
+        return job
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+_executor = None
+_executor_pid = None
+
+
+def get_conversion_executor():
+    """
+    Return the conversion executor of this process.
+
+    Created lazily, and again after a fork, so a preloaded gunicorn master
+    never hands its pool to the workers.
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ConversionExecutor(
+            max_workers=getattr(settings, 'CAD_CONVERSION_EXECUTOR_WORKERS', 2),
+            max_jobs_per_worker=getattr(settings, 'CAD_CONVERSION_EXECUTOR_MAX_JOBS_PER_WORKER', 20),
+            max_pending=getattr(settings, 'CAD_CONVERSION_EXECUTOR_MAX_PENDING', 32),
+            time_limit=getattr(settings, 'CAD_CONVERSION_TIME_LIMIT', 600),
+            memory_limit=getattr(settings, 'CAD_CONVERSION_MEMORY_LIMIT', None),
+        )
+        _executor_pid = os.getpid()
+    return _executor
@@ -0,0 +1,191 @@
+"""
+Shared HTTP client for the remote conversion backends.
+
+One requests.Session per process keeps connections to the FreeCAD service
+and CloudConvert alive between conversions. Uploads and downloads are
+streamed in fixed-size chunks, so the memory used by a conversion does not
+grow with the size of the file:
+
+- upload_multipart() sends a multipart/form-data body assembled on the fly
+  from the file on disk, with a Content-Length (presigned upload targets
+  such as S3 reject chunked transfer encoding);
+- download_to_file() writes a response body to disk with iter_content.
+
+Idempotent requests are retried on connection errors and 502/503/504.
+"""
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 300)
+
+
+class MultipartFileStream:
+    """
+    File-like multipart/form-data body for one file plus text fields.
+
+    The preamble and closing boundary are held in memory and the file is read
+    from disk as requests pulls the body, chunk by chunk. len() gives the
+    exact body size so requests sends a Content-Length.
+    """
+
+    def __init__(self, fields, file_field, file_path, filename=None,
+                 content_type='application/octet-stream'):
+        self.boundary = uuid.uuid4().hex
+        self.file_path = Path(file_path)
+        preamble = b''.join(
+            self._part_header(name, None, None) + str(value).encode('utf-8') + b'\r\n'
+            for name, value in (fields or {}).items()
+        )
+        preamble += self._part_header(file_field, filename or self.file_path.name, content_type)
+        self._parts = [preamble, None, f'\r\n--{self.boundary}--\r\n'.encode('ascii')]
+        self._length = len(preamble) + self.file_path.stat().st_size + len(self._parts[2])
+        self._index = 0
+        self._offset = 0
+        self._file = None
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def _part_header(self, name, filename, content_type):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if content_type:
+            header += f'Content-Type: {content_type}\r\n'
+        return (header + '\r\n').encode('utf-8')
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length
+        chunks = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if part is None:
+                if self._file is None:
+                    self._file = open(self.file_path, 'rb')
+                chunk = self._file.read(size)
+                if not chunk:
+                    self._file.close()
+                    self._index += 1
+                    continue
+            else:
+                chunk = part[self._offset:self._offset + size]
+                self._offset += len(chunk)
+                if self._offset >= len(part):
+                    self._index += 1
+                    self._offset = 0
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _build_session():
+    session = requests.Session()
+    retry = Retry(
+        total=getattr(settings, 'CAD_HTTP_RETRIES', 3),
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, 'CAD_HTTP_POOL_CONNECTIONS', 4),
+        pool_maxsize=getattr(settings, 'CAD_HTTP_POOL_MAXSIZE', 16),
+        max_retries=retry,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_session = None
+_session_pid = None
+
+
+def get_http_session():
+    """
+    Return the pooled session of this process.
+
+    Created lazily, and again after a fork, so pooled sockets are never
+    shared between processes.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        _session = _build_session()
+        _session_pid = os.getpid()
+    return _session
+
+
+def upload_multipart(url, file_path, file_field='file', fields=None, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    POST a file as multipart/form-data, streamed from disk.
+
+    Returns:
+        The requests.Response
+    """
+    body = MultipartFileStream(fields, file_field, file_path)
+    headers = dict(headers or {}, **{'Content-Type': body.content_type})
+    try:
+        return get_http_session().post(url, data=body, headers=headers, timeout=timeout)
+    finally:
+        body.close()
+
+
+def download_to_file(url, output_path, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    GET a URL and stream the body to output_path.
+
+    Raises:
+        requests.HTTPError: for non-2xx responses
+
+    Returns:
+        Number of bytes written
+    """
+    with get_http_session().get(url, stream=True, timeout=timeout, **kwargs) as response:
+        response.raise_for_status()
+        write_response_to_file(response, output_path)
+    return Path(output_path).stat().st_size
+
+
+def write_response_to_file(response, output_path):
+    """Write a streamed response body to disk in STREAM_CHUNK_SIZE chunks"""
+    with open(output_path, 'wb') as out_file:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            out_file.write(chunk)
+
+
+def backoff_delays(initial=0.5, factor=2.0, max_delay=10.0, max_wait=300.0):
+    """
+    Sleep intervals for polling: initial, initial * factor, ... capped at
+    max_delay, until max_wait seconds have passed.
+    """
+    deadline = time.monotonic() + max_wait
+    delay = initial
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(delay, remaining)
+        delay = min(delay * factor, max_delay)
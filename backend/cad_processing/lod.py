@@ -0,0 +1,267 @@
+"""
+Level-of-detail (LOD) generation for web visualization.
+
+A mesh is turned into a chain of progressively coarser meshes (for example
+full, 20k, 5k, 1k and 250 faces). Each level has a face budget and a maximum
+geometric error relative to the bounding-box diagonal; when decimating to the
+face budget would exceed the error bound, the budget is raised for that level.
+The viewer can stream the coarse levels first and refine.
+
+Instanced scenes (assemblies with repeated parts) are simplified geometry by
+geometry, so every level keeps referencing each distinct part only once.
+
+Decimation needs fast_simplification (the backend of trimesh's quadric
+decimation) and the error bound needs scipy; building a chain with coarser
+levels fails without them rather than shipping only the full-resolution mesh.
+"""
+import logging
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    import fast_simplification  # noqa: F401 (used by trimesh's simplify_quadric_decimation)
+    FAST_SIMPLIFICATION_AVAILABLE = True
+except ImportError:
+    FAST_SIMPLIFICATION_AVAILABLE = False
+
+# (target face count, max geometric error as a fraction of the bounding-box diagonal)
+# A target of None keeps the full-resolution mesh.
+DEFAULT_LOD_CHAIN = (
+    (None, 0.0),
+    (20000, 0.002),
+    (5000, 0.01),
+    (1000, 0.03),
+    (250, 0.08),
+)
+
+# Skip a level when it would not reduce the face count meaningfully
+MIN_LOD_REDUCTION = 0.8
+
+# How many times the face budget of a level may be doubled to meet its error bound
+MAX_BUDGET_DOUBLINGS = 3
+
+# Smallest face budget given to a single geometry of an instanced scene
+MIN_GEOMETRY_FACES = 12
+
+
+def require_lod_backends(chain):
+    """
+    Raises:
+        ValueError: when the chain has coarser levels and fast_simplification
+            or scipy is not installed
+    """
+    if not any(target is not None for target, _ in chain):
+        return
+    missing = [
+        package for package, available in (
+            ('fast_simplification', FAST_SIMPLIFICATION_AVAILABLE), ('scipy', SCIPY_AVAILABLE)
+        )
+        if not available
+    ]
+    if missing:
+        raise ValueError(f"LOD generation requires {' and '.join(missing)}, which is not installed")
+
+
+def simplify_mesh(mesh, face_count):
+    """Quadric decimation to face_count faces, or None if it is unavailable or fails"""
+    try:
+        simplified = mesh.simplify_quadric_decimation(face_count=face_count)
+    except Exception as e:
+        logger.warning(f"Mesh simplification to {face_count} faces failed: {e}")
+        return None
+    if simplified is None or len(simplified.faces) == 0:
+        return None
+    return simplified
+
+
+class _ErrorEstimator:
+    """
+    Conservative geometric error estimate between a simplified mesh and the original.
+
+    Uses the largest distance from a simplified vertex to the nearest original
+    vertex, which is an upper bound on its distance to the original surface.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self._tree = None
+
+    def __call__(self, simplified):
+        if self._tree is None:
+            self._tree = cKDTree(self.original.vertices)
+        distances, _ = self._tree.query(simplified.vertices)
+        return float(distances.max()) if len(distances) else 0.0
+
+
+def _simplify_within_error(mesh, estimate_error, face_budget, ceiling, max_error):
+    """
+    Decimate mesh to face_budget faces, doubling the budget (up to ceiling)
+    while the result exceeds max_error.
+
+    Returns:
+        (simplified mesh, error) or None when no acceptable mesh was found
+    """
+    for _ in range(MAX_BUDGET_DOUBLINGS + 1):
+        if face_budget >= ceiling:
+            return None
+        candidate = simplify_mesh(mesh, face_budget)
+        if candidate is None:
+            return None
+        error = estimate_error(candidate)
+        if error <= max_error:
+            return candidate, error
+        logger.info(
+            f"LOD at {face_budget} faces exceeds error bound "
+            f"({error:.4f} > {max_error:.4f}), raising face budget"
+        )
+        face_budget *= 2
+    return None
+
+
+def build_lod_chain(mesh, chain=DEFAULT_LOD_CHAIN):
+    """
+    Build a chain of LOD meshes from a Trimesh.
+
+    Each level is decimated from the previous (coarser levels are cheaper to
+    produce that way) while the error is always measured against the original.
+
+    Args:
+        mesh: full-resolution trimesh.Trimesh
+        chain: sequence of (target face count, max error ratio) tuples
+
+    Returns:
+        list of dicts with level, face_count, geometric_error and mesh,
+        ordered from finest (level 0) to coarsest
+
+    Raises:
+        ValueError: when the decimation backends are missing (see require_lod_backends)
+    """
+    require_lod_backends(chain)
+    lods = [{
+        'level': 0,
+        'face_count': len(mesh.faces),
+        'geometric_error': 0.0,
+        'mesh': mesh,
+    }]
+    diagonal = float(np.linalg.norm(mesh.extents)) if len(mesh.vertices) else 0.0
+    estimate_error = _ErrorEstimator(mesh)
+
+    for target_faces, max_error_ratio in chain:
+        if target_faces is None:
+            continue
+        previous = lods[-1]
+        ceiling = previous['face_count'] * MIN_LOD_REDUCTION
+        if target_faces >= ceiling:
+            continue
+
+        accepted = _simplify_within_error(
+            previous['mesh'], estimate_error, target_faces, ceiling, max_error_ratio * diagonal
+        )
+        if accepted is None:
+            logger.info(f"Skipping LOD with target {target_faces} faces")
+            continue
+
+        candidate, error = accepted
+        lods.append({
+            'level': len(lods),
+            'face_count': len(candidate.faces),
+            'geometric_error': error,
+            'mesh': candidate,
+        })
+        logger.info(f"Built LOD {len(lods) - 1}: {len(candidate.faces)} faces (error: {error})")
+
+    return lods
+
+
+def build_scene_lod_chain(scene, chain=DEFAULT_LOD_CHAIN):
+    """
+    Build a chain of LOD scenes from an instanced trimesh.Scene.
+
+    A level's face budget counts every instance (that is what the viewer
+    draws) and is shared among the distinct geometries in proportion to their
+    faces; each geometry is decimated once and stays shared by its instances.
+    The error bound is relative to the diagonal of the whole scene.
+
+    Returns:
+        list of dicts like build_lod_chain, with face_count the number of
+        drawn faces and mesh a trimesh.Scene sharing the original graph
+
+    Raises:
+        ValueError: when the decimation backends are missing (see require_lod_backends)
+    """
+    require_lod_backends(chain)
+    instance_counts = Counter(scene.graph[node][1] for node in scene.graph.nodes_geometry)
+    geometries = {name: scene.geometry[name] for name in instance_counts}
+
+    def drawn_faces(level_geometries):
+        return sum(len(mesh.faces) * instance_counts[name] for name, mesh in level_geometries.items())
+
+    lods = [{
+        'level': 0,
+        'face_count': drawn_faces(geometries),
+        'geometric_error': 0.0,
+        'mesh': scene,
+    }]
+    diagonal = float(np.linalg.norm(scene.extents)) if geometries else 0.0
+    estimators = {name: _ErrorEstimator(mesh) for name, mesh in geometries.items()}
+    errors = {name: 0.0 for name in geometries}
+
+    previous_geometries = geometries
+    for target_faces, max_error_ratio in chain:
+        if target_faces is None:
+            continue
+        ceiling = lods[-1]['face_count'] * MIN_LOD_REDUCTION
+        if target_faces >= ceiling:
+            continue
+
+        ratio = target_faces / lods[-1]['face_count']
+        max_error = max_error_ratio * diagonal
+        level_geometries = {}
+        level_errors = dict(errors)
+        for name, mesh in previous_geometries.items():
+            face_budget = max(MIN_GEOMETRY_FACES, int(len(mesh.faces) * ratio))
+            accepted = _simplify_within_error(
+                mesh, estimators[name], face_budget, len(mesh.faces) * MIN_LOD_REDUCTION, max_error
+            )
+            if accepted is None:
+                # Small or already coarse parts are kept as they are
+                level_geometries[name] = mesh
+                continue
+            level_geometries[name], level_errors[name] = accepted
+
+        face_count = drawn_faces(level_geometries)
+        if face_count >= ceiling:
+            logger.info(f"Skipping LOD with target {target_faces} faces")
+            continue
+
+        previous_geometries = level_geometries
+        errors = level_errors
+        level_error = max(errors.values(), default=0.0)
+        lods.append({
+            'level': len(lods),
+            'face_count': face_count,
+            'geometric_error': level_error,
+            'mesh': type(scene)(geometry=dict(level_geometries), graph=scene.graph.copy()),
+        })
+        logger.info(
+            f"Built LOD {len(lods) - 1}: {face_count} drawn faces from "
+            f"{len(level_geometries)} geometries (error: {level_error})"
+        )
+
+    return lods
+
+
+def lod_path(base_path, level):
+    """Output path for an LOD level: level 0 is base_path, others get a _lodN suffix"""
+    if level == 0:
+        return base_path
+    return base_path.with_name(f"{base_path.stem}_lod{level}{base_path.suffix}")
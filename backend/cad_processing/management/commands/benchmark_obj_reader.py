@@ -0,0 +1,86 @@
+"""
+Compare the vectorized OBJ reader against trimesh.load.
+
+    python manage.py benchmark_obj_reader model.obj
+    python manage.py benchmark_obj_reader --subdivisions 7
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from cad_processing.obj_reader import read_obj
+from cad_processing.pipeline import peak_rss_bytes
+
+try:
+    import trimesh
+    TRIMESH_AVAILABLE = True
+except ImportError:
+    TRIMESH_AVAILABLE = False
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the vectorized OBJ reader against trimesh.load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='OBJ files to read (default: a generated sphere)')
+        parser.add_argument('--subdivisions', type=int, default=6,
+                            help='Icosphere subdivisions for the generated sphere')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per reader')
+
+    def handle(self, *args, **options):
+        if not TRIMESH_AVAILABLE:
+            raise CommandError('trimesh is required for this benchmark')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [Path(p) for p in options['paths']]
+            if not paths:
+                sphere = trimesh.creation.icosphere(subdivisions=options['subdivisions'])
+                paths = [Path(temp_dir) / 'sphere.obj']
+                sphere.export(str(paths[0]))
+
+            for path in paths:
+                if not path.exists():
+                    raise CommandError(f'File not found: {path}')
+                self._benchmark(path, options['repeat'])
+
+    def _time(self, func, repeat):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _benchmark(self, path, repeat):
+        size_mb = path.stat().st_size / (1024 * 1024)
+        self.stdout.write(f'{path.name} ({size_mb:.1f} MB)')
+
+        # The vectorized reader runs first so its peak RSS is not inflated by trimesh
+        vectorized_time, (vertices, faces, stats) = self._time(lambda: read_obj(path), repeat)
+        vectorized_peak = peak_rss_bytes()
+        baseline_time, mesh = self._time(lambda: trimesh.load(str(path), force='mesh'), repeat)
+        baseline_peak = peak_rss_bytes()
+
+        self.stdout.write(f'  read_obj:     {vectorized_time:.3f}s, {len(faces)} faces')
+        self.stdout.write(f'  trimesh.load: {baseline_time:.3f}s, {len(mesh.faces)} faces')
+        self.stdout.write(f'  speedup:      {baseline_time / vectorized_time:.1f}x')
+        if vectorized_peak and baseline_peak:
+            self.stdout.write(
+                f'  process peak RSS: {vectorized_peak / (1024 * 1024):.0f} MB after read_obj, '
+                f'{baseline_peak / (1024 * 1024):.0f} MB after trimesh.load'
+            )
+
+        tolerance = 1e-4 * max(float(np.linalg.norm(mesh.extents)), 1.0)
+        checks = {
+            'bounds': np.allclose(stats['bounds'], mesh.bounds, atol=tolerance),
+            'centroid': np.allclose(stats['centroid'], mesh.centroid, atol=tolerance),
+            'volume': np.isclose(stats['volume'], mesh.volume, rtol=1e-4, atol=tolerance ** 3),
+        }
+        for name, ok in checks.items():
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'  {name}: {"match" if ok else "MISMATCH"}'))
@@ -0,0 +1,30 @@
+"""
+Remove scratch workspaces left behind by killed conversion workers.
+
+    python manage.py sweep_scratch
+    python manage.py sweep_scratch --max-age 3600 --dry-run
+
+Run it periodically (cron, a scheduled container) on every host that
+converts files.
+"""
+from django.core.management.base import BaseCommand
+
+from cad_processing.workspace import sweep_stale_workspaces
+
+
+class Command(BaseCommand):
+    help = 'Remove stale CAD processing scratch workspaces'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Age in seconds after which a workspace is stale (default: CAD_SCRATCH_MAX_AGE)')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be removed')
+
+    def handle(self, *args, **options):
+        removed, freed = sweep_stale_workspaces(options['max_age'], dry_run=options['dry_run'])
+        for path in removed:
+            self.stdout.write(str(path))
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(removed)} stale scratch entries ({freed / (1024 * 1024):.1f} MB)"
+        ))
@@ -0,0 +1,91 @@
+"""
+Streaming geometry statistics for triangle soups.
+
+Used by the STL and OBJ readers to compute bounds, area-weighted centroid,
+surface area and signed volume chunk by chunk, without holding a full
+float64 copy of the mesh, and by the pipeline for instanced assemblies, whose
+instances are placed and measured one at a time instead of being flattened.
+"""
+import numpy as np
+
+# Triangles per chunk for the streaming statistics pass (~50 MB of STL records)
+STATS_CHUNK_TRIANGLES = 1_000_000
+
+
+class TriangleStatistics:
+    """Accumulates bounds, area-weighted centroid, area and signed volume"""
+
+    def __init__(self):
+        self.bounds_min = np.full(3, np.inf)
+        self.bounds_max = np.full(3, -np.inf)
+        self.weighted_center = np.zeros(3)
+        self.area = 0.0
+        self.volume = 0.0
+        self.triangle_count = 0
+
+    def update(self, triangles):
+        """
+        Add a chunk of triangles.
+
+        Args:
+            triangles: array-like of shape (n, 3, 3); triangles with
+                non-finite coordinates are ignored
+        """
+        chunk = np.asarray(triangles, dtype=np.float64)
+        chunk = chunk[np.isfinite(chunk).all(axis=(1, 2))]
+        if not len(chunk):
+            return
+        v0, v1, v2 = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+
+        self.bounds_min = np.minimum(self.bounds_min, chunk.min(axis=(0, 1)))
+        self.bounds_max = np.maximum(self.bounds_max, chunk.max(axis=(0, 1)))
+
+        areas = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1)
+        self.area += float(areas.sum())
+        self.weighted_center += (areas[:, None] * (v0 + v1 + v2) / 3.0).sum(axis=0)
+
+        # Signed volume of the tetrahedra formed with the origin
+        self.volume += float(np.einsum('ij,ij->', v0, np.cross(v1, v2)) / 6.0)
+        self.triangle_count += len(chunk)
+
+    def as_dict(self):
+        """dict with bounds (2x3 array), centroid (3-array), area and volume"""
+        if self.area > 0:
+            centroid = self.weighted_center / self.area
+        else:
+            centroid = (self.bounds_min + self.bounds_max) / 2.0
+        return {
+            'bounds': np.array([self.bounds_min, self.bounds_max]),
+            'centroid': centroid,
+            'area': self.area,
+            'volume': self.volume,
+        }
+
+
+def triangle_statistics(triangles, chunk_size=STATS_CHUNK_TRIANGLES):
+    """
+    Streaming statistics over an (n, 3, 3) array, converted chunk_size
+    triangles at a time (the input may be a strided memmap view).
+    """
+    stats = TriangleStatistics()
+    for start in range(0, len(triangles), chunk_size):
+        stats.update(triangles[start:start + chunk_size])
+    return stats.as_dict()
+
+
+def instanced_triangle_statistics(instances, chunk_size=STATS_CHUNK_TRIANGLES):
+    """
+    Streaming statistics over instanced geometry.
+
+    Args:
+        instances: iterable of (vertices, faces, transform) where transform
+            is the 4x4 matrix placing that instance
+    """
+    stats = TriangleStatistics()
+    for vertices, faces, transform in instances:
+        vertices = np.asarray(vertices, dtype=np.float64)
+        rotation = transform[:3, :3].T
+        translation = transform[:3, 3]
+        for start in range(0, len(faces), chunk_size):
+            stats.update(vertices[faces[start:start + chunk_size]] @ rotation + translation)
+    return stats.as_dict()
@@ -0,0 +1,293 @@
+"""
+Chunked, vectorized Wavefront OBJ reader.
+
+The file is read in large blocks split at line boundaries. Within a block,
+lines are classified by their leading keyword with array operations on the
+raw bytes; the ``v`` and ``f`` lines are gathered into contiguous
+buffers and each buffer is converted to numbers in one bulk parse. Polygons
+are fan-triangulated with array arithmetic instead of per-face Python loops.
+Bounds, area-weighted centroid and signed volume are accumulated as blocks
+arrive, so the statistics are ready as soon as the last block is parsed.
+
+Comments (``#`` to the end of a line) are blanked and ``\`` line
+continuations joined before the bulk parse. Only geometry is read: texture
+coordinates, normals, groups and materials are ignored. OBJ normals belong to face corners (``f v/vt/vn``), not to
+vertices, so they are left for trimesh to compute from the faces.
+"""
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from .mesh_stats import TriangleStatistics
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 16 * 1024 * 1024  # 16 MB
+
+_NEWLINE = ord('\n')
+_SPACE = ord(' ')
+_SLASH = ord('/')
+_HASH = ord('#')
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b' \t\r\n')] = True
+
+
+class _GrowableArray:
+    """Append-only 2D array with amortized doubling, so blocks are not re-concatenated"""
+
+    def __init__(self, columns, dtype):
+        self._data = np.empty((1024, columns), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, rows):
+        end = self._size + len(rows)
+        if end > len(self._data):
+            grown = np.empty((max(end, 2 * len(self._data)), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = rows
+        self._size = end
+
+    @property
+    def array(self):
+        """View of the filled rows (invalidated by the next extend)"""
+        return self._data[:self._size]
+
+    def finish(self):
+        """Trimmed copy of the filled rows"""
+        return self._data[:self._size].copy()
+
+
+def fan_triangulate(corners, counts):
+    """
+    Fan-triangulate polygons given as a flat corner array.
+
+    Args:
+        corners: flat int array of vertex indices, polygon after polygon
+        counts: number of corners of each polygon (each at least 3)
+
+    Returns:
+        int64 array of shape (sum(counts - 2), 3)
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    triangles_per_polygon = counts - 2
+    polygon = np.repeat(np.arange(len(counts)), triangles_per_polygon)
+    # Position of each triangle within its polygon fan: 1 .. count - 2
+    first_triangle = np.cumsum(triangles_per_polygon) - triangles_per_polygon
+    step = np.arange(len(polygon)) - np.repeat(first_triangle, triangles_per_polygon) + 1
+    base = starts[polygon]
+    return np.column_stack((
+        corners[base],
+        corners[base + step],
+        corners[base + step + 1],
+    )).astype(np.int64, copy=False)
+
+
+class _Block:
+    """The lines of one block of an OBJ file, classified by keyword"""
+
+    def __init__(self, data):
+        self.bytes = np.frombuffer(data, dtype=np.uint8)
+        self.line_ends = np.flatnonzero(self.bytes == _NEWLINE)
+        self.line_starts = np.concatenate(([0], self.line_ends[:-1] + 1))
+
+        # The first two bytes of every line (the block ends with a newline,
+        # so padding keeps short last lines in range)
+        padded = np.concatenate((self.bytes, np.full(1, _NEWLINE, dtype=np.uint8)))
+        first = padded[self.line_starts]
+        second = padded[self.line_starts + 1]
+        self.is_vertex = (first == ord('v')) & _WHITESPACE[second]
+        self.is_face = (first == ord('f')) & _WHITESPACE[second]
+
+    def gather(self, lines, keyword_length):
+        """
+        Concatenate the selected lines with their keyword blanked out.
+
+        Returns:
+            (buffer, line_ends): uint8 array of the lines (each ending in a
+            newline) and the position of each line's newline in it
+        """
+        lengths = self.line_ends - self.line_starts + 1
+        buffer = self.bytes[np.repeat(lines, lengths)].copy()
+        line_ends = np.cumsum(lengths[lines]) - 1
+        line_starts = line_ends - lengths[lines] + 1
+        for offset in range(keyword_length):
+            buffer[line_starts + offset] = _SPACE
+        _blank_comments(buffer)
+        return buffer, line_ends
+
+
+def _blank_comments(buffer):
+    """Blank everything from a '#' to the end of its line in place"""
+    hashes = buffer == _HASH
+    if not hashes.any():
+        return
+    positions = np.arange(len(buffer))
+    last_newline = np.maximum.accumulate(np.where(buffer == _NEWLINE, positions, -1))
+    last_hash = np.maximum.accumulate(np.where(hashes, positions, -1))
+    buffer[(last_hash > last_newline) & (buffer != _NEWLINE)] = _SPACE
+
+
+def _parse_buffer(buffer, line_ends, dtype):
+    """
+    Parse every number in a gathered buffer in one bulk conversion.
+
+    Returns:
+        (values, counts): flat array of the numbers and how many are on each line
+    """
+    whitespace = _WHITESPACE[buffer]
+    # A token starts where a non-whitespace byte follows whitespace
+    token_start = ~whitespace
+    token_start[1:] &= whitespace[:-1]
+    tokens_before_line_end = np.searchsorted(np.flatnonzero(token_start), line_ends)
+    counts = np.diff(tokens_before_line_end, prepend=0)
+
+    values = np.fromstring(buffer.tobytes(), dtype=dtype, sep=' ')
+    if len(values) != counts.sum():
+        raise ValueError("Malformed OBJ data: could not parse all numeric values")
+    return values, counts
+
+
+def _parse_coordinates(block, lines, keyword_length):
+    """Lines of "x y z [w | r g b]" -> float32 (n, 3) array of xyz"""
+    if not lines.any():
+        return np.empty((0, 3), dtype=np.float32)
+    values, counts = _parse_buffer(*block.gather(lines, keyword_length), np.float64)
+    if (counts == 3).all():
+        return values.reshape(-1, 3).astype(np.float32)
+    if (counts < 3).any():
+        raise ValueError("Malformed OBJ data: vertex with fewer than 3 coordinates")
+    starts = np.cumsum(counts) - counts
+    return values[starts[:, None] + np.arange(3)].astype(np.float32)
+
+
+def _strip_corner_suffixes(buffer):
+    """Blank the texture/normal references of face corners in place ("7/2/3" -> "7")"""
+    slash = buffer == _SLASH
+    if not slash.any():
+        return
+    positions = np.arange(len(buffer))
+    last_whitespace = np.maximum.accumulate(np.where(_WHITESPACE[buffer], positions, -1))
+    last_slash = np.maximum.accumulate(np.where(slash, positions, -1))
+    buffer[last_slash > last_whitespace] = _SPACE
+
+
+def _parse_faces(block, vertex_offset):
+    """
+    Triangulated, zero-based faces of one block.
+
+    Args:
+        block: _Block of whole lines
+        vertex_offset: number of vertices defined before the block
+
+    Returns:
+        int64 (n, 3) array; indices may point past the vertices read so far
+    """
+    buffer, line_ends = block.gather(block.is_face, 1)
+    _strip_corner_suffixes(buffer)
+    corners, counts = _parse_buffer(buffer, line_ends, np.int64)
+
+    relative = corners < 0
+    if relative.any():
+        # Relative indices count back from the vertices defined before the face line
+        vertices_before = np.cumsum(block.is_vertex)[block.is_face] + vertex_offset
+        corner_line = np.repeat(np.arange(len(counts)), counts)
+        corners[relative] += vertices_before[corner_line[relative]]
+        corners[~relative] -= 1
+    else:
+        corners -= 1
+
+    polygons = counts >= 3
+    if not polygons.all():
+        logger.warning(f"Skipping {int((~polygons).sum())} OBJ faces with fewer than 3 vertices")
+        corners = corners[np.repeat(polygons, counts)]
+        counts = counts[polygons]
+    return fan_triangulate(corners, counts)
+
+
+def _continues(data, end):
+    """Whether the line ending at data[end - 1] (a newline) continues on the next line"""
+    return data[end - 2:end] == b'\\\n' or data[end - 3:end] == b'\\\r\n'
+
+
+def _join_continuations(data):
+    """Join lines ending in a backslash with the next line"""
+    if b'\\' not in data:
+        return data
+    return data.replace(b'\\\r\n', b' ').replace(b'\\\n', b' ')
+
+
+def _iter_blocks(file_path, chunk_size):
+    """Yield blocks of whole (joined) lines from a file"""
+    remainder = b''
+    with open(file_path, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            # A continued line is finished by a later read
+            while cut and _continues(data, cut):
+                cut = data.rfind(b'\n', 0, cut - 1) + 1
+            if cut == 0:
+                remainder = data
+                continue
+            remainder = data[cut:]
+            yield _join_continuations(data[:cut])
+    if remainder:
+        yield _join_continuations(remainder + b'\n')
+
+
+def read_obj(file_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Read an OBJ file into vertex/face arrays plus streaming statistics.
+
+    Returns:
+        (vertices, faces, stats): float32 (n, 3) vertices, int64 (m, 3)
+        triangle faces and the TriangleStatistics dict
+    """
+    vertices = _GrowableArray(3, np.float32)
+    faces = _GrowableArray(3, np.int64)
+    stats = TriangleStatistics()
+    # Faces that reference vertices defined further down the file
+    deferred = []
+
+    for data in _iter_blocks(file_path, chunk_size):
+        block = _Block(data)
+        vertex_offset = len(vertices)
+        vertices.extend(_parse_coordinates(block, block.is_vertex, 1))
+
+        if not block.is_face.any():
+            continue
+        block_faces = _parse_faces(block, vertex_offset)
+        if not len(block_faces):
+            continue
+        resolved = (block_faces < len(vertices)).all(axis=1) & (block_faces >= 0).all(axis=1)
+        if not resolved.all():
+            deferred.append(block_faces[~resolved])
+            block_faces = block_faces[resolved]
+        stats.update(vertices.array[block_faces])
+        faces.extend(block_faces)
+
+    vertices = vertices.finish()
+    if deferred:
+        late_faces = np.concatenate(deferred)
+        valid = ((late_faces >= 0) & (late_faces < len(vertices))).all(axis=1)
+        if not valid.all():
+            logger.warning(f"Dropping {int((~valid).sum())} OBJ faces with out-of-range vertex indices")
+            late_faces = late_faces[valid]
+        stats.update(vertices[late_faces])
+        faces.extend(late_faces)
+
+    faces = faces.finish()
+    if not len(faces):
+        raise ValueError(f"OBJ file contains no faces: {file_path}")
+
+    logger.info(f"Read OBJ {Path(file_path).name}: {len(faces)} triangles, {len(vertices)} vertices")
+    return vertices, faces, stats.as_dict()
@@ -0,0 +1,538 @@
+"""
+In-memory STEP tessellation with pythonocc-core.
+
+The B-rep is meshed with BRepMesh and the triangulation of every face is read
+straight from BRep_Tool.Triangulation into NumPy arrays, instead of writing a
+binary STL and parsing it back. Each face keeps its own indexed vertices (no
+per-triangle duplication as in STL) and the surface normals computed from the
+B-rep, so curved faces shade smoothly while edges between faces stay sharp.
+
+Assemblies are split into their solids, which are meshed independently in a
+pool of worker processes and joined back together, so conversion time scales
+down with the number of cores.
+
+Deflection is derived from each solid's bounding-box diagonal, so small and
+large parts get the same relative detail, and the whole tessellation is
+redone coarser when it overshoots the component's triangle budget.
+
+step_to_scene reads the product structure through XCAF instead: every
+distinct part is tessellated once and placed by as many scene nodes as it has
+instances, so repeated parts (rollers, fasteners) are stored once in the GLB.
+"""
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from OCC.Core.IFSelect import IFSelect_RetDone
+    from OCC.Core.STEPControl import STEPControl_Reader
+    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
+    from OCC.Core.BRep import BRep_Tool
+    from OCC.Core.Bnd import Bnd_Box
+    from OCC.Core.BRepBndLib import brepbndlib
+    from OCC.Core.BRepTools import breptools
+    from OCC.Core.BRepLib import BRepLib_ToolTriangulatedShape
+    from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_REVERSED, TopAbs_SOLID
+    from OCC.Core.TopExp import TopExp_Explorer
+    from OCC.Core.TopLoc import TopLoc_Location
+    from OCC.Core.TopoDS import topods
+    from OCC.Core.STEPCAFControl import STEPCAFControl_Reader
+    from OCC.Core.TCollection import TCollection_ExtendedString
+    from OCC.Core.TDF import TDF_Label, TDF_LabelSequence
+    from OCC.Core.TDocStd import TDocStd_Document
+    from OCC.Core.XCAFDoc import XCAFDoc_DocumentTool
+    PYTHONOCC_AVAILABLE = True
+except ImportError:
+    PYTHONOCC_AVAILABLE = False
+
+try:
+    import trimesh
+    TRIMESH_AVAILABLE = True
+except ImportError:
+    TRIMESH_AVAILABLE = False
+
+# Linear deflection as a fraction of each solid's bounding-box diagonal
+RELATIVE_DEFLECTION = 0.002
+
+# Lower bound for derived linear deflections (degenerate or tiny solids)
+MIN_DEFLECTION = 1e-4
+
+# Angular deflection in radians (~20 degrees), so small round features keep their shape
+DEFAULT_ANGULAR_DEFLECTION = 0.35
+MAX_ANGULAR_DEFLECTION = 1.0
+
+# Triangles drawn for a component when no budget is given
+DEFAULT_TRIANGLE_BUDGET = 250000
+
+# A tessellation may overshoot its budget by this factor before it is redone coarser
+BUDGET_SLACK = 1.25
+
+# Below this many shapes (solids or distinct parts), starting worker processes costs more than it saves
+PARALLEL_MIN_SHAPES = 16
+
+# Shapes handed to a worker at a time
+SHAPES_PER_TASK = 4
+
+
+def read_step_shape(step_file_path):
+    """Read a STEP file into a single TopoDS_Shape"""
+    if not PYTHONOCC_AVAILABLE:
+        raise ValueError("pythonocc-core is not available")
+    reader = STEPControl_Reader()
+    status = reader.ReadFile(str(step_file_path))
+    if status != IFSelect_RetDone:
+        raise ValueError(f"Failed to read STEP file: {step_file_path}")
+    reader.TransferRoots()
+    if reader.NbShapes() == 0:
+        raise ValueError("No shapes found in STEP file")
+    shape = reader.OneShape()
+    if shape.IsNull():
+        raise ValueError("STEP file contains no valid geometry")
+    return shape
+
+
+def _location_matrix(location):
+    """3x4 affine matrix of a TopLoc_Location, or None for the identity"""
+    if location.IsIdentity():
+        return None
+    transformation = location.Transformation()
+    return np.array([[transformation.Value(row, column) for column in range(1, 5)] for row in range(1, 4)])
+
+
+def _location_transform(location):
+    """4x4 homogeneous matrix of a TopLoc_Location"""
+    transform = np.eye(4)
+    matrix = _location_matrix(location)
+    if matrix is not None:
+        transform[:3] = matrix
+    return transform
+
+
+def _read_triples(element, count, dtype, method='Coord'):
+    """(count, 3) array of element(i).<method>() for i = 1 .. count (OCC arrays are one-based)"""
+    values = chain.from_iterable(getattr(element(i), method)() for i in range(1, count + 1))
+    return np.fromiter(values, dtype=dtype, count=3 * count).reshape(count, 3)
+
+
+def _face_arrays(face):
+    """
+    Vertices, triangles and normals of one meshed face.
+
+    Returns:
+        (vertices, triangles, normals) or None if the face has no triangulation;
+        triangles are zero-based and wound according to the face orientation
+    """
+    location = TopLoc_Location()
+    triangulation = BRep_Tool.Triangulation(face, location)
+    if triangulation is None or triangulation.NbTriangles() == 0:
+        return None
+
+    node_count = triangulation.NbNodes()
+    triangle_count = triangulation.NbTriangles()
+    # pythonocc exposes the node and triangle arrays element by element only;
+    # np.fromiter fills preallocated arrays without building tuples of tuples
+    vertices = _read_triples(triangulation.Node, node_count, np.float64)
+    triangles = _read_triples(triangulation.Triangle, triangle_count, np.int64, 'Get') - 1
+
+    if not triangulation.HasNormals():
+        BRepLib_ToolTriangulatedShape.ComputeNormals(face, triangulation)
+    normals = None
+    if triangulation.HasNormals():
+        normals = _read_triples(triangulation.Normal, node_count, np.float64)
+
+    matrix = _location_matrix(location)
+    if matrix is not None:
+        vertices = vertices @ matrix[:, :3].T + matrix[:, 3]
+        if normals is not None:
+            normals = normals @ matrix[:, :3].T
+
+    if face.Orientation() == TopAbs_REVERSED:
+        triangles = triangles[:, ::-1]
+        if normals is not None:
+            normals = -normals
+    return vertices, triangles, normals
+
+
+def _concatenate(parts):
+    """
+    Join (vertices, faces, normals) parts, offsetting the face indices.
+
+    Returns:
+        (vertices, faces, normals) with normals None when any part lacks them
+    """
+    vertices = np.concatenate([part[0] for part in parts]).astype(np.float32)
+    offsets = np.cumsum([0] + [len(part[0]) for part in parts[:-1]])
+    faces = np.concatenate([part[1] + offset for part, offset in zip(parts, offsets)])
+    normals = None
+    if all(part[2] is not None for part in parts):
+        normals = np.concatenate([part[2] for part in parts]).astype(np.float64)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, lengths, out=normals, where=lengths > 0)
+        normals = normals.astype(np.float32)
+    return vertices, faces, normals
+
+
+def _mesh_faces(shape, deflection, angular_deflection):
+    """Mesh one shape and return the (vertices, triangles, normals) of its faces"""
+    # Drop any earlier triangulation: BRepMesh keeps a finer existing mesh
+    # rather than coarsening it
+    breptools.Clean(shape)
+    # The constructor meshes the shape; calling Perform() again would mesh it twice
+    mesher = BRepMesh_IncrementalMesh(shape, deflection, False, angular_deflection, True)
+    if not mesher.IsDone():
+        logger.warning("BRepMesh did not finish meshing a shape, some faces may be missing")
+    parts = []
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        arrays = _face_arrays(topods.Face(explorer.Current()))
+        explorer.Next()
+        if arrays is not None:
+            parts.append(arrays)
+    return parts
+
+
+def _tessellate_task(shapes, tolerances):
+    """Worker: tessellate a batch of shapes, one (vertices, faces, normals) or None per shape"""
+    results = []
+    for shape, (deflection, angular_deflection) in zip(shapes, tolerances):
+        parts = _mesh_faces(shape, deflection, angular_deflection)
+        results.append(_concatenate(parts) if parts else None)
+    return results
+
+
+def split_solids(shape):
+    """The solids of a shape, or the shape itself when it has none (e.g. a bare shell)"""
+    solids = []
+    explorer = TopExp_Explorer(shape, TopAbs_SOLID)
+    while explorer.More():
+        solids.append(topods.Solid(explorer.Current()))
+        explorer.Next()
+    return solids or [shape]
+
+
+def shape_diagonal(shape):
+    """Bounding-box diagonal of a shape (0 for an empty shape)"""
+    box = Bnd_Box()
+    brepbndlib.Add(shape, box)
+    if box.IsVoid():
+        return 0.0
+    return math.sqrt(box.SquareExtent())
+
+
+def shape_tolerances(shapes, deflection=None, angular_deflection=None):
+    """
+    (linear, angular) deflection for each shape.
+
+    Without an explicit deflection, the linear deflection is RELATIVE_DEFLECTION
+    of the shape's own bounding-box diagonal.
+    """
+    angular_deflection = angular_deflection or DEFAULT_ANGULAR_DEFLECTION
+    if deflection is not None:
+        return [(deflection, angular_deflection)] * len(shapes)
+    return [
+        (max(shape_diagonal(shape) * RELATIVE_DEFLECTION, MIN_DEFLECTION), angular_deflection)
+        for shape in shapes
+    ]
+
+
+def tessellate_shapes(shapes, tolerances, workers=1):
+    """
+    Tessellate each shape separately with its own (linear, angular) deflection.
+
+    With at least PARALLEL_MIN_SHAPES shapes and workers > 1 the shapes are
+    meshed in batches in a pool of worker processes; TopoDS_Shape pickles
+    through its BRep text form, so shapes travel to the workers intact.
+
+    Returns:
+        list with (vertices, faces, normals) as returned by tessellate_shape,
+        or None for shapes without triangles, in the order of shapes
+    """
+    if not PYTHONOCC_AVAILABLE:
+        raise ValueError("pythonocc-core is not available")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(shapes) < PARALLEL_MIN_SHAPES:
+        return _tessellate_task(shapes, tolerances)
+
+    batches = range(0, len(shapes), SHAPES_PER_TASK)
+    workers = min(workers, len(batches))
+    logger.info(f"Tessellating {len(shapes)} shapes in {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = pool.map(
+            _tessellate_task,
+            [shapes[i:i + SHAPES_PER_TASK] for i in batches],
+            [tolerances[i:i + SHAPES_PER_TASK] for i in batches],
+        )
+        return [result for batch in results for result in batch]
+
+
+def tessellate_to_budget(shapes, instance_counts=None, triangle_budget=None, deflection=None,
+                         angular_deflection=None, workers=1):
+    """
+    Tessellate shapes, coarsening all of them when the drawn triangles exceed the budget.
+
+    Args:
+        shapes: list of TopoDS_Shape
+        instance_counts: how often each shape is drawn (defaults to once)
+        triangle_budget: target number of drawn triangles (None = no limit)
+        deflection: fixed linear deflection instead of the size-derived one
+        angular_deflection: angular deflection in radians
+        workers: worker processes (None = CPU count)
+
+    Returns:
+        list as returned by tessellate_shapes
+    """
+    instance_counts = instance_counts or [1] * len(shapes)
+    tolerances = shape_tolerances(shapes, deflection, angular_deflection)
+    results = tessellate_shapes(shapes, tolerances, workers)
+    if not triangle_budget:
+        return results
+
+    drawn = sum(len(result[1]) * count for result, count in zip(results, instance_counts) if result is not None)
+    if drawn > triangle_budget * BUDGET_SLACK:
+        # Triangle counts grow roughly inversely with the deflection
+        factor = drawn / triangle_budget
+        logger.info(f"Tessellation has {drawn} triangles for a budget of {triangle_budget}, coarsening by {factor:.1f}x")
+        tolerances = [
+            (linear * factor, min(angular * factor, MAX_ANGULAR_DEFLECTION))
+            for linear, angular in tolerances
+        ]
+        results = tessellate_shapes(shapes, tolerances, workers)
+    return results
+
+
+def tessellate_shape(shape, deflection=None, angular_deflection=None, workers=1, triangle_budget=None):
+    """
+    Mesh a shape and collect the triangulations of all its faces.
+
+    The shape is meshed solid by solid, each with a deflection derived from
+    its size unless deflection is given (see tessellate_to_budget).
+
+    Args:
+        shape: TopoDS_Shape
+        deflection: fixed linear deflection (None = derived from each solid's size)
+        angular_deflection: angular deflection in radians
+        workers: worker processes for multi-solid shapes (None = CPU count)
+        triangle_budget: target triangle count (None = no limit)
+
+    Returns:
+        (vertices, faces, normals): float32 (n, 3), int64 (m, 3) and float32
+        (n, 3) unit vertex normals, or None when any face lacks normals
+    """
+    results = tessellate_to_budget(
+        split_solids(shape),
+        triangle_budget=triangle_budget,
+        deflection=deflection,
+        angular_deflection=angular_deflection,
+        workers=workers,
+    )
+    parts = [result for result in results if result is not None]
+    if not parts:
+        raise ValueError("STEP shape produced an empty tessellation")
+    return _concatenate(parts)
+
+
+def step_to_trimesh(step_file_path, deflection=None, workers=1, triangle_budget=None):
+    """
+    Tessellate a STEP file into a Trimesh without touching the filesystem.
+
+    The mesh is built with process=False so the per-face vertices and B-rep
+    normals are kept as they are.
+    """
+    if not TRIMESH_AVAILABLE:
+        raise ValueError("trimesh is required for STEP tessellation")
+    vertices, faces, normals = tessellate_shape(
+        read_step_shape(step_file_path),
+        deflection,
+        workers=workers,
+        triangle_budget=triangle_budget,
+    )
+    logger.info(
+        f"Tessellated STEP {Path(step_file_path).name}: {len(faces)} triangles, "
+        f"{len(vertices)} vertices"
+    )
+    return trimesh.Trimesh(vertices=vertices, faces=faces, vertex_normals=normals, process=False)
+
+
+class StepAssembly:
+    """
+    Product structure of a STEP file.
+
+    prototypes holds every distinct part shape once, without its placement.
+    nodes lists the assembly tree in depth-first order as dicts with name,
+    parent (index into nodes, None for roots), transform (4x4, relative to
+    the parent) and prototype (index into prototypes, None for assemblies).
+    """
+
+    def __init__(self):
+        self.prototypes = []
+        self.nodes = []
+        self._prototypes_by_hash = {}
+
+    def add_group(self, name, parent, transform):
+        self.nodes.append({'name': name, 'parent': parent, 'transform': transform, 'prototype': None})
+        return len(self.nodes) - 1
+
+    def add_part(self, name, parent, transform, shape):
+        # References to the same shape differ only in their location, so the
+        # unlocated shape identifies the part
+        prototype = shape.Located(TopLoc_Location())
+        transform = transform @ _location_transform(shape.Location())
+        candidates = self._prototypes_by_hash.setdefault(hash(prototype), [])
+        for index in candidates:
+            if self.prototypes[index].IsEqual(prototype):
+                break
+        else:
+            self.prototypes.append(prototype)
+            index = len(self.prototypes) - 1
+            candidates.append(index)
+        self.nodes.append({'name': name, 'parent': parent, 'transform': transform, 'prototype': index})
+        return len(self.nodes) - 1
+
+
+def _label_name(label):
+    try:
+        return label.GetLabelName()
+    except Exception:
+        return ''
+
+
+def _add_label(assembly, shape_tool, label, parent, transform, name=''):
+    """Add a shape label and, for assemblies, its components to the assembly tree"""
+    name = name or _label_name(label)
+    if shape_tool.IsAssembly(label):
+        group = assembly.add_group(name or 'assembly', parent, transform)
+        components = TDF_LabelSequence()
+        shape_tool.GetComponents(label, components)
+        for i in range(1, components.Length() + 1):
+            component = components.Value(i)
+            referred = TDF_Label()
+            if not shape_tool.GetReferredShape(component, referred):
+                continue
+            _add_label(
+                assembly,
+                shape_tool,
+                referred,
+                group,
+                _location_transform(shape_tool.GetLocation(component)),
+                _label_name(component),
+            )
+        return
+    shape = shape_tool.GetShape(label)
+    if not shape.IsNull():
+        assembly.add_part(name or 'part', parent, transform, shape)
+
+
+def read_step_assembly(step_file_path):
+    """Read the product structure of a STEP file through XCAF"""
+    if not PYTHONOCC_AVAILABLE:
+        raise ValueError("pythonocc-core is not available")
+    document = TDocStd_Document(TCollection_ExtendedString("step"))
+    shape_tool = XCAFDoc_DocumentTool.ShapeTool(document.Main())
+    reader = STEPCAFControl_Reader()
+    reader.SetNameMode(True)
+    status = reader.ReadFile(str(step_file_path))
+    if status != IFSelect_RetDone:
+        raise ValueError(f"Failed to read STEP file: {step_file_path}")
+    if not reader.Transfer(document):
+        raise ValueError(f"Failed to transfer STEP file: {step_file_path}")
+
+    roots = TDF_LabelSequence()
+    shape_tool.GetFreeShapes(roots)
+    assembly = StepAssembly()
+    for i in range(1, roots.Length() + 1):
+        _add_label(assembly, shape_tool, roots.Value(i), None, np.eye(4))
+    if not assembly.prototypes:
+        raise ValueError("No shapes found in STEP file")
+    return assembly
+
+
+def unique_name(name, used):
+    """
+    name, or name_1, name_2, ... for the first one not in used; the result
+    is added to used. Suffixes are checked against every name taken so far,
+    so a part really named "bolt_1" is not overwritten by the second "bolt".
+    """
+    candidate, suffix = name, 0
+    while candidate in used:
+        suffix += 1
+        candidate = f"{name}_{suffix}"
+    used.add(candidate)
+    return candidate
+
+
+def step_to_scene(step_file_path, deflection=None, workers=1, triangle_budget=None):
+    """
+    Tessellate a STEP file into an instanced trimesh.Scene.
+
+    Each distinct part is tessellated once (parts are also merged when their
+    tessellations are byte-identical) and referenced by one scene node per
+    instance; assemblies become transform-only nodes, so the part hierarchy
+    and names survive into the GLB. The triangle budget counts every
+    instance, since that is what the viewer draws.
+    """
+    if not TRIMESH_AVAILABLE:
+        raise ValueError("trimesh is required for STEP tessellation")
+    assembly = read_step_assembly(step_file_path)
+    instance_counts = Counter(node['prototype'] for node in assembly.nodes)
+    tessellations = tessellate_to_budget(
+        assembly.prototypes,
+        [instance_counts[index] for index in range(len(assembly.prototypes))],
+        triangle_budget,
+        deflection,
+        workers=workers,
+    )
+
+    scene = trimesh.Scene()
+    geometry_names = {}  # prototype index -> geometry name
+    names_by_content = {}
+    for index, arrays in enumerate(tessellations):
+        if arrays is None:
+            continue
+        vertices, faces, normals = arrays
+        digest = hashlib.sha1(vertices.tobytes() + faces.tobytes()).hexdigest()
+        if digest not in names_by_content:
+            name = f"geometry_{len(names_by_content)}"
+            names_by_content[digest] = name
+            scene.geometry[name] = trimesh.Trimesh(
+                vertices=vertices, faces=faces, vertex_normals=normals, process=False
+            )
+        geometry_names[index] = names_by_content[digest]
+    if not scene.geometry:
+        raise ValueError("STEP shape produced an empty tessellation")
+
+    node_names = []
+    # Graph frames are keyed by name, so a repeated name would replace a node
+    used_names = {scene.graph.base_frame}
+    instances = 0
+    for node in assembly.nodes:
+        node_name = unique_name(node['name'], used_names)
+        node_names.append(node_name)
+        parent = scene.graph.base_frame if node['parent'] is None else node_names[node['parent']]
+        if node['prototype'] is None:
+            scene.graph.update(frame_from=parent, frame_to=node_name, matrix=node['transform'])
+        elif node['prototype'] in geometry_names:
+            scene.graph.update(
+                frame_from=parent,
+                frame_to=node_name,
+                matrix=node['transform'],
+                geometry=geometry_names[node['prototype']],
+            )
+            instances += 1
+
+    logger.info(
+        f"Tessellated STEP {Path(step_file_path).name}: {instances} part instances of "
+        f"{len(scene.geometry)} distinct geometries"
+    )
+    return scene
@@ -0,0 +1,308 @@
+"""
+Staged mesh processing pipeline.
+
+    load -> merge -> repair -> simplify -> analyze -> export
+
+The pipeline holds a single in-memory mesh and runs each stage exactly once,
+no matter how many times geometry extraction and GLB conversion ask for it.
+Multi-part scenes (STEP assemblies) are kept as a scene graph instead, so
+repeated parts stay instanced through LOD generation and GLB export.
+Per-stage wall-clock timings are recorded for diagnostics, with how much
+each stage raised the process's peak RSS and that peak so far. ru_maxrss is
+a lifetime maximum, so a stage that stays below an earlier stage's peak
+shows no growth.
+"""
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .lod import DEFAULT_LOD_CHAIN, build_lod_chain, build_scene_lod_chain, lod_path
+from .mesh_stats import instanced_triangle_statistics
+from .obj_reader import read_obj
+from .occ_tessellation import PYTHONOCC_AVAILABLE, step_to_scene
+from .stl_reader import binary_stl_triangle_count, read_binary_stl
+
+logger = logging.getLogger(__name__)
+
+try:
+    import trimesh
+    TRIMESH_AVAILABLE = True
+except ImportError:
+    TRIMESH_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+STAGES = ('load', 'merge', 'repair', 'simplify', 'analyze', 'export')
+
+# Stages that must have run before each stage
+STAGE_DEPENDENCIES = {
+    'load': (),
+    'merge': ('load',),
+    'repair': ('merge',),
+    'simplify': ('repair',),
+    'analyze': ('repair',),
+    'export': ('simplify',),
+}
+
+
+def peak_rss_bytes():
+    """Peak resident set size of the current process so far in bytes, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def extract_connection_points(bounds, center):
+    """Bounding-box based connection points for a mesh"""
+    return [
+        {'position': bounds[0].tolist(), 'normal': [0, 0, -1], 'side': 'bottom'},
+        {'position': bounds[1].tolist(), 'normal': [0, 0, 1], 'side': 'top'},
+        {'position': [bounds[0][0], bounds[0][1], center[2]], 'normal': [-1, 0, 0], 'side': 'left'},
+        {'position': [bounds[1][0], bounds[1][1], center[2]], 'normal': [1, 0, 0], 'side': 'right'},
+        {'position': [center[0], bounds[0][1], center[2]], 'normal': [0, -1, 0], 'side': 'front'},
+        {'position': [center[0], bounds[1][1], center[2]], 'normal': [0, 1, 0], 'side': 'back'},
+    ]
+
+
+class MeshPipeline:
+    """
+    Run the mesh stages for one file, each at most once.
+
+    Calling a stage runs any earlier stages it depends on first, so
+    ``pipeline.analyze()`` followed by ``pipeline.export(path)`` loads, merges
+    and repairs the mesh only once.
+    """
+
+    def __init__(self, file_path, lod_chain=DEFAULT_LOD_CHAIN, step_deflection=None,
+                 step_workers=1, step_triangle_budget=None):
+        if not TRIMESH_AVAILABLE:
+            raise ValueError("trimesh is required for mesh processing")
+        self.file_path = Path(file_path)
+        self.lod_chain = lod_chain
+        self.step_deflection = step_deflection
+        self.step_workers = step_workers
+        self.step_triangle_budget = step_triangle_budget
+        self.loaded = None  # Trimesh or Scene as returned by the loader
+        self.mesh = None  # Single merged Trimesh (None when a scene is kept)
+        self.scene = None  # Multi-part Scene whose graph and instancing are kept
+        self.source_stats = None  # Streaming statistics computed by the loader, if any
+        self.lod_meshes = []
+        self.geometry_data = None
+        self.lods = []  # Exported LOD files
+        self.timings = {}
+        self.peak_rss_growth = {}  # Bytes each stage raised the process peak RSS by
+        self.process_peak_rss = {}  # Process peak RSS so far after each stage
+        self._completed = set()
+
+    def _run_stage(self, name, stage_func):
+        """Run a stage once, after the stages it depends on"""
+        if name in self._completed:
+            return
+        for dependency in STAGE_DEPENDENCIES[name]:
+            getattr(self, dependency)()
+
+        peak_before = peak_rss_bytes()
+        start = time.perf_counter()
+        stage_func()
+        self.timings[name] = time.perf_counter() - start
+        peak_after = peak_rss_bytes()
+        self.process_peak_rss[name] = peak_after
+        self.peak_rss_growth[name] = peak_after - peak_before if peak_after is not None else None
+        self._completed.add(name)
+        logger.debug(f"Pipeline stage '{name}' for {self.file_path.name} took {self.timings[name]:.3f}s")
+
+    def load(self):
+        """
+        Read the file from disk.
+
+        Binary STL and OBJ go through the vectorized readers; STEP files are
+        tessellated in memory with pythonocc-core.
+        """
+        def stage():
+            extension = self.file_path.suffix.lower()
+            try:
+                if extension == '.stl' and binary_stl_triangle_count(self.file_path):
+                    vertices, faces, self.source_stats = read_binary_stl(self.file_path)
+                    # Vertices are already welded, so skip trimesh's own processing
+                    self.loaded = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+                elif extension in ('.step', '.stp'):
+                    if not PYTHONOCC_AVAILABLE:
+                        raise ValueError("pythonocc-core is required to tessellate STEP files")
+                    self.loaded = step_to_scene(
+                        self.file_path,
+                        self.step_deflection,
+                        self.step_workers,
+                        self.step_triangle_budget,
+                    )
+                elif extension == '.obj':
+                    try:
+                        vertices, faces, self.source_stats = read_obj(self.file_path)
+                    except ValueError as e:
+                        # Syntax the bulk parser does not cover; trimesh's loader is slower but lenient
+                        logger.warning(f"Fast OBJ reader failed ({e}), loading with trimesh")
+                        self.loaded = trimesh.load(str(self.file_path))
+                    else:
+                        # Vertex normals are computed by trimesh (see read_obj)
+                        self.loaded = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+                else:
+                    self.loaded = trimesh.load(str(self.file_path))
+            except Exception as load_error:
+                logger.error(f"Failed to load file with trimesh: {load_error}")
+                raise ValueError(f"Failed to load {extension} file: {load_error}")
+        self._run_stage('load', stage)
+
+    def merge(self):
+        """
+        Reduce the loaded geometry to one Trimesh, or keep a multi-part scene.
+
+        A scene with more than one mesh node is kept as it is (its graph holds
+        the part hierarchy and instance transforms); a single node is taken
+        out of its scene with its transform applied.
+        """
+        def stage():
+            loaded = self.loaded
+            if isinstance(loaded, trimesh.Scene):
+                mesh_nodes = [
+                    node for node in loaded.graph.nodes_geometry
+                    if isinstance(loaded.geometry.get(loaded.graph[node][1]), trimesh.Trimesh)
+                ]
+                if len(mesh_nodes) > 1:
+                    other_geometry = [
+                        name for name, geometry in loaded.geometry.items()
+                        if not isinstance(geometry, trimesh.Trimesh)
+                    ]
+                    if other_geometry:
+                        loaded.delete_geometry(other_geometry)
+                    self.scene = loaded
+                    self.loaded = None
+                    return
+                if mesh_nodes:
+                    transform, geometry_name = loaded.graph[mesh_nodes[0]]
+                    loaded = loaded.geometry[geometry_name]
+                    if not np.allclose(transform, np.eye(4)):
+                        loaded = loaded.copy()
+                        loaded.apply_transform(transform)
+            if not isinstance(loaded, trimesh.Trimesh):
+                raise ValueError(f"Could not extract mesh from file. Got type: {type(loaded)}")
+            self.mesh = loaded
+            # Drop the loader's reference so only one copy of the geometry stays alive
+            self.loaded = None
+        self._run_stage('merge', stage)
+
+    def repair(self):
+        """Drop degenerate and duplicate faces and unreferenced vertices"""
+        def stage():
+            meshes = list(self.scene.geometry.values()) if self.scene is not None else [self.mesh]
+            for mesh in meshes:
+                keep = mesh.nondegenerate_faces() & mesh.unique_faces()
+                if not keep.all():
+                    logger.info(f"Removing {int((~keep).sum())} degenerate/duplicate faces")
+                    mesh.update_faces(keep)
+                    # Loader statistics no longer describe the repaired mesh
+                    self.source_stats = None
+                mesh.remove_unreferenced_vertices()
+        self._run_stage('repair', stage)
+
+    def simplify(self):
+        """Build the LOD chain"""
+        def stage():
+            if self.scene is not None:
+                self.lod_meshes = build_scene_lod_chain(self.scene, self.lod_chain)
+            else:
+                self.lod_meshes = build_lod_chain(self.mesh, self.lod_chain)
+        self._run_stage('simplify', stage)
+
+    def analyze(self):
+        """Extract bounding box, center, volume and connection points"""
+        def stage():
+            if self.scene is not None:
+                # Measure each instance in place instead of flattening the scene
+                self.source_stats = instanced_triangle_statistics(
+                    (geometry.vertices, geometry.faces, transform)
+                    for transform, geometry in self._scene_instances()
+                )
+            if self.source_stats is not None:
+                bounds = self.source_stats['bounds']
+                center = self.source_stats['centroid']
+                volume = self.source_stats['volume']
+            else:
+                bounds = self.mesh.bounds
+                center = self.mesh.centroid
+                volume = self.mesh.volume if hasattr(self.mesh, 'volume') else 0.0
+            self.geometry_data = {
+                'bounding_box': {
+                    'min': bounds[0].tolist(),
+                    'max': bounds[1].tolist(),
+                    'center': center.tolist(),
+                },
+                'volume': abs(float(volume)),
+                'center': center.tolist(),
+                'connection_points': extract_connection_points(bounds, center),
+            }
+        self._run_stage('analyze', stage)
+        return self.geometry_data
+
+    def _scene_instances(self):
+        """(world transform, Trimesh) for every mesh node of the kept scene"""
+        for node in self.scene.graph.nodes_geometry:
+            transform, geometry_name = self.scene.graph[node]
+            yield transform, self.scene.geometry[geometry_name]
+
+    def export(self, output_path):
+        """
+        Write the LOD chain as GLB files (instanced scenes write each
+        distinct geometry once, referenced by every node that uses it).
+
+        Level 0 goes to output_path and coarser levels next to it with a _lodN
+        suffix. Returns the list of exported LOD dicts.
+        """
+        output_path = Path(output_path)
+
+        def stage():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            self.lods = []
+            for lod in self.lod_meshes:
+                path = lod_path(output_path, lod['level'])
+                lod['mesh'].export(str(path), file_type='glb')
+                self.lods.append({
+                    'level': lod['level'],
+                    'face_count': lod['face_count'],
+                    'geometric_error': lod['geometric_error'],
+                    'path': path,
+                    'size': path.stat().st_size,
+                })
+            # The LOD meshes are no longer needed once written
+            self.lod_meshes = []
+        self._run_stage('export', stage)
+        return self.lods
+
+    def report(self):
+        """Per-stage timings (seconds), peak RSS growth and process peak RSS so far (bytes)"""
+        return {
+            'timings': dict(self.timings),
+            'peak_rss_growth': dict(self.peak_rss_growth),
+            'process_peak_rss': dict(self.process_peak_rss),
+        }
+
+    def format_report(self):
+        """Human-readable one-line summary of the stage timings and memory"""
+        parts = []
+        for name in STAGES:
+            if name in self.timings:
+                growth = self.peak_rss_growth.get(name)
+                growth_text = f", peak +{growth / (1024 * 1024):.0f} MB" if growth else ''
+                parts.append(f"{name} {self.timings[name]:.3f}s{growth_text}")
+        peaks = [peak for peak in self.process_peak_rss.values() if peak]
+        if peaks:
+            parts.append(f"process peak RSS {max(peaks) / (1024 * 1024):.0f} MB")
+        return '; '.join(parts)
+
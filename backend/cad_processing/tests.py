@@ -0,0 +1,301 @@
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from . import http_client
+from .converters import ConverterBackend, _probe_freecad_service
+from .obj_reader import read_obj
+from .occ_tessellation import unique_name
+from .pipeline import MeshPipeline
+from .stl_reader import weld_vertices
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers each request with the next entry of server.replies: a status code,
+    a (status code, body) pair, or None to drop the connection without a
+    response. Requests are recorded in server.requests.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.server.requests.append({
+            'method': self.command,
+            'path': self.path,
+            'headers': dict(self.headers),
+            'body': self.rfile.read(length),
+        })
+        reply = self.server.replies.pop(0) if self.server.replies else 200
+        if reply is None:
+            self.close_connection = True
+            return
+        status, body = reply if isinstance(reply, tuple) else (reply, b'')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+
+class HTTPClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.replies = []
+        self.server.requests = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+
+        # A fresh session, built with the test's settings; backoff sleeps are recorded, not
+        # slept (only urllib3's reference to time is patched, other threads still sleep)
+        patcher = mock.patch.object(http_client, '_session', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        retry_time = mock.patch('urllib3.util.retry.time')
+        self.sleeps = retry_time.start().sleep
+        self.addCleanup(retry_time.stop)
+
+    def slept(self):
+        return [call.args[0] for call in self.sleeps.call_args_list]
+
+    def test_multipart_stream_reads_in_chunks(self):
+        path = self.work_dir / 'part.step'
+        path.write_bytes(bytes(range(256)) * 100)
+        stream = http_client.MultipartFileStream({'format': 'stl'}, 'file', path)
+        self.addCleanup(stream.close)
+
+        chunks = []
+        while chunk := stream.read(1000):
+            self.assertLessEqual(len(chunk), 1000)
+            chunks.append(chunk)
+
+        body = b''.join(chunks)
+        self.assertEqual(len(body), len(stream))
+        self.assertIn(bytes(range(256)) * 100, body)
+        self.assertTrue(body.endswith(f'\r\n--{stream.boundary}--\r\n'.encode()))
+
+    def test_upload_multipart(self):
+        path = self.work_dir / 'model.step'
+        content = b'ISO-10303-21;\r\n' + bytes(range(256)) * 8192
+        path.write_bytes(content)
+
+        response = http_client.upload_multipart(f'{self.url}/convert', path, fields={'output_format': 'obj'})
+
+        self.assertEqual(response.status_code, 200)
+        request = self.server.requests[0]
+        self.assertEqual(request['method'], 'POST')
+        # Sent with a Content-Length, not chunked
+        self.assertNotIn('Transfer-Encoding', request['headers'])
+        self.assertEqual(int(request['headers']['Content-Length']), len(request['body']))
+        boundary = request['headers']['Content-Type'].split('boundary=', 1)[1].encode()
+        parts = request['body'].split(b'--' + boundary)
+        self.assertEqual(parts[-1], b'--\r\n')
+        self.assertEqual(
+            parts[1],
+            b'\r\nContent-Disposition: form-data; name="output_format"\r\n\r\nobj\r\n',
+        )
+        headers, file_content = parts[2].split(b'\r\n\r\n', 1)
+        self.assertIn(b'name="file"; filename="model.step"', headers)
+        self.assertEqual(file_content, content + b'\r\n')
+
+    def test_download_to_file(self):
+        content = bytes(range(256)) * (3 * http_client.STREAM_CHUNK_SIZE // 256 + 7)
+        self.server.replies = [(200, content)]
+        output_path = self.work_dir / 'converted.stl'
+
+        with mock.patch.object(http_client, 'STREAM_CHUNK_SIZE', 64 * 1024):
+            with mock.patch.object(requests.Response, 'iter_content', autospec=True,
+                                   side_effect=requests.Response.iter_content) as iter_content:
+                written = http_client.download_to_file(f'{self.url}/result', output_path)
+
+        self.assertEqual(written, len(content))
+        self.assertEqual(output_path.read_bytes(), content)
+        self.assertEqual(iter_content.call_args.kwargs, {'chunk_size': 64 * 1024})
+
+    def test_download_raises_for_error_status(self):
+        self.server.replies = [404]
+        with self.assertRaises(requests.HTTPError):
+            http_client.download_to_file(f'{self.url}/missing', self.work_dir / 'missing.stl')
+
+    @override_settings(CAD_HTTP_RETRIES=3)
+    def test_get_retried_with_backoff_on_5xx(self):
+        self.server.replies = [503, 502, 504, (200, b'solid')]
+
+        response = http_client.get_http_session().get(f'{self.url}/result', timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'solid')
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(self.slept(), [1.0, 2.0])
+
+    @override_settings(CAD_HTTP_RETRIES=2)
+    def test_get_gives_up_after_retries(self):
+        self.server.replies = [503, 503, 503, 200]
+
+        response = http_client.get_http_session().get(f'{self.url}/result', timeout=5)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_post_not_retried(self):
+        self.server.replies = [503, 200]
+        path = self.work_dir / 'model.step'
+        path.write_bytes(b'ISO-10303-21;')
+
+        response = http_client.upload_multipart(f'{self.url}/convert', path)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    @override_settings(CAD_HTTP_RETRIES=3)
+    def test_get_retried_on_dropped_connection(self):
+        self.server.replies = [None, None, (200, b'solid')]
+        output_path = self.work_dir / 'converted.stl'
+
+        written = http_client.download_to_file(f'{self.url}/result', output_path)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.slept(), [1.0])
+
+    @override_settings(CAD_HTTP_RETRIES=3)
+    def test_health_probe_not_retried(self):
+        self.server.replies = [503, 200]
+        with self.settings(FREECAD_DOCKER_URL=self.url):
+            self.assertFalse(_probe_freecad_service())
+        self.assertEqual(len(self.server.requests), 1)
+
+    @override_settings(CAD_HTTP_RETRIES=3)
+    def test_connection_refused_retried_then_raised(self):
+        url = self.url
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(requests.ConnectionError):
+            http_client.get_http_session().get(f'{url}/health', timeout=5)
+        # Three retries after the first attempt; urllib3 does not wait before the first
+        self.assertEqual(self.slept(), [1.0, 2.0])
+
+
+class ConverterBackendTests(SimpleTestCase):
+    def backend(self, probe):
+        return ConverterBackend('test', None, probe)
+
+    def test_first_probe_does_not_block(self):
+        release = threading.Event()
+        backend = self.backend(lambda: release.wait(5) and False)
+
+        # Optimistic while the probe runs in the background
+        self.assertTrue(backend.is_available(60))
+        self.assertIsNone(backend.available)
+        release.set()
+        # Conversions wait for the result
+        self.assertFalse(backend.is_available(60, wait=True))
+        self.assertFalse(backend.is_available(60))
+
+    def test_start_probe_runs_once(self):
+        probe = mock.Mock(return_value=True)
+        backend = self.backend(probe)
+        backend.start_probe()
+        self.assertTrue(backend.is_available(60, wait=True))
+        backend.start_probe()
+        self.assertEqual(probe.call_count, 1)
+
+
+class WeldVerticesTests(SimpleTestCase):
+    def triangles(self):
+        return np.array([
+            [[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+            [[1, 0, 0], [0, 1, 0], [1, 1, -0.0]],
+        ], dtype=np.float32)
+
+    def test_welds_shared_corners(self):
+        vertices, faces = weld_vertices(self.triangles())
+        self.assertEqual(len(vertices), 4)
+        self.assertEqual(faces.shape, (2, 3))
+        np.testing.assert_array_equal(vertices[faces], self.triangles() + np.float32(0.0))
+
+    def test_input_left_unchanged(self):
+        triangles = self.triangles()
+        weld_vertices(triangles)
+        # -0.0 is still negative zero in the caller's array
+        self.assertTrue(np.signbit(triangles[1, 2, 2]))
+
+    def test_read_only_input(self):
+        with tempfile.NamedTemporaryFile() as file:
+            self.triangles().tofile(file.name)
+            triangles = np.memmap(file.name, dtype=np.float32, mode='r', shape=(2, 3, 3))
+            vertices, faces = weld_vertices(triangles)
+        self.assertEqual(len(vertices), 4)
+
+
+QUAD_OBJ = b"""# A unit quad
+o quad
+v 0 0 0 # origin
+v 1 0 0
+v 1 1 0 # corner \\ with a backslash
+v 0 1 \\
+0
+vn 0 0 1
+f 1//1 2//1 \\
+  3//1 4//1 # two triangles
+"""
+
+
+class ObjReaderTests(SimpleTestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+
+    def write(self, content, name='model.obj'):
+        path = self.work_dir / name
+        path.write_bytes(content)
+        return path
+
+    def test_comments_and_continuations(self):
+        vertices, faces, _ = read_obj(self.write(QUAD_OBJ))
+        np.testing.assert_array_equal(vertices, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+        np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3]])
+
+    def test_continuation_across_blocks(self):
+        path = self.write(QUAD_OBJ.replace(b'\n', b'\r\n'))
+        for chunk_size in (7, 16, 33):
+            with self.subTest(chunk_size=chunk_size):
+                vertices, faces, _ = read_obj(path, chunk_size=chunk_size)
+                np.testing.assert_array_equal(vertices, [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+                np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3]])
+
+    def test_pipeline_falls_back_to_trimesh(self):
+        path = self.write(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+        with mock.patch('cad_processing.pipeline.read_obj', side_effect=ValueError('Malformed OBJ data')):
+            with self.assertLogs('cad_processing.pipeline', 'WARNING'):
+                pipeline = MeshPipeline(path, lod_chain=())
+                pipeline.load()
+        self.assertEqual(len(pipeline.loaded.faces), 1)
+        self.assertIsNone(pipeline.source_stats)
+
+
+class UniqueNameTests(SimpleTestCase):
+    def test_suffixes_skip_names_in_use(self):
+        used = {'world'}
+        names = [unique_name(name, used) for name in ['bolt', 'bolt_1', 'bolt', 'bolt', 'world', 'bolt_1']]
+        self.assertEqual(names, ['bolt', 'bolt_1', 'bolt_2', 'bolt_3', 'world_1', 'bolt_1_1'])
+        self.assertEqual(len(set(names)), len(names))
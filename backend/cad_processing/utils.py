@@ -8,13 +8,35 @@ The FreeCAD Docker service can be deployed alongside the main application.
 import logging
 from pathlib import Path
 import shutil
-import tempfile
 import requests
 import time
 from django.conf import settings
+from .cache import build_cache_key, file_sha256, get_conversion_cache
+from .http_client import backoff_delays, download_to_file, get_http_session, upload_multipart, write_response_to_file
+from .lod import DEFAULT_LOD_CHAIN, lod_path
+from .occ_tessellation import DEFAULT_TRIANGLE_BUDGET, PYTHONOCC_AVAILABLE, RELATIVE_DEFLECTION, step_to_trimesh
+from .pipeline import MeshPipeline, extract_connection_points
+from .workspace import scratch_dir, scratch_workspace
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change to the pipeline alters its output, so cached
+# conversions produced by older code are not reused
+PIPELINE_VERSION = 3
+
+# LOD chain for web visualization: (target face count, max error ratio) per level
+LOD_CHAIN = getattr(settings, 'CAD_LOD_CHAIN', DEFAULT_LOD_CHAIN)
+
+# Triangles a tessellated STEP component aims for, unless the upload sets its own budget.
+# Deflection is derived from each solid's size (see occ_tessellation).
+STEP_TRIANGLE_BUDGET = getattr(settings, 'CAD_STEP_TRIANGLE_BUDGET', DEFAULT_TRIANGLE_BUDGET)
+
+# Processes for tessellating the solids of STEP assemblies in parallel (None = CPU count)
+STEP_TESSELLATION_WORKERS = getattr(settings, 'CAD_STEP_TESSELLATION_WORKERS', None)
+
+# Scratch space a conversion is expected to need, as a multiple of the input file size
+SCRATCH_SIZE_FACTOR = 10
+
 try:
     import trimesh
     TRIMESH_AVAILABLE = True
@@ -29,29 +51,34 @@ except ImportError:
     PYGLTF_AVAILABLE = False
     logger.warning("pygltflib not available. GLB export may be limited.")
 
-# Check for pythonocc-core for STEP conversion
-try:
-    from OCC.Core.IFSelect import IFSelect_RetDone
-    from OCC.Core.STEPControl_Reader import STEPControl_Reader
-    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
-    from OCC.Core.StlAPI import StlAPI_Writer
-    PYTHONOCC_AVAILABLE = True
-except ImportError:
-    PYTHONOCC_AVAILABLE = False
+if not PYTHONOCC_AVAILABLE:
     logger.warning("pythonocc-core not available. STEP conversion via pythonocc-core will not work.")
 
 # CloudConvert API for STEP conversion
 CLOUDCONVERT_API_KEY = getattr(settings, 'CLOUDCONVERT_API_KEY', None)
-CLOUDCONVERT_API_URL = 'https://api.cloudconvert.com/v2'
+CLOUDCONVERT_API_URL = getattr(settings, 'CLOUDCONVERT_API_URL', 'https://api.cloudconvert.com/v2')
 
 
-def convert_step_via_freecad_local(step_file_path, output_format='stl'):
+def freecad_converter_script():
+    """Path of freecad_converter.py, or None when it is not shipped with this deployment"""
+    for script_path in (
+        Path(__file__).parent.parent / 'freecad_converter.py',
+        Path(__file__).parent.parent.parent / 'freecad_converter.py',
+    ):
+        if script_path.exists():
+            return script_path
+    return None
+
+
+def convert_step_via_freecad_local(step_file_path, output_format='stl', triangle_budget=None, output_dir=None):
     """
     Convert STEP file to STL/OBJ using FreeCAD installed locally (not Docker).
     
     Args:
         step_file_path: Path to STEP file
         output_format: 'stl' or 'obj'
+        triangle_budget: Target triangle count (defaults to STEP_TRIANGLE_BUDGET)
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
     
     Returns:
         Path to converted file (temporary location)
@@ -64,22 +91,20 @@ def convert_step_via_freecad_local(step_file_path, output_format='stl'):
     
     try:
         # Create temporary output file
-        temp_dir = Path(tempfile.gettempdir()) / 'step_converter'
-        temp_dir.mkdir(exist_ok=True)
+        temp_dir = scratch_dir(output_dir)
         output_path = temp_dir / f"{step_file_path.stem}_converted.{output_format}"
         
-        # Try to use the freecad_converter.py script directly
-        # First, find the script path
-        script_path = Path(__file__).parent.parent / 'freecad_converter.py'
-        if not script_path.exists():
-            # Try alternative location
-            script_path = Path(__file__).parent.parent.parent / 'freecad_converter.py'
-        
-        if not script_path.exists():
+        # Use the freecad_converter.py script directly
+        script_path = freecad_converter_script()
+        if script_path is None:
             raise ValueError("freecad_converter.py script not found")
         
         # Run the converter script
-        python_cmd = ['python', str(script_path), str(step_file_path), str(output_path), '--format', output_format]
+        python_cmd = [
+            'python', str(script_path), str(step_file_path), str(output_path),
+            '--format', output_format,
+            '--budget', str(triangle_budget or STEP_TRIANGLE_BUDGET),
+        ]
         
         result = subprocess.run(
             python_cmd,
@@ -107,16 +132,81 @@ def convert_step_via_freecad_local(step_file_path, output_format='stl'):
         raise ValueError(f"STEP conversion via local FreeCAD failed: {str(e)}")
 
 
-def convert_step_via_freecad_docker(step_file_path, output_format='stl'):
+def convert_step_via_freecad_service(step_file_path, output_format='stl', service_url=None, triangle_budget=None,
+                                     output_dir=None):
+    """
+    Convert STEP file to STL/OBJ using the FreeCAD conversion service.
+    
+    The service (freecad_converter.py --serve, see Dockerfile.freecad) keeps
+    FreeCAD loaded in a pool of worker processes. The STEP file is streamed as
+    the request body and the converted file is streamed back to disk, so
+    neither is held in memory.
+    
+    Args:
+        step_file_path: Path to STEP file
+        output_format: 'stl' or 'obj'
+        service_url: Base URL of the service (defaults to FREECAD_DOCKER_URL)
+        triangle_budget: Target triangle count (defaults to STEP_TRIANGLE_BUDGET)
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
+    
+    Returns:
+        Path to converted file (temporary location)
+    """
+    step_file_path = Path(step_file_path)
+    if not step_file_path.exists():
+        raise FileNotFoundError(f"STEP file not found: {step_file_path}")
+    
+    service_url = (service_url or getattr(settings, 'FREECAD_DOCKER_URL', None) or '').rstrip('/')
+    if not service_url:
+        raise ValueError("FreeCAD conversion service URL not configured. Set FREECAD_DOCKER_URL.")
+    
+    try:
+        logger.info(f"Converting STEP via FreeCAD service: {service_url}")
+        temp_dir = scratch_dir(output_dir)
+        output_path = temp_dir / f"{step_file_path.stem}_converted.{output_format}"
+        
+        with open(step_file_path, 'rb') as f:
+            response = get_http_session().post(
+                f"{service_url}/convert",
+                params={'format': output_format, 'budget': triangle_budget or STEP_TRIANGLE_BUDGET},
+                data=f,
+                headers={'Content-Type': 'application/octet-stream'},
+                stream=True,
+                timeout=(10, 300)
+            )
+        with response:
+            if response.status_code != 200:
+                try:
+                    error_detail = response.json().get('error', response.text)
+                except ValueError:
+                    error_detail = response.text
+                raise ValueError(f"service returned HTTP {response.status_code}: {error_detail}")
+            write_response_to_file(response, output_path)
+        
+        if output_path.stat().st_size == 0:
+            raise ValueError(f"Converted file is empty: {output_path}")
+        
+        logger.info(f"Successfully converted STEP to {output_format.upper()}: {output_path}")
+        return output_path
+    except Exception as e:
+        logger.error(f"FreeCAD Docker service conversion failed: {e}")
+        raise ValueError(f"FreeCAD Docker service conversion failed: {e}")
+
+
+def convert_step_via_freecad_docker(step_file_path, output_format='stl', triangle_budget=None, output_dir=None):
     """
     Convert STEP file to STL/OBJ using FreeCAD in Docker container (deployment-friendly).
     
-    This function calls a FreeCAD Docker container to perform the conversion.
-    The Docker container can be deployed alongside the main application.
+    This function runs the FreeCAD Docker image once per file; the FreeCAD
+    conversion service (convert_step_via_freecad_service) avoids the container
+    start-up. Whether Docker and the image are present is probed, and cached,
+    by the converter registry (see converters.py).
     
     Args:
         step_file_path: Path to STEP file
         output_format: 'stl' or 'obj'
+        triangle_budget: Target triangle count (defaults to STEP_TRIANGLE_BUDGET)
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
     
     Returns:
         Path to converted file (temporary location)
@@ -128,70 +218,14 @@ def convert_step_via_freecad_docker(step_file_path, output_format='stl'):
     if not step_file_path.exists():
         raise FileNotFoundError(f"STEP file not found: {step_file_path}")
     
-    # Check if FreeCAD Docker container is available
     freecad_docker_image = getattr(settings, 'FREECAD_DOCKER_IMAGE', 'freecad-converter:latest')
-    freecad_docker_url = getattr(settings, 'FREECAD_DOCKER_URL', None)  # e.g., 'http://freecad-service:8001'
-    
-    # Option 1: Use FreeCAD Docker container via HTTP API (if available)
-    if freecad_docker_url:
-        try:
-            logger.info(f"Converting STEP via FreeCAD Docker service: {freecad_docker_url}")
-            # Upload file to FreeCAD service
-            with open(step_file_path, 'rb') as f:
-                files = {'file': (step_file_path.name, f, 'application/octet-stream')}
-                data = {'output_format': output_format}
-                response = requests.post(
-                    f"{freecad_docker_url}/convert",
-                    files=files,
-                    data=data,
-                    timeout=300
-                )
-                response.raise_for_status()
-                
-                # Save converted file
-                temp_dir = Path(tempfile.gettempdir()) / 'step_converter'
-                temp_dir.mkdir(exist_ok=True)
-                output_path = temp_dir / f"{step_file_path.stem}_converted.{output_format}"
-                
-                with open(output_path, 'wb') as out_file:
-                    out_file.write(response.content)
-                
-                logger.info(f"Successfully converted STEP to {output_format.upper()}: {output_path}")
-                return output_path
-        except Exception as e:
-            logger.error(f"FreeCAD Docker service conversion failed: {e}")
-            raise ValueError(f"FreeCAD Docker service conversion failed: {e}")
-    
-    # Option 2: Use FreeCAD Docker container via subprocess (if Docker is available)
-    try:
-        # Check if docker command is available
-        subprocess.run(['docker', '--version'], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-        error_detail = "Docker is not installed or not accessible" if isinstance(e, FileNotFoundError) else "Docker check failed"
-        raise ValueError(
-            f"STEP file conversion requires FreeCAD Docker container, but {error_detail}.\n\n"
-            "SOLUTIONS:\n"
-            "1. Install Docker Desktop (https://www.docker.com/products/docker-desktop/)\n"
-            "   Then build and run the FreeCAD Docker container\n\n"
-            "2. Set up FreeCAD Docker service:\n"
-            "   - Build: docker build -f Dockerfile.freecad -t freecad-converter:latest .\n"
-            "   - Run: docker run -d -p 8001:8001 --name freecad-service freecad-converter:latest\n"
-            "   - Set FREECAD_DOCKER_URL=http://localhost:8001\n\n"
-            "3. Pre-convert STEP files to STL/OBJ before uploading:\n"
-            "   - Use FreeCAD (free): https://www.freecad.org/\n"
-            "   - Or use online converters\n"
-            "   - Then upload the STL or OBJ file instead\n\n"
-            "4. For development, use Python 3.10-3.12 and install pythonocc-core:\n"
-            "   pip install pythonocc-core"
-        )
     
     # Use Docker to run FreeCAD conversion
     try:
         logger.info(f"Converting STEP via FreeCAD Docker container: {freecad_docker_image}")
         
         # Create temporary output file
-        temp_dir = Path(tempfile.gettempdir()) / 'step_converter'
-        temp_dir.mkdir(exist_ok=True)
+        temp_dir = scratch_dir(output_dir)
         output_path = temp_dir / f"{step_file_path.stem}_converted.{output_format}"
         
         # Run FreeCAD conversion in Docker
@@ -204,7 +238,8 @@ def convert_step_via_freecad_docker(step_file_path, output_format='stl'):
             'python3', '/app/freecad_converter.py',
             f'/input/{step_file_path.name}',
             f'/output/{output_path.name}',
-            '--format', output_format
+            '--format', output_format,
+            '--budget', str(triangle_budget or STEP_TRIANGLE_BUDGET),
         ]
         
         result = subprocess.run(
@@ -247,13 +282,14 @@ def convert_step_via_freecad_docker(step_file_path, output_format='stl'):
         )
 
 
-def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
+def convert_step_via_cloudconvert(step_file_path, output_format='stl', output_dir=None):
     """
     Convert STEP file to STL/OBJ using CloudConvert API.
     
     Args:
         step_file_path: Path to STEP file
         output_format: 'stl' or 'obj'
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
     
     Returns:
         Path to converted file (temporary location)
@@ -267,8 +303,7 @@ def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
     
     try:
         # Create temporary output file
-        temp_dir = Path(tempfile.gettempdir()) / 'step_converter'
-        temp_dir.mkdir(exist_ok=True)
+        temp_dir = scratch_dir(output_dir)
         output_path = temp_dir / f"{step_file_path.stem}_converted.{output_format}"
         
         logger.info(f"Converting STEP to {output_format.upper()} via CloudConvert...")
@@ -302,7 +337,8 @@ def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
             }
         }
         
-        job_response = requests.post(job_url, headers=headers, json=job_payload, timeout=30)
+        session = get_http_session()
+        job_response = session.post(job_url, headers=headers, json=job_payload, timeout=30)
         
         if not job_response.ok:
             error_text = job_response.text
@@ -362,24 +398,19 @@ def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
         if not upload_url:
             raise ValueError(f"Failed to get upload URL from CloudConvert job. Task result: {task_result}")
         
-        # Upload file using the form URL and fields
-        with open(step_file_path, 'rb') as f:
-            files = {'file': (step_file_path.name, f, 'application/octet-stream')}
-            # If upload_fields is empty, don't send it
-            upload_data = upload_fields if upload_fields else None
-            upload_response = requests.post(upload_url, data=upload_data, files=files, timeout=300)
-            upload_response.raise_for_status()
+        # Upload file using the form URL and fields, streamed from disk
+        upload_response = upload_multipart(upload_url, step_file_path, 'file', upload_fields)
+        upload_response.raise_for_status()
         
         logger.info(f"File uploaded to CloudConvert")
         
-        # Step 3: Wait for job to complete
-        max_wait = 300  # 5 minutes
-        start_time = time.time()
+        # Step 3: Wait for job to complete, polling with exponential backoff
+        poll_delays = backoff_delays(max_wait=300)  # 5 minutes
+        status_url = f"{CLOUDCONVERT_API_URL}/jobs/{job_id}"
         download_url = None
         
-        while time.time() - start_time < max_wait:
-            status_url = f"{CLOUDCONVERT_API_URL}/jobs/{job_id}"
-            status_response = requests.get(status_url, headers=headers, timeout=30)
+        while True:
+            status_response = session.get(status_url, headers=headers, timeout=30)
             
             if not status_response.ok:
                 error_text = status_response.text
@@ -414,27 +445,24 @@ def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
                         files = result.get('files', [])
                         if files and len(files) > 0:
                             download_url = files[0].get('url')
-                
-                if download_url:
-                    break
+                break
             elif job_status == 'error':
                 error_msg = job_data.get('message', 'Unknown error')
                 raise ValueError(f"CloudConvert conversion failed: {error_msg}")
             elif job_status in ['waiting', 'processing']:
                 # Still processing, wait and check again
-                time.sleep(2)
+                delay = next(poll_delays, None)
+                if delay is None:
+                    break
+                time.sleep(delay)
             else:
                 raise ValueError(f"Unexpected job status: {job_status}")
         
         if not download_url:
             raise ValueError("CloudConvert conversion timed out or failed to get download URL")
         
-        # Step 4: Download the converted file
-        download_response = requests.get(download_url, timeout=300)
-        download_response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            f.write(download_response.content)
+        # Step 4: Stream the converted file to disk
+        download_to_file(download_url, output_path)
         
         if not output_path.exists() or output_path.stat().st_size == 0:
             raise ValueError(f"Downloaded file is empty or not found: {output_path}")
@@ -450,13 +478,18 @@ def convert_step_via_cloudconvert(step_file_path, output_format='stl'):
         raise ValueError(f"STEP conversion via CloudConvert failed: {str(e)}")
 
 
-def convert_step_via_pythonocc(step_file_path, output_format='stl'):
+def convert_step_via_pythonocc(step_file_path, output_format='stl', triangle_budget=None, output_dir=None):
     """
     Convert STEP file to STL using pythonocc-core (OpenCASCADE).
     
+    Only needed when a file on disk is required; the mesh pipeline
+    tessellates STEP files in memory and never writes this STL.
+    
     Args:
         step_file_path: Path to STEP file
         output_format: 'stl' (pythonocc only supports STL export)
+        triangle_budget: Target triangle count (defaults to STEP_TRIANGLE_BUDGET)
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
     
     Returns:
         Path to converted file (temporary location)
@@ -473,41 +506,16 @@ def convert_step_via_pythonocc(step_file_path, output_format='stl'):
     
     try:
         # Create temporary output file
-        temp_dir = Path(tempfile.gettempdir()) / 'step_converter'
-        temp_dir.mkdir(exist_ok=True)
+        temp_dir = scratch_dir(output_dir)
         output_path = temp_dir / f"{step_file_path.stem}_converted.stl"
         
-        # Read STEP file
-        reader = STEPControl_Reader()
-        status = reader.ReadFile(str(step_file_path))
-        
-        if status != IFSelect_RetDone:
-            raise ValueError(f"Failed to read STEP file: {step_file_path}")
-        
-        # Transfer all roots
-        reader.TransferRoots()
-        nb_shapes = reader.NbShapes()
-        
-        if nb_shapes == 0:
-            raise ValueError("No shapes found in STEP file")
-        
-        # Get the first shape (or combine all shapes)
-        shape = reader.OneShape()
-        
-        # Mesh the shape with lower precision for simpler meshes
-        # Lower linear deflection = coarser mesh (1.0 for even simpler meshes)
-        # This reduces polygon count significantly for better web performance
-        # Higher value = fewer polygons = better performance
-        mesh = BRepMesh_IncrementalMesh(shape, 1.0, False, 1.0, True)
-        mesh.Perform()
-        
-        # Write to STL
-        writer = StlAPI_Writer()
-        writer.SetASCIIMode(False)  # Binary STL
-        success = writer.Write(shape, str(output_path))
-        
-        if not success:
-            raise ValueError(f"Failed to write STL file: {output_path}")
+        # Tessellate in memory and write the STL straight from the arrays
+        mesh = step_to_trimesh(
+            step_file_path,
+            workers=STEP_TESSELLATION_WORKERS,
+            triangle_budget=triangle_budget or STEP_TRIANGLE_BUDGET,
+        )
+        mesh.export(str(output_path), file_type='stl')
         
         if not output_path.exists() or output_path.stat().st_size == 0:
             raise ValueError(f"STL file was not created or is empty: {output_path}")
@@ -520,36 +528,45 @@ def convert_step_via_pythonocc(step_file_path, output_format='stl'):
         raise ValueError(f"STEP conversion via pythonocc-core failed: {str(e)}")
 
 
-def convert_step_file(step_file_path, output_format='stl'):
+def convert_step_file(step_file_path, output_format='stl', triangle_budget=None, output_dir=None):
     """
-    Convert STEP file to STL/OBJ using CloudConvert API.
+    Convert STEP file to STL/OBJ.
+    
+    Tries the configured converter backends in order (CAD_STEP_CONVERTERS:
+    pythonocc-core, FreeCAD service, local FreeCAD, FreeCAD Docker,
+    CloudConvert), skipping backends that are unavailable or whose circuit
+    breaker is open (see converters.py).
     
     Args:
         step_file_path: Path to STEP file
         output_format: 'stl' or 'obj'
+        triangle_budget: Target triangle count (defaults to STEP_TRIANGLE_BUDGET)
+        output_dir: Directory for the converted file (defaults to the current scratch workspace)
     
     Returns:
         Path to converted file (temporary location)
     """
-    # Only use CloudConvert if API key is configured
-    if not CLOUDCONVERT_API_KEY:
-        raise ValueError(
-            "CloudConvert API key not configured. Set CLOUDCONVERT_API_KEY environment variable.\n"
-            "Get your API key from: https://cloudconvert.com/"
-        )
-    
-    logger.info("Converting STEP file via CloudConvert...")
-    return convert_step_via_cloudconvert(step_file_path, output_format)
+    from .converters import get_converter_registry
+    return get_converter_registry().convert(step_file_path, output_format, triangle_budget, output_dir)
 
 
 class CADProcessor:
-    """Process CAD files (GLB/GLTF, STEP, STL, OBJ) and extract geometry data"""
+    """
+    Process CAD files (GLB/GLTF, STEP, STL, OBJ) and extract geometry data.
+    
+    Mesh work is delegated to a MeshPipeline, so geometry extraction and GLB
+    conversion share one loaded mesh and each stage runs only once.
+    """
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, triangle_budget=None):
         self.file_path = Path(file_path)
+        self.triangle_budget = triangle_budget or STEP_TRIANGLE_BUDGET  # Used when tessellating STEP files
         self.mesh = None
         self.geometry_data = {}
         self._converted_step_file = None  # Store converted OBJ/STL from STEP
+        self.used_fallback = False  # True when geometry_data holds placeholder values
+        self.lods = []  # LOD GLB files written by convert_to_glb
+        self.pipeline = None
         
     def process(self):
         """Process CAD file and extract geometry data"""
@@ -563,23 +580,21 @@ class CADProcessor:
         if extension not in supported_formats:
             raise ValueError(f"Unsupported file format. Supported: {', '.join(supported_formats)}. Got: {extension}")
         
-        # For STEP files, convert using pythonocc-core or FreeCAD first
+        # With pythonocc-core the pipeline tessellates STEP files in memory; load
+        # up front so a bad STEP file fails here like a failed conversion would.
+        # Otherwise convert to STL first and the pipeline loads the converted file.
         if extension in ['.step', '.stp']:
-            self._convert_step_file()
-            # After conversion, process the OBJ/STL file
-            if self._converted_step_file and self._converted_step_file.exists():
-                # Temporarily replace file_path with converted file for processing
-                original_path = self.file_path
-                self.file_path = self._converted_step_file
+            if PYTHONOCC_AVAILABLE and TRIMESH_AVAILABLE:
                 try:
-                    result = self._process_with_trimesh() if TRIMESH_AVAILABLE else self._process_basic()
-                    return result
-                finally:
-                    self.file_path = original_path
+                    self._get_pipeline().load()
+                except ValueError as e:
+                    raise ValueError(f"STEP file conversion failed: {str(e)}")
             else:
-                raise ValueError("STEP file conversion failed - no converted file available")
+                self._convert_step_file()
+                if not self._converted_step_file or not self._converted_step_file.exists():
+                    raise ValueError("STEP file conversion failed - no converted file available")
         
-        # Use trimesh for processing other formats
+        # Use trimesh for processing
         if TRIMESH_AVAILABLE:
             return self._process_with_trimesh()
         else:
@@ -591,7 +606,7 @@ class CADProcessor:
         try:
             # Convert STEP to STL (works with both pythonocc and FreeCAD)
             logger.info(f"Starting STEP to STL conversion for: {self.file_path}")
-            self._converted_step_file = convert_step_file(self.file_path, 'stl')
+            self._converted_step_file = convert_step_file(self.file_path, 'stl', self.triangle_budget)
             if not self._converted_step_file or not self._converted_step_file.exists():
                 raise ValueError(f"STEP conversion completed but output file not found: {self._converted_step_file}")
             logger.info(f"STEP file converted to STL: {self._converted_step_file} ({self._converted_step_file.stat().st_size / 1024:.2f} KB)")
@@ -599,67 +614,28 @@ class CADProcessor:
             logger.error(f"Failed to convert STEP file: {e}", exc_info=True)
             raise ValueError(f"STEP file conversion failed: {str(e)}")
     
+    def _get_pipeline(self):
+        """Create the mesh pipeline for this file (the converted STL for STEP files without pythonocc-core)"""
+        if self.pipeline is None:
+            source_path = self.file_path
+            if self.file_path.suffix.lower() in ['.step', '.stp'] and not PYTHONOCC_AVAILABLE:
+                if self._converted_step_file is None:
+                    self._convert_step_file()
+                source_path = self._converted_step_file
+            self.pipeline = MeshPipeline(
+                source_path,
+                lod_chain=LOD_CHAIN,
+                step_workers=STEP_TESSELLATION_WORKERS,
+                step_triangle_budget=self.triangle_budget,
+            )
+        return self.pipeline
+    
     def _process_with_trimesh(self):
         """Process CAD file using trimesh (supports GLB/GLTF, STL, OBJ)"""
         try:
-            extension = self.file_path.suffix.lower()
-            
-            # Load mesh with trimesh
-            # Trimesh can handle: GLB/GLTF, STL, OBJ natively
-            # STEP files are converted via CloudConvert or pre-converted before reaching here
-            try:
-                self.mesh = trimesh.load(str(self.file_path))
-            except Exception as load_error:
-                logger.error(f"Failed to load file with trimesh: {load_error}")
-                raise ValueError(f"Failed to load {extension} file: {load_error}")
-            
-            # Handle scene (multiple meshes)
-            if isinstance(self.mesh, trimesh.Scene):
-                # Combine all meshes
-                mesh_list = []
-                for node_name in self.mesh.graph.nodes_geometry:
-                    transform, geometry_name = self.mesh.graph[node_name]
-                    geometry = self.mesh.geometry[geometry_name]
-                    if isinstance(geometry, trimesh.Trimesh):
-                        mesh_list.append(geometry.copy())
-                if mesh_list:
-                    self.mesh = trimesh.util.concatenate(mesh_list)
-            
-            # Handle single mesh
-            if not isinstance(self.mesh, trimesh.Trimesh):
-                raise ValueError(f"Could not extract mesh from file. Got type: {type(self.mesh)}")
-            
-            # Simplify mesh early for better performance
-            # Target: 500 faces for maximum smoothness
-            target_faces = 500
-            if len(self.mesh.faces) > target_faces:
-                try:
-                    logger.info(f"Simplifying mesh during processing: {len(self.mesh.faces)} -> {target_faces} faces")
-                    simplified = self.mesh.simplify_quadric_decimation(face_count=target_faces)
-                    if simplified is not None and len(simplified.faces) > 0:
-                        self.mesh = simplified
-                        logger.info(f"Mesh simplified to {len(self.mesh.faces)} faces")
-                except Exception as e:
-                    logger.warning(f"Early simplification failed: {e}, continuing with original")
-            
-            if not hasattr(self.mesh, 'bounds'):
-                raise ValueError("Could not extract mesh bounds")
-            
-            bounds = self.mesh.bounds
-            center = self.mesh.centroid
-            volume = self.mesh.volume if hasattr(self.mesh, 'volume') else 0.0
-            
-            self.geometry_data = {
-                'bounding_box': {
-                    'min': bounds[0].tolist(),
-                    'max': bounds[1].tolist(),
-                    'center': center.tolist(),
-                },
-                'volume': abs(volume),
-                'center': center.tolist(),
-                'connection_points': self._extract_connection_points(),
-            }
-            
+            pipeline = self._get_pipeline()
+            self.geometry_data = pipeline.analyze()
+            self.mesh = pipeline.mesh
             return self.geometry_data
             
         except Exception as e:
@@ -671,18 +647,7 @@ class CADProcessor:
         connection_points = []
         try:
             if self.mesh and hasattr(self.mesh, 'bounds'):
-                bounds = self.mesh.bounds
-                center = self.mesh.centroid
-                
-                # Extract bounding box connection points
-                connection_points = [
-                    {'position': bounds[0].tolist(), 'normal': [0, 0, -1], 'side': 'bottom'},
-                    {'position': bounds[1].tolist(), 'normal': [0, 0, 1], 'side': 'top'},
-                    {'position': [bounds[0][0], bounds[0][1], center[2]], 'normal': [-1, 0, 0], 'side': 'left'},
-                    {'position': [bounds[1][0], bounds[1][1], center[2]], 'normal': [1, 0, 0], 'side': 'right'},
-                    {'position': [center[0], bounds[0][1], center[2]], 'normal': [0, -1, 0], 'side': 'front'},
-                    {'position': [center[0], bounds[1][1], center[2]], 'normal': [0, 1, 0], 'side': 'back'},
-                ]
+                connection_points = extract_connection_points(self.mesh.bounds, self.mesh.centroid)
         except Exception as e:
             logger.error(f"Error extracting connection points from mesh: {e}")
         
@@ -691,6 +656,7 @@ class CADProcessor:
     def _process_basic(self):
         """Basic fallback processing when trimesh is not available"""
         logger.warning(f"Using basic processing for {self.file_path}")
+        self.used_fallback = True
         # Return default values
         self.geometry_data = {
             'bounding_box': {
@@ -705,7 +671,12 @@ class CADProcessor:
         return self.geometry_data
     
     def convert_to_glb(self, output_path):
-        """Convert CAD file to GLB format for web visualization"""
+        """
+        Convert CAD file to GLB format for web visualization.
+        
+        Level 0 of the LOD chain is written to output_path, coarser levels
+        next to it with a _lodN suffix; all levels are recorded in self.lods.
+        """
         output_path = Path(output_path)
         extension = self.file_path.suffix.lower()
         
@@ -716,126 +687,127 @@ class CADProcessor:
         if extension in ['.glb', '.gltf']:
             shutil.copy(self.file_path, output_path)
             logger.info(f"Copied GLB/GLTF file to {output_path}")
+            # GLB/GLTF uploads are served as-is, as a single level
+            face_count = None
+            if TRIMESH_AVAILABLE and isinstance(self.mesh, trimesh.Trimesh):
+                face_count = len(self.mesh.faces)
+            self.lods = [{
+                'level': 0,
+                'face_count': face_count,
+                'geometric_error': 0.0,
+                'path': output_path,
+                'size': output_path.stat().st_size,
+            }]
             return output_path
-
-        # For STEP files, use the converted OBJ/STL file if available
-        if extension in ['.step', '.stp'] and self._converted_step_file and self._converted_step_file.exists():
-            # Use the converted file for GLB conversion
-            original_path = self.file_path
-            original_mesh = self.mesh
-            self.file_path = self._converted_step_file
-            try:
-                # Load mesh from converted file if not already loaded
-                if self.mesh is None:
-                    if not TRIMESH_AVAILABLE:
-                        raise ValueError("trimesh is required for format conversion")
-                    try:
-                        self.mesh = trimesh.load(str(self._converted_step_file))
-                    except Exception as e:
-                        raise ValueError(f"Failed to load converted file for GLB conversion: {e}")
-                result = self._convert_mesh_to_glb(output_path)
-                return result
-            finally:
-                self.file_path = original_path
-                self.mesh = original_mesh
-        
-        # For other formats (STL, OBJ), convert to GLB using trimesh
+        
+        # For other formats (STEP, STL, OBJ), convert to GLB using the mesh pipeline
         if not TRIMESH_AVAILABLE:
             raise ValueError("trimesh is required for format conversion")
         
-        if self.mesh is None:
-            # Load mesh if not already loaded
-            try:
-                self.mesh = trimesh.load(str(self.file_path))
-            except Exception as e:
-                raise ValueError(f"Failed to load file for conversion: {e}")
-        
-        return self._convert_mesh_to_glb(output_path)
-    
-    def _convert_mesh_to_glb(self, output_path):
-        """Convert loaded mesh to GLB format with simplification for web performance"""
-        if not TRIMESH_AVAILABLE:
-            raise ValueError("trimesh is required for GLB conversion")
-        
-        if self.mesh is None:
-            raise ValueError("No mesh loaded for conversion")
-        
-        # Handle scene (multiple meshes)
-        if isinstance(self.mesh, trimesh.Scene):
-            # Combine all meshes
-            mesh_list = []
-            for node_name in self.mesh.graph.nodes_geometry:
-                transform, geometry_name = self.mesh.graph[node_name]
-                geometry = self.mesh.geometry[geometry_name]
-                if isinstance(geometry, trimesh.Trimesh):
-                    mesh_list.append(geometry.copy())
-            if mesh_list:
-                self.mesh = trimesh.util.concatenate(mesh_list)
-        
-        # Ensure we have a Trimesh object
-        if not isinstance(self.mesh, trimesh.Trimesh):
-            raise ValueError(f"Cannot convert to GLB. Got type: {type(self.mesh)}")
-        
-        # Simplify mesh for web performance
-        # Target face count: 500 faces for maximum smoothness
-        # This provides acceptable visual quality while ensuring very smooth rendering
-        target_face_count = 500
-        original_face_count = len(self.mesh.faces)
-        
-        if original_face_count > target_face_count:
-            try:
-                logger.info(f"Simplifying mesh: {original_face_count} faces -> target: {target_face_count} faces")
-                
-                # Use quadric decimation for high-quality simplification
-                # Simplify the mesh
-                simplified = self.mesh.simplify_quadric_decimation(face_count=target_face_count)
-                
-                if simplified is not None and len(simplified.faces) > 0:
-                    self.mesh = simplified
-                    logger.info(f"Mesh simplified: {original_face_count} -> {len(self.mesh.faces)} faces ({len(self.mesh.faces)/original_face_count*100:.1f}% of original)")
-                else:
-                    logger.warning(f"Simplification failed, using original mesh with {original_face_count} faces")
-            except Exception as e:
-                logger.warning(f"Mesh simplification failed: {e}, using original mesh")
-                # Continue with original mesh if simplification fails
-        
-        # Export to GLB
+        pipeline = self._get_pipeline()
         try:
-            extension = self.file_path.suffix.lower()
-            # Trimesh can export to GLB directly
-            self.mesh.export(str(output_path), file_type='glb')
-            logger.info(f"Converted {extension} file to GLB: {output_path} ({len(self.mesh.faces)} faces)")
-            return output_path
+            self.lods = pipeline.export(output_path)
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Failed to export to GLB: {e}")
             raise ValueError(f"Failed to convert to GLB: {e}")
+        self.mesh = pipeline.mesh
+        
+        logger.info(
+            f"Converted {extension} file to GLB: {output_path} "
+            f"(LOD face counts: {[lod['face_count'] for lod in self.lods]})"
+        )
+        logger.info(f"Mesh pipeline for {self.file_path.name}: {pipeline.format_report()}")
+        return output_path
 
 
-def process_cad_file(file_path, extract_geometry=True, copy_glb_to=None):
+def conversion_parameters(file_path, triangle_budget=None):
+    """
+    Pipeline parameters that influence the conversion output.
+    Used together with the content hash as the conversion cache key.
+    """
+    return {
+        'format': Path(file_path).suffix.lower(),
+        'lod_chain': [list(level) for level in LOD_CHAIN],
+        'step_relative_deflection': RELATIVE_DEFLECTION,
+        'step_triangle_budget': triangle_budget or STEP_TRIANGLE_BUDGET,
+        'pipeline_version': PIPELINE_VERSION,
+    }
+
+
+def process_cad_file(file_path, extract_geometry=True, copy_glb_to=None, use_cache=True, triangle_budget=None):
     """
     Main function to process a CAD file (GLB/GLTF, STEP, STL, OBJ).
     Converts all formats to GLB for web visualization.
     
+    Results are stored in the content-addressed conversion cache, so processing
+    the same file again with the same pipeline parameters skips conversion.
+    
     Args:
         file_path: Path to CAD file (GLB/GLTF, STEP, STL, OBJ)
         extract_geometry: Whether to extract geometry data
         copy_glb_to: Optional output path for GLB file (converted if needed)
+        use_cache: Whether to read from and write to the conversion cache
+        triangle_budget: Target triangle count for STEP tessellation
+            (defaults to STEP_TRIANGLE_BUDGET)
     
     Returns:
-        dict with geometry_data and optionally glb_path
+        dict with geometry_data and optionally glb_path and lods. lods lists
+        one dict per level of detail (level, face_count, geometric_error,
+        path, size); level 0 is the file at glb_path. When the mesh pipeline
+        ran, pipeline_stats holds its per-stage timings and peak RSS.
     """
-    processor = CADProcessor(file_path)
-    
     result = {
         'geometry_data': None,
         'glb_path': None,
+        'lods': [],
     }
     
-    if extract_geometry:
-        result['geometry_data'] = processor.process()
-    
-    if copy_glb_to:
-        result['glb_path'] = processor.convert_to_glb(copy_glb_to)
+    cache = get_conversion_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        try:
+            cache_key = build_cache_key(file_sha256(file_path), conversion_parameters(file_path, triangle_budget))
+            cached = cache.get(cache_key)
+        except OSError as e:
+            logger.warning(f"Conversion cache lookup failed for {file_path}: {e}")
+            cached = None
+        
+        if cached:
+            if extract_geometry:
+                result['geometry_data'] = cached['geometry_data']
+            if copy_glb_to:
+                output_path = Path(copy_glb_to)
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                for lod in cached['lods']:
+                    path = lod_path(output_path, lod['level'])
+                    shutil.copyfile(lod['path'], path)
+                    result['lods'].append({**lod, 'path': path})
+                result['glb_path'] = output_path
+            return result
+    
+    processor = CADProcessor(file_path, triangle_budget)
+    
+    # Intermediate files (STL converted from STEP) live in a scratch workspace
+    # that is removed once the GLB levels are written
+    with scratch_workspace(expected_size=Path(file_path).stat().st_size * SCRATCH_SIZE_FACTOR):
+        if extract_geometry:
+            result['geometry_data'] = processor.process()
+        
+        if copy_glb_to:
+            result['glb_path'] = processor.convert_to_glb(copy_glb_to)
+            result['lods'] = processor.lods
+    
+    if processor.pipeline is not None:
+        result['pipeline_stats'] = processor.pipeline.report()
+    
+    # Only complete, non-placeholder results are worth caching
+    if cache_key and result['geometry_data'] and result['lods'] and not processor.used_fallback:
+        try:
+            cache.put(cache_key, result['geometry_data'], result['lods'])
+        except OSError as e:
+            logger.warning(f"Failed to store conversion result in cache: {e}")
     
     return result
 
@@ -0,0 +1,244 @@
+"""
+Per-job scratch workspaces for CAD processing.
+
+Every conversion gets its own directory, so concurrent jobs working on files
+with the same name never see each other's intermediate STL/OBJ/GLB files,
+and the directory is removed when the job ends, whether it succeeded or not.
+
+Workspaces are created on a RAM-backed tmpfs (/dev/shm) when the expected
+size fits comfortably in its free space, otherwise on disk under the system
+temp directory; CAD_SCRATCH_DIR pins them to one location. Directory names
+carry the owning host and process id, so sweep_stale_workspaces() (the
+sweep_scratch management command) can remove directories left behind by
+killed workers.
+"""
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_PREFIX = 'job-'
+
+# RAM-backed filesystem preferred for scratch files
+TMPFS_PATH = Path('/dev/shm')
+
+# Fraction of the tmpfs free space a single workspace may plan to use
+TMPFS_MAX_SHARE = 0.5
+
+# Shared output directory of the converters before workspaces existed
+LEGACY_SCRATCH_DIR = Path(tempfile.gettempdir()) / 'step_converter'
+
+_active = threading.local()
+
+
+class WorkspaceQuotaExceeded(ValueError):
+    """Raised when a workspace grows past its size quota"""
+
+
+def _workspace_prefix():
+    return f'{WORKSPACE_PREFIX}{os.getpid()}@{socket.gethostname()}-'
+
+
+def _disk_root():
+    return Path(tempfile.gettempdir()) / 'cadbuilder-scratch'
+
+
+def _tmpfs_root():
+    return TMPFS_PATH / 'cadbuilder-scratch'
+
+
+def scratch_roots():
+    """Directories workspaces may be created in"""
+    configured = getattr(settings, 'CAD_SCRATCH_DIR', None)
+    if configured:
+        return [Path(configured)]
+    return [_tmpfs_root(), _disk_root()]
+
+
+def _choose_root(expected_size):
+    configured = getattr(settings, 'CAD_SCRATCH_DIR', None)
+    if configured:
+        return Path(configured)
+    if getattr(settings, 'CAD_SCRATCH_USE_TMPFS', True) and TMPFS_PATH.is_dir():
+        try:
+            usage = shutil.disk_usage(TMPFS_PATH)
+        except OSError:
+            usage = None
+        if usage is not None and expected_size <= usage.free * TMPFS_MAX_SHARE:
+            return _tmpfs_root()
+    return _disk_root()
+
+
+def directory_size(path):
+    """Total size in bytes of the files below path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    """
+    A unique scratch directory for one job.
+
+    Args:
+        expected_size: bytes the job is expected to write (decides tmpfs vs disk)
+        quota: bytes the workspace may hold; checked whenever a path is handed out
+    """
+
+    def __init__(self, expected_size=None, quota=None):
+        self.quota = quota or getattr(settings, 'CAD_SCRATCH_QUOTA', 2 * 1024 * 1024 * 1024)
+        root = _choose_root(expected_size or self.quota)
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=_workspace_prefix(), dir=root))
+
+    def file(self, name):
+        """Path for a new scratch file (the workspace's quota is checked first)"""
+        self.check_quota()
+        return self.path / name
+
+    def subdir(self, name):
+        """Create and return a subdirectory of the workspace"""
+        self.check_quota()
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def check_quota(self):
+        used = directory_size(self.path)
+        if used > self.quota:
+            raise WorkspaceQuotaExceeded(
+                f"Scratch workspace uses {used / (1024 * 1024):.0f} MB, "
+                f"over its {self.quota / (1024 * 1024):.0f} MB quota"
+            )
+        return used
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+@contextmanager
+def scratch_workspace(expected_size=None, quota=None):
+    """
+    Create a Workspace for the duration of a with block, then delete it.
+
+    While the block runs, the workspace is the current one of this thread
+    (see scratch_dir).
+    """
+    workspace = Workspace(expected_size, quota)
+    stack = getattr(_active, 'stack', None)
+    if stack is None:
+        stack = _active.stack = []
+    stack.append(workspace)
+    try:
+        yield workspace
+    finally:
+        stack.remove(workspace)
+        workspace.cleanup()
+
+
+def current_workspace():
+    """The innermost workspace opened by this thread, or None"""
+    stack = getattr(_active, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def scratch_dir(output_dir=None):
+    """
+    Directory for a converter's output file.
+
+    The given directory, else the current thread's workspace, else a new
+    unique directory under the scratch root (left to the janitor).
+    """
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir
+    workspace = current_workspace()
+    if workspace is not None:
+        return workspace.path
+    root = _choose_root(0)
+    root.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=_workspace_prefix(), dir=root))
+
+
+def _owner_alive(directory_name):
+    """Whether the process that created a workspace still runs (True when unknown)"""
+    owner = directory_name[len(WORKSPACE_PREFIX):].rsplit('-', 1)[0]
+    pid, _, host = owner.partition('@')
+    if host != socket.gethostname():
+        # Created on another host sharing CAD_SCRATCH_DIR; only its age counts
+        return True
+    try:
+        pid = int(pid)
+    except ValueError:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_stale_workspaces(max_age=None, dry_run=False):
+    """
+    Remove workspaces whose process is gone or that are older than max_age
+    seconds, plus files in the legacy shared converter directory older than
+    max_age.
+
+    Returns:
+        (removed paths, bytes freed)
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'CAD_SCRATCH_MAX_AGE', 6 * 3600)
+    cutoff = time.time() - max_age
+    candidates = []
+    for root in scratch_roots():
+        if not root.is_dir():
+            continue
+        for entry in root.iterdir():
+            if not entry.name.startswith(WORKSPACE_PREFIX):
+                continue
+            try:
+                modified = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if modified < cutoff or not _owner_alive(entry.name):
+                candidates.append(entry)
+    if LEGACY_SCRATCH_DIR.is_dir():
+        for entry in LEGACY_SCRATCH_DIR.iterdir():
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    candidates.append(entry)
+            except FileNotFoundError:
+                continue
+
+    removed = []
+    freed = 0
+    for path in candidates:
+        size = directory_size(path) if path.is_dir() else path.stat().st_size
+        if not dry_run:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+        removed.append(path)
+        freed += size
+    if removed and not dry_run:
+        logger.info(f"Removed {len(removed)} stale scratch entries ({freed / (1024 * 1024):.1f} MB)")
+    return removed, freed
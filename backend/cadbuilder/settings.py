@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'projects',
     'cad_processing',
     'converter',  # STEP to GLB converter API
+    'jobqueue',  # Database-backed background jobs
 ]
 
 MIDDLEWARE = [
@@ -251,6 +252,8 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'if-modified-since',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -268,7 +271,7 @@ CORS_ALLOW_METHODS = [
 ]
 
 # Expose headers to frontend
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'ETag', 'Last-Modified']
 
 # CSRF settings - trust the same origins as CORS
 CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS.copy()
@@ -308,6 +311,43 @@ SPECTACULAR_SETTINGS = {
 # Celery Configuration (optional)
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+# Run tasks in the calling process instead of sending them (tests); CELERY_BROKER_URL=memory://
+# keeps them in memory instead
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+# Conversions are routed to cad_heavy / cad_light / cad_bulk when queued (components/tasks.py)
+CELERY_TASK_ROUTES = {'components.tasks.process_component_async': {'queue': 'cad_light'}}
+# Acknowledge tasks after they ran and reserve one task per worker process at a time:
+# conversions are long, and an unacknowledged task is redelivered if its worker goes away
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Cache: Redis shared by all processes when CACHE_URL is set (e.g. redis://redis:6379/1),
+# otherwise local memory per process (development, tests)
+CACHE_URL = os.environ.get('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cadbuilder',
+        }
+    }
+
+# Catalog response cache (components/catalog.py): seconds a rendered response is kept, and
+# seconds concurrent requests wait for the one computing a missing response. On by default
+# with a shared cache only: writes from other processes (web workers, conversion workers)
+# cannot invalidate a local-memory cache, so enable it there only where one process does
+# everything (tests)
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', str(bool(CACHE_URL))) == 'True'
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+CATALOG_CACHE_FILL_WAIT = int(os.environ.get('CATALOG_CACHE_FILL_WAIT', 5))
 
 # CAD File Settings - Supports GLB/GLTF, STEP, STL, OBJ
 # STEP files are converted using FreeCAD Docker (deployment-friendly)
@@ -317,6 +357,16 @@ CAD_ALLOWED_EXTENSIONS = ['.glb', '.gltf', '.step', '.stp', '.stl', '.obj']
 GLB_UPLOAD_MAX_SIZE = CAD_UPLOAD_MAX_SIZE
 GLB_ALLOWED_EXTENSIONS = ['.glb', '.gltf']
 
+# Resumable uploads (POST /api/components/uploads/): largest chunk accepted per PATCH,
+# and age in seconds after which unfinished upload sessions are purged (purge_uploads command)
+CAD_UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get('CAD_UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024))
+CAD_UPLOAD_SESSION_MAX_AGE = int(os.environ.get('CAD_UPLOAD_SESSION_MAX_AGE', 24 * 3600))
+
+# Component search (GET /api/components/search/): milliseconds the ranked query may take on
+# PostgreSQL before unranked matches are returned instead (0 = no limit), and most results
+CAD_SEARCH_TIME_BUDGET = int(os.environ.get('CAD_SEARCH_TIME_BUDGET', 20))
+CAD_SEARCH_MAX_RESULTS = int(os.environ.get('CAD_SEARCH_MAX_RESULTS', 50))
+
 # STEP File Conversion Settings - FreeCAD Docker (deployment-friendly)
 # Option 1: Use FreeCAD Docker container via HTTP API
 FREECAD_DOCKER_URL = os.environ.get('FREECAD_DOCKER_URL', None)  # e.g., 'http://freecad-service:8001'
@@ -326,6 +376,79 @@ FREECAD_DOCKER_IMAGE = os.environ.get('FREECAD_DOCKER_IMAGE', 'freecad-converter
 # CloudConvert API for STEP conversion
 # Set CLOUDCONVERT_API_KEY environment variable
 CLOUDCONVERT_API_KEY = os.environ.get('CLOUDCONVERT_API_KEY', None)
+CLOUDCONVERT_API_URL = os.environ.get('CLOUDCONVERT_API_URL', 'https://api.cloudconvert.com/v2')
+
+# Pooled HTTP client used by the remote converters (FreeCAD service, CloudConvert)
+CAD_HTTP_POOL_MAXSIZE = int(os.environ.get('CAD_HTTP_POOL_MAXSIZE', 16))  # keep-alive connections per host
+CAD_HTTP_RETRIES = int(os.environ.get('CAD_HTTP_RETRIES', 3))  # retries of idempotent requests
+
+# STEP converter backends, tried in this order when a STEP file has to be converted
+# to STL/OBJ (pythonocc, freecad_service, freecad_local, freecad_docker, cloudconvert)
+CAD_STEP_CONVERTERS = [
+    name.strip() for name in os.environ.get(
+        'CAD_STEP_CONVERTERS', 'pythonocc,freecad_service,freecad_local,freecad_docker,cloudconvert'
+    ).split(',') if name.strip()
+]
+CAD_CONVERTER_PROBE_TTL = int(os.environ.get('CAD_CONVERTER_PROBE_TTL', 60))  # seconds a probe result is reused
+# Probe the converters in the background when the app loads, so the first upload does not wait on them
+CAD_CONVERTER_PROBE_ON_STARTUP = os.environ.get('CAD_CONVERTER_PROBE_ON_STARTUP', 'True') == 'True'
+# Consecutive timeouts/connection errors before a backend is skipped for CAD_CONVERTER_COOLDOWN seconds
+CAD_CONVERTER_FAILURE_THRESHOLD = int(os.environ.get('CAD_CONVERTER_FAILURE_THRESHOLD', 3))
+CAD_CONVERTER_COOLDOWN = int(os.environ.get('CAD_CONVERTER_COOLDOWN', 300))
+
+# Content-addressed conversion cache (GLB + geometry data keyed by file hash)
+CAD_CONVERSION_CACHE_ENABLED = os.environ.get('CAD_CONVERSION_CACHE_ENABLED', 'True') == 'True'
+CAD_CONVERSION_CACHE_DIR = Path(os.environ.get('CAD_CONVERSION_CACHE_DIR', BASE_DIR / 'cache' / 'conversions'))
+CAD_CONVERSION_CACHE_MAX_SIZE = int(os.environ.get('CAD_CONVERSION_CACHE_MAX_SIZE', 2 * 1024 * 1024 * 1024))  # 2 GB
+
+# Conversion executor: uploads are converted in a pool of worker processes
+# instead of the request. Set CAD_CONVERSION_EXECUTOR_WORKERS=0 to convert inline.
+CAD_CONVERSION_EXECUTOR_WORKERS = int(os.environ.get('CAD_CONVERSION_EXECUTOR_WORKERS', 2))
+# Worker processes are replaced after this many jobs to contain native memory leaks
+CAD_CONVERSION_EXECUTOR_MAX_JOBS_PER_WORKER = int(os.environ.get('CAD_CONVERSION_EXECUTOR_MAX_JOBS_PER_WORKER', 20))
+# Queued + running jobs per web process before uploads are rejected with 503
+CAD_CONVERSION_EXECUTOR_MAX_PENDING = int(os.environ.get('CAD_CONVERSION_EXECUTOR_MAX_PENDING', 32))
+# Where component conversions run: 'executor' (process pool of the web process) or
+# 'jobqueue' (database job queue, processed by `manage.py run_job_worker`)
+CAD_PROCESSING_BACKEND = os.environ.get('CAD_PROCESSING_BACKEND', 'executor')
+# Components pending or processing this long are failed: their job was lost, e.g. with
+# a restarted web process (`manage.py fail_stuck_components`; with the executor backend
+# also swept at most every CAD_PROCESSING_SWEEP_INTERVAL seconds)
+CAD_PROCESSING_STUCK_TIMEOUT = int(os.environ.get('CAD_PROCESSING_STUCK_TIMEOUT', 3 * 3600))  # seconds
+CAD_PROCESSING_SWEEP_INTERVAL = int(os.environ.get('CAD_PROCESSING_SWEEP_INTERVAL', 600))  # seconds
+CAD_CONVERSION_TIME_LIMIT = int(os.environ.get('CAD_CONVERSION_TIME_LIMIT', 600))  # seconds per job
+CAD_CONVERSION_MEMORY_LIMIT = int(os.environ.get('CAD_CONVERSION_MEMORY_LIMIT', 4 * 1024 * 1024 * 1024)) or None  # bytes, 0 = unlimited
+# Per-job scratch workspaces for conversions: on /dev/shm when the job fits, else the
+# system temp directory; CAD_SCRATCH_DIR pins them to one directory
+CAD_SCRATCH_DIR = os.environ.get('CAD_SCRATCH_DIR') or None
+CAD_SCRATCH_USE_TMPFS = os.environ.get('CAD_SCRATCH_USE_TMPFS', 'True') == 'True'
+CAD_SCRATCH_QUOTA = int(os.environ.get('CAD_SCRATCH_QUOTA', 2 * 1024 * 1024 * 1024))  # bytes per workspace
+# Workspaces older than this are removed by `manage.py sweep_scratch`
+CAD_SCRATCH_MAX_AGE = int(os.environ.get('CAD_SCRATCH_MAX_AGE', 6 * 3600))  # seconds
+# Processes used to tessellate the solids of a STEP assembly in parallel (0 = CPU count, 1 = serial)
+CAD_STEP_TESSELLATION_WORKERS = int(os.environ.get('CAD_STEP_TESSELLATION_WORKERS', 0)) or None
+# Triangles a tessellated STEP component aims for; deflection is derived from each
+# part's size and coarsened when the assembly would exceed this (components can override)
+CAD_STEP_TRIANGLE_BUDGET = int(os.environ.get('CAD_STEP_TRIANGLE_BUDGET', 250000))
+
+# Database job queue: seconds a claimed job is leased to its worker (renewed by heartbeats),
+# runs per job, and retry backoff (exponential from the base delay, capped, with jitter)
+JOBQUEUE_LEASE = int(os.environ.get('JOBQUEUE_LEASE', 120))
+JOBQUEUE_MAX_ATTEMPTS = int(os.environ.get('JOBQUEUE_MAX_ATTEMPTS', 3))
+JOBQUEUE_RETRY_BASE_DELAY = int(os.environ.get('JOBQUEUE_RETRY_BASE_DELAY', 10))
+JOBQUEUE_RETRY_MAX_DELAY = int(os.environ.get('JOBQUEUE_RETRY_MAX_DELAY', 600))
+JOBQUEUE_KEEP_FINISHED = int(os.environ.get('JOBQUEUE_KEEP_FINISHED', 7 * 24 * 3600))  # seconds, see purge_jobs
+
+# Celery conversion tasks: hard time limits of the heavy (STEP, large files) and light queues;
+# the soft limit, which records the failure on the component, fires the margin earlier
+CAD_CELERY_HEAVY_FILE_SIZE = int(os.environ.get('CAD_CELERY_HEAVY_FILE_SIZE', 25 * 1024 * 1024))  # bytes
+CAD_CELERY_HEAVY_TIME_LIMIT = int(os.environ.get('CAD_CELERY_HEAVY_TIME_LIMIT', CAD_CONVERSION_TIME_LIMIT))
+CAD_CELERY_LIGHT_TIME_LIMIT = int(os.environ.get('CAD_CELERY_LIGHT_TIME_LIMIT', 120))
+CAD_CELERY_SOFT_TIME_LIMIT_MARGIN = int(os.environ.get('CAD_CELERY_SOFT_TIME_LIMIT_MARGIN', 30))
+# Retries after backend timeouts/connection errors: exponential backoff in seconds, capped, with jitter
+CAD_CELERY_MAX_RETRIES = int(os.environ.get('CAD_CELERY_MAX_RETRIES', 3))
+CAD_CELERY_RETRY_BACKOFF = int(os.environ.get('CAD_CELERY_RETRY_BACKOFF', 30))
+CAD_CELERY_RETRY_BACKOFF_MAX = int(os.environ.get('CAD_CELERY_RETRY_BACKOFF_MAX', 600))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
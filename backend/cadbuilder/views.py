@@ -5,15 +5,17 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie
+from cad_processing.converters import get_converter_registry
 
 
 @require_http_methods(["GET"])
 def health_check(request):
-    """Health check endpoint"""
+    """Health check endpoint (includes the STEP converter states of this process)"""
     return JsonResponse({
         'status': 'healthy',
         'service': 'CAD Builder API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'converters': get_converter_registry().status(),
     })
 
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Component, ComponentCategory, ConnectionPoint
+from .dispatch import dispatch_processing, processing_suppressed
+from .models import Component, ComponentCategory, ConnectionPoint, ProcessedAsset, UploadSession
 
 
 @admin.register(ComponentCategory)
@@ -21,13 +22,41 @@ class ComponentAdmin(admin.ModelAdmin):
     search_fields = ['name']
     readonly_fields = [
         'processing_status', 'processing_error', 'created_at', 'updated_at',
-        'bounding_box', 'center', 'volume', 'mountable_sides', 'supported_orientations', 'compatible_types'
+        'bounding_box', 'center', 'volume', 'mountable_sides', 'supported_orientations', 'compatible_types',
+        'lod_files', 'original_sha256', 'glb_sha256', 'asset'
     ]
     
     fields = (
         'name', 'category_label', 'original_file',
-        'glb_file', 'bounding_box', 'center', 'volume',
+        'glb_file', 'lod_files', 'original_sha256', 'glb_sha256', 'asset', 'bounding_box', 'center', 'volume',
         'mountable_sides', 'supported_orientations', 'compatible_types',
         'processing_status', 'processing_error', 'created_at', 'updated_at'
     )
+    
+    def save_model(self, request, obj, form, change):
+        file_changed = not change or 'original_file' in form.changed_data
+        if change and file_changed:
+            obj.file_version += 1
+            obj.original_sha256 = ''
+            obj.processing_status = 'pending'
+            obj.processing_error = None
+        with processing_suppressed():
+            super().save_model(request, obj, form, change)
+        if file_changed:
+            # Queued when the admin's transaction commits, the page does not wait for the conversion
+            dispatch_processing(obj)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'status', 'offset', 'size', 'component', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['filename']
+    readonly_fields = ['id', 'offset', 'parts', 'sha256', 'created_at', 'updated_at']
+
 
+@admin.register(ProcessedAsset)
+class ProcessedAssetAdmin(admin.ModelAdmin):
+    list_display = ['original_file', 'ref_count', 'created_at']
+    search_fields = ['original_sha256', 'key']
+    readonly_fields = [field.name for field in ProcessedAsset._meta.fields]
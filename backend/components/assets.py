@@ -0,0 +1,184 @@
+"""
+Content-hash de-duplication of component files.
+
+Every processed component records the SHA-256 of its original file and of
+its GLB. The conversion result is stored once per distinct original (and set
+of conversion parameters) as a ProcessedAsset; a component uploaded with a
+file that was processed before takes a reference to that asset instead of
+being converted, and its uploaded copy of the original is dropped in favour
+of the asset's. The asset's files are deleted when its last component is
+deleted or reprocessed with a different file.
+"""
+import hashlib
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from cad_processing.cache import HASH_CHUNK_SIZE, build_cache_key
+from cad_processing.utils import conversion_parameters
+from .models import ProcessedAsset
+
+logger = logging.getLogger(__name__)
+
+
+def field_file_sha256(field_file):
+    """Return the hex SHA-256 digest of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def uploaded_file_sha256(uploaded_file):
+    """Return the hex SHA-256 digest of an UploadedFile"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def asset_key(component):
+    """
+    Key of the asset a component's original_file converts to.
+
+    Computes and records component.original_sha256 when it is not known yet.
+    """
+    if not component.original_sha256:
+        component.original_sha256 = field_file_sha256(component.original_file)
+    return build_cache_key(
+        component.original_sha256,
+        conversion_parameters(component.original_file.name, component.triangle_budget),
+    )
+
+
+def asset_file_names(asset):
+    names = [asset.original_file.name, asset.glb_file.name]
+    names += [entry['name'] for entry in asset.lod_files or []]
+    return [name for name in names if name]
+
+
+def delete_stored_files(storage, names, keep=()):
+    """Delete files from storage, skipping the names in keep"""
+    for name in set(names) - set(keep):
+        if not name:
+            continue
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete {name}: {e}")
+
+
+def use_asset_files(component, asset):
+    """
+    Point a component at an asset's files and geometry, without taking a
+    reference. The component's own copy of the original file is deleted when
+    it differs from the asset's. The component is not saved.
+    """
+    own_original = component.original_file.name
+    if own_original and own_original != asset.original_file.name:
+        delete_stored_files(component.original_file.storage, [own_original])
+    component.original_file.name = asset.original_file.name
+    component.glb_file.name = asset.glb_file.name
+    component.lod_files = asset.lod_files
+    component.bounding_box = asset.bounding_box
+    component.center = asset.center
+    component.volume = asset.volume
+    component.original_sha256 = asset.original_sha256
+    component.glb_sha256 = asset.glb_sha256
+    component.asset = asset
+
+
+def attach_asset(component, asset):
+    """
+    Take a reference to an asset and point the component at its files.
+
+    Returns:
+        False when the asset was deleted in the meantime, else True
+    """
+    if not ProcessedAsset.objects.filter(pk=asset.pk).update(ref_count=F('ref_count') + 1):
+        return False
+    use_asset_files(component, asset)
+    return True
+
+
+def reuse_processed_asset(component, key):
+    """
+    Attach the existing asset with the given key (see asset_key), if there is one.
+
+    A component already referencing that asset keeps its reference.
+
+    Returns:
+        The asset, or None when the file has not been processed before
+    """
+    if component.asset_id is not None and component.asset.key == key:
+        use_asset_files(component, component.asset)
+        return component.asset
+    for asset in ProcessedAsset.objects.filter(key=key):
+        if attach_asset(component, asset):
+            logger.info(
+                f"Component {component.id} reuses processed asset {asset.pk} "
+                f"(original sha256 {component.original_sha256[:12]})"
+            )
+            return asset
+    return None
+
+
+def create_asset(component, key):
+    """
+    Register a freshly processed component's files as a shared asset.
+
+    When another worker registered the same key first, the component is
+    attached to that asset instead and its own GLB files are deleted.
+
+    Returns:
+        The asset the component now references
+    """
+    try:
+        with transaction.atomic():
+            asset = ProcessedAsset.objects.create(
+                key=key,
+                original_sha256=component.original_sha256,
+                glb_sha256=component.glb_sha256,
+                original_file=component.original_file.name,
+                glb_file=component.glb_file.name,
+                lod_files=component.lod_files,
+                bounding_box=component.bounding_box,
+                center=component.center,
+                volume=component.volume,
+                ref_count=1,
+            )
+    except IntegrityError:
+        own_files = [component.glb_file.name] + [entry['name'] for entry in component.lod_files or []]
+        asset = ProcessedAsset.objects.get(key=key)
+        if attach_asset(component, asset):
+            delete_stored_files(component.glb_file.storage, own_files, keep=asset_file_names(asset))
+            return asset
+        raise
+    component.asset = asset
+    return asset
+
+
+def release_asset(asset_id, storage, keep=()):
+    """
+    Drop one reference to an asset; the last reference deletes its files.
+
+    Args:
+        asset_id: ProcessedAsset primary key (None is ignored)
+        storage: storage the asset's files live in
+        keep: file names still in use elsewhere, never deleted
+    """
+    if asset_id is None:
+        return
+    with transaction.atomic():
+        asset = ProcessedAsset.objects.select_for_update().filter(pk=asset_id).first()
+        if asset is None:
+            return
+        if asset.ref_count > 1:
+            ProcessedAsset.objects.filter(pk=asset_id).update(ref_count=F('ref_count') - 1)
+            return
+        names = asset_file_names(asset)
+        asset.delete()
+    logger.info(f"Deleting processed asset {asset_id}, its last component is gone")
+    transaction.on_commit(lambda: delete_stored_files(storage, names, keep=keep))
@@ -0,0 +1,204 @@
+"""
+Conditional GET and response caching for the catalog API.
+
+Catalog responses carry a strong ETag and Last-Modified derived from the
+CatalogVersion counter, which every component, connection point and
+category write bumps. A request whose If-None-Match (or If-Modified-Since)
+still matches is answered with 304 Not Modified after reading that one
+row, before the view queries or serializes anything. Last-Modified is left
+out during the second of the last write, which it cannot tell apart from a
+later write in the same second.
+
+The version is read before the view runs, so a write committing in between
+can at worst pair the old ETag with new data; the next request then gets
+the full response again, never a stale 304.
+
+Requests that get past the ETag check are answered from a cache of
+rendered responses (CATALOG_CACHE_ALIAS), keyed by the URL with its query
+parameters sorted. Keys include generation counters kept in the cache: one
+per component for its detail responses, one for all component lists and
+searches, one for categories. Writes bump the generations they affect once
+their transaction commits (invalidate_catalog), so saving a component drops
+its own detail responses and the lists, but not other components' details.
+On a miss one request computes the response while concurrent requests for
+the same key wait for it (single flight) instead of all querying the
+database.
+"""
+import hashlib
+import json
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+COMPONENT_LISTS = 'components'
+CATEGORIES = 'categories'
+
+
+def component_scope(component_id):
+    return f"component:{component_id}"
+
+
+def catalog_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _new_generation():
+    # Larger than any generation a lost (evicted) counter had handed out before
+    return time.time_ns() // 1000
+
+
+def _generations(scopes):
+    cache = catalog_cache()
+    keys = [f"catalog:generation:{scope}" for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def _bump_generations(scopes):
+    cache = catalog_cache()
+    for scope in scopes:
+        key = f"catalog:generation:{scope}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set yet, or evicted
+            cache.set(key, _new_generation(), timeout=None)
+
+
+def invalidate_catalog(component_ids=(), categories=False):
+    """
+    Drop the cached responses a write affects once the current transaction
+    commits: the detail responses of the given components and all component
+    lists, or the category responses.
+    """
+    if not getattr(settings, 'CATALOG_CACHE_ENABLED', True):
+        return
+    if categories:
+        scopes = [CATEGORIES]
+    else:
+        scopes = [component_scope(pk) for pk in component_ids] + [COMPONENT_LISTS]
+    transaction.on_commit(lambda: _bump_generations(scopes))
+
+
+def response_cache_key(request, scopes):
+    """Cache key of a catalog response: current generations of its scopes and the normalized URL"""
+    params = sorted((name, value) for name, values in request.query_params.lists() for value in values)
+    raw = json.dumps([
+        _generations(scopes), request.scheme, request.get_host(), request.path, params,
+        request.accepted_media_type,
+    ])
+    return f"catalog:response:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def catalog_etag(request, version):
+    """Strong ETag of a catalog response: the catalog version and the exact URL, host included"""
+    digest = hashlib.sha256(f"{version}:{request.build_absolute_uri()}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+class ConditionalCatalogMixin:
+    """
+    ViewSet mixin answering GET/HEAD of conditional_actions with ETag and
+    Last-Modified, and 304 when the client's copy is current; other requests
+    for those actions are served from the response cache. A response the
+    view marks Cache-Control: no-store (not determined by the catalog alone)
+    is neither cached nor given an ETag.
+    """
+    conditional_actions = ('list', 'retrieve')
+    # Cache generation the responses of a viewset depend on (see cache_scopes)
+    cache_scope = COMPONENT_LISTS
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+
+        catalog = CatalogVersion.current()
+        etag = catalog_etag(request, catalog.version)
+        # Last-Modified has whole seconds. Rounded up and only sent once that second
+        # is over, a write after the response always gets a later Last-Modified, so
+        # If-Modified-Since cannot match a copy older than a write in the same second
+        last_modified = math.ceil(catalog.updated_at.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.cached_response(handler, request, *args, **kwargs)
+            if response.status_code != 200 or response.get('Cache-Control') == 'no-store':
+                return response
+        response['ETag'] = etag
+        if time.time() >= last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Cacheable, but revalidated on every use: the catalog changes at any time
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def cache_scopes(self):
+        """Generations the current request's response depends on"""
+        if self.action == 'retrieve' and self.cache_scope == COMPONENT_LISTS:
+            return [component_scope(self.kwargs[self.lookup_url_kwarg or self.lookup_field])]
+        return [self.cache_scope]
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """The handler's response, from the catalog cache when it holds a current copy"""
+        if not getattr(settings, 'CATALOG_CACHE_ENABLED', True):
+            return handler(request, *args, **kwargs)
+
+        cache = catalog_cache()
+        key = response_cache_key(request, self.cache_scopes())
+        entry = cache.get(key)
+        if entry is None:
+            lock_key = f"{key}:lock"
+            wait = getattr(settings, 'CATALOG_CACHE_FILL_WAIT', 5)
+            if cache.add(lock_key, 1, timeout=wait):
+                try:
+                    return self._fill_cache(key, handler, request, *args, **kwargs)
+                finally:
+                    cache.delete(lock_key)
+            # Another request is computing this response: wait for it, up to the fill wait
+            deadline = time.monotonic() + wait
+            while entry is None and time.monotonic() < deadline and cache.get(lock_key) is not None:
+                time.sleep(0.02)
+                entry = cache.get(key)
+            if entry is None:
+                return self._fill_cache(key, handler, request, *args, **kwargs)
+
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def _fill_cache(self, key, handler, request, *args, **kwargs):
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200 or response.get('Cache-Control') == 'no-store':
+            return response
+        # Rendered here instead of in finalize_response, so the cache holds the bytes
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        catalog_cache().set(
+            key,
+            {'content': response.content, 'content_type': response['Content-Type']},
+            timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300),
+        )
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,108 @@
+"""
+Dispatch of component processing jobs.
+
+Processing of a component is queued with dispatch_processing() once the
+surrounding transaction commits, so a worker never looks for a component
+row that is not visible yet, and nothing is queued for a rolled back save.
+Outside a transaction the job is queued right away and submission errors
+(ExecutorBusy) reach the caller.
+
+Jobs carry the component's file_version. process_component skips a job
+whose version was superseded by a newer file or was already processed, so
+a job dispatched twice, or delivered twice by a broker, converts once. No
+dispatch state is kept besides the on_commit callback, so a rolled back
+transaction leaves nothing behind.
+
+Celery tasks are routed to a queue by the weight of the conversion (see
+components/tasks.py); bulk dispatches go to the bulk queue, or get a lower
+job queue priority, so they do not delay interactive uploads.
+
+New components are dispatched by the post_save signal, unless the save runs
+inside processing_suppressed(); code that queues the job itself (the upload
+views, the admin) uses that to get hold of the job.
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from cad_processing.executor import ExecutorBusy
+from .models import Component
+from .processing import submit_component_processing
+
+logger = logging.getLogger(__name__)
+
+# Try to import Celery task for async processing
+try:
+    from .tasks import conversion_task_options, process_component_async
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+_suppressed = ContextVar('component_processing_suppressed', default=False)
+
+
+@contextmanager
+def processing_suppressed():
+    """Within the block, saving a new Component does not dispatch its processing"""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def is_processing_suppressed():
+    return _suppressed.get()
+
+
+def _submit(component_id, file_version, apply_placement_rules, task_options, job_id, bulk):
+    if task_options is not None:
+        process_component_async.apply_async(
+            args=[component_id, apply_placement_rules, file_version], task_id=job_id, **task_options
+        )
+        return {'id': job_id, 'status': 'queued'}
+    return submit_component_processing(
+        component_id, apply_placement_rules, job_id=job_id, file_version=file_version, bulk=bulk
+    )
+
+
+def dispatch_processing(component, apply_placement_rules=True, use_celery=False, job_id=None, bulk=False):
+    """
+    Queue processing of the component's current file_version.
+
+    Args:
+        component: saved Component
+        apply_placement_rules: passed on to process_component
+        use_celery: queue a Celery task instead of using CAD_PROCESSING_BACKEND
+        job_id: identifier to use for the job (a UUID is generated if omitted)
+        bulk: part of a bulk reprocessing run rather than an interactive upload
+
+    Returns:
+        The job dict. Inside a transaction it is {'id', 'status': 'queued'}
+        and the job is submitted on commit.
+
+    Raises:
+        ExecutorBusy: outside a transaction, if the conversion queue is full
+    """
+    task_options = conversion_task_options(component, bulk) if use_celery and CELERY_AVAILABLE else None
+    job_id = job_id or uuid.uuid4().hex
+    component_id, file_version = component.pk, component.file_version
+
+    if not transaction.get_connection().in_atomic_block:
+        return _submit(component_id, file_version, apply_placement_rules, task_options, job_id, bulk)
+
+    def submit():
+        try:
+            _submit(component_id, file_version, apply_placement_rules, task_options, job_id, bulk)
+        except ExecutorBusy as e:
+            Component.objects.filter(id=component_id, file_version=file_version).update(
+                processing_status='failed',
+                processing_error=f"{e}. Please re-upload the file later.",
+            )
+            logger.error(f"Could not queue processing for component {component_id}: {e}")
+
+    transaction.on_commit(submit)
+    return {'id': job_id, 'status': 'queued'}
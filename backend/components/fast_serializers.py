@@ -0,0 +1,175 @@
+"""
+Read-only serialization of components from .values() rows.
+
+ComponentSerializer runs DRF's field machinery for every field of every row
+and asks the storage for each file URL. For the read-heavy list endpoints
+ComponentRowSerializer produces the same output from plain dict rows: the
+getter of each requested field is built once, file URLs are the storage's
+URL prefix (resolved once per serializer) plus the quoted file name, JSON
+columns are read as text and decoded with orjson when it is installed, and
+no model instances are created.
+
+Storages whose URLs are not a fixed prefix plus the name (signed URLs, for
+one) get storage.url() per file, as with ComponentSerializer.
+
+The output must stay identical to ComponentSerializer's; the
+benchmark_serializers command checks that and measures both paths.
+"""
+import json
+import re
+
+from django.conf import settings
+from django.db.models import JSONField, TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .models import Component
+from .renderers import ORJSON_AVAILABLE
+from .serializers import ComponentSerializer
+
+if ORJSON_AVAILABLE:
+    import orjson
+
+_URL_PROBE = '__url_probe__'
+# File names filepath_to_uri() leaves as they are
+_URL_SAFE_NAME = re.compile(r"[A-Za-z0-9_.\-~/!*()']*\Z")
+
+
+def load_json(text):
+    """A JSON column's value from its text, as JSONField decodes it"""
+    if text is None:
+        return None
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # NaN, Infinity and integers beyond 64 bits, which json accepts
+            pass
+    return json.loads(text)
+
+
+def iso_datetime(value, tz=None):
+    """
+    A datetime as DRF's DateTimeField renders it (ISO 8601, UTC as Z), in tz
+    or else the current time zone.
+    """
+    if not value:
+        return None
+    if settings.USE_TZ:
+        value = value.astimezone(tz or timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def url_base(request):
+    """Scheme and host file URLs are made absolute with, as ComponentSerializer does"""
+    if request is not None:
+        return request.build_absolute_uri('/')[:-1]
+    return getattr(settings, 'BASE_URL', 'http://localhost:8000')
+
+
+class StorageURLs:
+    """Absolute URLs of the files of one storage"""
+
+    def __init__(self, storage, base):
+        self.storage = storage
+        self.base = base
+        probe = storage.url(_URL_PROBE)
+        # None when the storage does not build its URLs as prefix + name
+        self.prefix = self.absolute(probe[:-len(_URL_PROBE)]) if probe.endswith(_URL_PROBE) else None
+
+    def absolute(self, url):
+        return f"{self.base}{url}" if url.startswith('/') else url
+
+    def url(self, name):
+        if self.prefix is None:
+            return self.absolute(self.storage.url(name))
+        if _URL_SAFE_NAME.match(name):
+            return self.prefix + name.lstrip('/')
+        return self.prefix + filepath_to_uri(name).lstrip('/')
+
+
+class ComponentRowSerializer:
+    """
+    ComponentSerializer output for rows of values(queryset).
+
+    Args:
+        request: request the file URLs are made absolute for (BASE_URL without one)
+        fields: field names to serialize, as ComponentSerializer's fields=
+        prefix: prefix of the component columns in the rows, e.g. 'component__'
+            for components read through a foreign key
+        urls: {field name: StorageURLs} to share with another serializer
+
+    Raises:
+        serializers.ValidationError: for a field ComponentSerializer does not have
+    """
+
+    def __init__(self, request=None, fields=None, prefix='', urls=None):
+        names = ComponentSerializer.Meta.fields
+        if fields is not None:
+            ComponentSerializer.model_columns(fields)
+            names = [name for name in names if name in fields]
+        self.prefix = prefix
+        self.urls = urls or self.storage_urls(request)
+        self.columns = [prefix + column for column in ComponentSerializer.model_columns(names)]
+        # JSON columns are selected as text under these names
+        self._json_text = {
+            prefix + column: f"{prefix}{column}_text".replace('__', '_')
+            for column in ComponentSerializer.model_columns(names)
+            if isinstance(Component._meta.get_field(column), JSONField)
+        }
+        self._tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        self._getters = [(name, self._getter(name)) for name in names]
+
+    @staticmethod
+    def storage_urls(request):
+        base = url_base(request)
+        return {
+            name: StorageURLs(Component._meta.get_field(name).storage, base)
+            for name in ('glb_file', 'original_file')
+        }
+
+    def _getter(self, name):
+        """Function computing the field's value from a row"""
+        key = self.prefix + ComponentSerializer.FIELD_COLUMNS.get(name, [name])[0]
+        if name in ('glb_url', 'original_url'):
+            url = self.urls[key[len(self.prefix):]].url
+            return lambda row: url(row[key]) if row[key] else None
+        if name == 'lods':
+            key = self._json_text[self.prefix + 'lod_files']
+            url = self.urls['glb_file'].url
+            return lambda row: [
+                {
+                    'level': entry['level'],
+                    'face_count': entry.get('face_count'),
+                    'geometric_error': entry.get('geometric_error'),
+                    'size': entry.get('size'),
+                    'url': url(entry['name']),
+                }
+                for entry in load_json(row[key]) or []
+            ]
+        if name in ('created_at', 'updated_at'):
+            tz = self._tz
+            return lambda row: iso_datetime(row[key], tz)
+        if key in self._json_text:
+            key = self._json_text[key]
+            return lambda row: load_json(row[key])
+        return lambda row: row[key]
+
+    def values(self, queryset, *extra):
+        """The queryset as rows of the columns this serializer reads, plus extra columns"""
+        queryset = queryset.annotate(**{
+            name: Cast(column, output_field=TextField()) for column, name in self._json_text.items()
+        })
+        columns = [self._json_text.get(column, column) for column in self.columns]
+        return queryset.values(*dict.fromkeys([*columns, *extra]))
+
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self._getters}
+
+    def serialize(self, rows):
+        getters = self._getters
+        return [{name: get(row) for name, get in getters} for row in rows]
@@ -0,0 +1,147 @@
+"""
+Check the .values() serializers against the DRF serializers and measure both.
+
+    python manage.py benchmark_serializers
+    python manage.py benchmark_serializers --rows 1000 --rows 10000 --repeat 5
+
+For each row count the command creates that many components and a project
+with as many assembly items, inside a transaction that is rolled back at the
+end, so the database is left as it was. It then checks that the component
+list (all fields and a sparse fieldset) and the project detail come out the
+same through ComponentRowSerializer / project_data with FastJSONRenderer as
+through ComponentSerializer / ProjectSerializer with JSONRenderer, and
+reports the time of each path from queryset to response bytes (best of
+--repeat runs). A mismatch fails the command.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from components.dispatch import processing_suppressed
+from components.fast_serializers import ComponentRowSerializer
+from components.models import Component, ConnectionPoint
+from components.renderers import ORJSON_AVAILABLE, FastJSONRenderer
+from components.serializers import ComponentSerializer
+from projects.fast_serializers import project_data
+from projects.models import AssemblyItem, Project
+from projects.serializers import ProjectSerializer
+
+SPARSE_FIELDS = ['id', 'name', 'category', 'glb_url', 'lods', 'created_at']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Check the .values() list serializers against the DRF serializers and compare their speed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, action='append', default=[],
+                            help='Number of components and assembly items (repeatable, default 1000 and 10000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best one is reported')
+
+    def handle(self, *args, **options):
+        self.repeat = max(options['repeat'], 1)
+        self.stdout.write(f"JSON encoder of the fast path: {'orjson' if ORJSON_AVAILABLE else 'json'}")
+        for count in options['rows'] or [1000, 10000]:
+            try:
+                with processing_suppressed(), transaction.atomic():
+                    self.benchmark(count)
+                    raise Rollback()
+            except Rollback:
+                pass
+
+    def benchmark(self, count):
+        components, project = self.create_rows(count)
+        queryset = Component.objects.filter(id__in=[component.id for component in components]).order_by('-created_at', 'id')
+
+        def drf_components(fields=None):
+            kwargs = {} if fields is None else {'fields': fields}
+            rows = queryset if fields is None else queryset.only(*ComponentSerializer.model_columns(fields), 'created_at')
+            return JSONRenderer().render(ComponentSerializer(rows, many=True, **kwargs).data)
+
+        def fast_components(fields=None):
+            serializer = ComponentRowSerializer(fields=fields)
+            return FastJSONRenderer().render(serializer.serialize(serializer.values(queryset)))
+
+        def drf_project():
+            instance = Project.objects.select_related('owner').prefetch_related('assembly_items__component').get(id=project.id)
+            return JSONRenderer().render(ProjectSerializer(instance).data)
+
+        def fast_project():
+            return FastJSONRenderer().render(project_data(Project.objects.select_related('owner').get(id=project.id)))
+
+        cases = [
+            ('components', drf_components, fast_components),
+            ('components ?fields=', lambda: drf_components(SPARSE_FIELDS), lambda: fast_components(SPARSE_FIELDS)),
+            ('project', drf_project, fast_project),
+        ]
+        for name, drf, fast in cases:
+            expected, actual = drf(), fast()
+            if json.loads(expected) != json.loads(actual):
+                raise CommandError(f"{name}: output of the fast path differs from the DRF serializer ({count} rows)")
+            drf_time, fast_time = self.best_time(drf), self.best_time(fast)
+            self.stdout.write(
+                f"{name:<20} {count:>6} rows  DRF {drf_time * 1000:8.1f} ms  fast {fast_time * 1000:8.1f} ms  "
+                f"{drf_time / fast_time:5.1f}x  ({count / fast_time:,.0f} rows/s, same output)"
+            )
+
+    def best_time(self, render):
+        best = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def create_rows(self, count):
+        """count components, a few with connection points, and a project assembling all of them"""
+        categories = [value for value, label in Component.CATEGORY_CHOICES]
+        components = Component.objects.bulk_create([
+            Component(
+                name=f"Benchmark component {i}",
+                category_label=categories[i % len(categories)],
+                original_file=f"components/original/benchmark {i}.step",
+                glb_file=f"components/glb/benchmark_{i}.glb" if i % 10 else None,
+                lod_files=[
+                    {'level': level, 'name': f"components/glb/benchmark_{i}_lod{level}.glb",
+                     'face_count': 1000 >> level, 'geometric_error': level * 0.5, 'size': 4096 >> level}
+                    for level in range(i % 3)
+                ],
+                bounding_box={'min': [0, 0, 0], 'max': [i * 0.1, 1.5, 2.25]},
+                center=[i * 0.05, 0.75, 1.125],
+                volume=i * 0.3375,
+                mountable_sides=['bottom', 'top'],
+                compatible_types=['mount'],
+                processing_status='completed',
+            )
+            for i in range(count)
+        ])
+        points = ConnectionPoint.objects.bulk_create([
+            ConnectionPoint(
+                component=component, name=f"mount {i}", position_x=0.0, position_y=i * 0.25, position_z=1.0,
+                compatible_types=['mount'], side_label='bottom',
+            )
+            for i, component in enumerate(components[:10])
+        ])
+
+        project = Project.objects.create(name='Benchmark project', metadata={'benchmark': True})
+        items = AssemblyItem.objects.bulk_create([
+            AssemblyItem(
+                project=project, component=component, position_x=i * 1.5, position_y=0.1, rotation_w=1.0,
+                connection_point=points[i % len(points)] if i % 4 == 0 else None, order=i,
+            )
+            for i, component in enumerate(components)
+        ])
+        # Chains of parents, so world transforms add up positions
+        for i, item in enumerate(items[1:], start=1):
+            if i % 5:
+                item.parent = items[i - 1]
+                item.connected_to = items[i - 1]
+        AssemblyItem.objects.bulk_update(items, ['parent', 'connected_to'])
+        return components, project
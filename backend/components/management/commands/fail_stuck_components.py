@@ -0,0 +1,27 @@
+"""
+Fail components whose processing job was lost.
+
+    python manage.py fail_stuck_components
+    python manage.py fail_stuck_components --timeout 7200
+
+Components left pending or processing for longer than the timeout are
+marked failed (see components.processing.fail_stuck_components). Run it
+periodically (cron, a scheduled container) with the executor backend, whose
+jobs are lost when a web process restarts.
+"""
+from django.core.management.base import BaseCommand
+
+from components.processing import fail_stuck_components
+
+
+class Command(BaseCommand):
+    help = 'Mark components stuck in pending/processing as failed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=None,
+                            help='Seconds without a status change after which a component is stuck '
+                                 '(default: CAD_PROCESSING_STUCK_TIMEOUT)')
+
+    def handle(self, *args, **options):
+        count = fail_stuck_components(options['timeout'])
+        self.stdout.write(self.style.SUCCESS(f"Failed {count} stuck components"))
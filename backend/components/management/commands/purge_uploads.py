@@ -0,0 +1,25 @@
+"""
+Delete resumable upload sessions that were abandoned before completion.
+
+    python manage.py purge_uploads
+    python manage.py purge_uploads --max-age 3600
+
+Run it periodically (cron, a scheduled container) to free the storage held
+by their chunks.
+"""
+from django.core.management.base import BaseCommand
+
+from components.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished component upload sessions and their stored chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Seconds since the last chunk after which a session is stale '
+                                 '(default: CAD_UPLOAD_SESSION_MAX_AGE)')
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} stale upload sessions"))
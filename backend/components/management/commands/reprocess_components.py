@@ -0,0 +1,68 @@
+"""
+Convert the original files of existing components again, e.g. after the
+converters or the LOD settings changed.
+
+    python manage.py reprocess_components --status failed
+    python manage.py reprocess_components --category Roller --celery
+    python manage.py reprocess_components --all
+
+Jobs are queued as bulk work: on the cad_bulk Celery queue with --celery,
+otherwise with a lower priority than uploads on the job queue
+(CAD_PROCESSING_BACKEND=jobqueue). With the conversion executor the command
+submits jobs as the executor has room for them and waits for them to finish.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from cad_processing.executor import ExecutorBusy, get_conversion_executor
+from components.dispatch import CELERY_AVAILABLE, dispatch_processing
+from components.models import Component
+
+
+class Command(BaseCommand):
+    help = 'Queue processing of existing components again, behind interactive uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', default=[],
+                            help='Only components with this processing status (repeatable)')
+        parser.add_argument('--category', default=None, help='Only components with this category label')
+        parser.add_argument('--all', action='store_true', help='Reprocess every component with a file')
+        parser.add_argument('--celery', action='store_true', help='Queue Celery tasks on the cad_bulk queue')
+
+    def handle(self, *args, **options):
+        if not (options['status'] or options['category'] or options['all']):
+            raise CommandError('Select components with --status, --category or --all')
+        if options['celery'] and not CELERY_AVAILABLE:
+            raise CommandError('Celery is not installed')
+
+        components = Component.objects.exclude(original_file='').exclude(original_file__isnull=True)
+        if options['status']:
+            components = components.filter(processing_status__in=options['status'])
+        if options['category']:
+            components = components.filter(category_label=options['category'])
+
+        count = 0
+        for component in components.order_by('id').iterator():
+            # A new version, so the job is not skipped as already processed
+            Component.objects.filter(id=component.id).update(
+                file_version=F('file_version') + 1,
+                processing_status='pending',
+                processing_error=None,
+            )
+            component.refresh_from_db(fields=['file_version'])
+            while True:
+                try:
+                    dispatch_processing(component, use_celery=options['celery'], bulk=True)
+                    break
+                except ExecutorBusy:
+                    time.sleep(1)
+            count += 1
+
+        executor_jobs = not options['celery'] and getattr(settings, 'CAD_PROCESSING_BACKEND', 'executor') == 'executor'
+        if executor_jobs and count:
+            self.stdout.write(f"Waiting for {count} conversions to finish...")
+            get_conversion_executor().shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f"Queued {count} components for reprocessing"))
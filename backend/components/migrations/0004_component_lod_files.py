@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0003_alter_component_glb_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='lod_files',
+            field=models.JSONField(blank=True, default=list, help_text='Level-of-detail GLB chain, finest first (level 0 is glb_file)'),
+        ),
+        migrations.AlterField(
+            model_name='component',
+            name='glb_file',
+            field=models.FileField(blank=True, help_text='GLB file for web visualization (converted from original if needed)', null=True, upload_to='components/glb/'),
+        ),
+        migrations.AlterField(
+            model_name='component',
+            name='original_file',
+            field=models.FileField(help_text='CAD file (GLB/GLTF, STEP, STL, OBJ)', upload_to='components/original/'),
+        ),
+    ]
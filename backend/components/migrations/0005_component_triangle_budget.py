@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 08:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0004_component_lod_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='triangle_budget',
+            field=models.PositiveIntegerField(blank=True, help_text='Target triangle count when tessellating a STEP file (blank = CAD_STEP_TRIANGLE_BUDGET)', null=True, validators=[django.core.validators.MinValueValidator(100)]),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0005_component_triangle_budget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(help_text='Total file size in bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far')),
+                ('parts', models.JSONField(blank=True, default=list, help_text='Stored chunks: [offset, storage name, size]')),
+                ('expected_sha256', models.CharField(blank=True, help_text='SHA-256 of the whole file, if the client gave one', max_length=64)),
+                ('sha256', models.CharField(blank=True, help_text='SHA-256 of the assembled file', max_length=64)),
+                ('component_data', models.JSONField(blank=True, default=dict, help_text='Fields for the component created on completion')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('assembling', 'Assembling'), ('completed', 'Completed'), ('failed', 'Failed')], default='uploading', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('component', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='components.component')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='components__status_9d1065_idx')],
+            },
+        ),
+    ]
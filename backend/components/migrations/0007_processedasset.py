@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0006_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Content hash of the original plus conversion parameters', max_length=64, unique=True)),
+                ('original_sha256', models.CharField(db_index=True, max_length=64)),
+                ('glb_sha256', models.CharField(blank=True, max_length=64)),
+                ('original_file', models.FileField(upload_to='components/original/')),
+                ('glb_file', models.FileField(upload_to='components/glb/')),
+                ('lod_files', models.JSONField(blank=True, default=list)),
+                ('bounding_box', models.JSONField(blank=True, default=dict)),
+                ('center', models.JSONField(blank=True, default=dict)),
+                ('volume', models.FloatField(default=0.0)),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Components using this asset')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='glb_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='original_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='components', to='components.processedasset'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0007_processedasset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='file_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='processed_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0008_component_file_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(fields=['-created_at', 'id'], name='components__created_e28c6f_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.functions import Upper
+
+# Must match the expressions queried in components/search.py
+SEARCH_INDEXES = [
+    GinIndex(
+        SearchVector('name', 'category_label', 'processing_status', config='simple'),
+        name='component_search_vector',
+    ),
+    GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='component_name_trgm'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    # PostgreSQL only; other databases search without these indexes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    Component = apps.get_model('components', 'Component')
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(Component, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Component = apps.get_model('components', 'Component')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(Component, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('components', '0009_component_created_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,9 @@
+import uuid
+
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class ComponentCategory(models.Model):
@@ -16,6 +20,85 @@ class ComponentCategory(models.Model):
         return self.name
 
 
+class ProcessedAsset(models.Model):
+    """
+    Conversion result shared by every component uploaded with the same file.
+
+    Keyed by the SHA-256 of the original file combined with the conversion
+    parameters (see cad_processing.cache.build_cache_key). Components point
+    their original_file, glb_file and lod_files at the asset's stored files;
+    ref_count counts them, and the files are deleted with the last reference
+    (see components/assets.py).
+    """
+    key = models.CharField(max_length=64, unique=True, help_text='Content hash of the original plus conversion parameters')
+    original_sha256 = models.CharField(max_length=64, db_index=True)
+    glb_sha256 = models.CharField(max_length=64, blank=True)
+    original_file = models.FileField(upload_to='components/original/')
+    glb_file = models.FileField(upload_to='components/glb/')
+    lod_files = models.JSONField(default=list, blank=True)
+    bounding_box = models.JSONField(default=dict, blank=True)
+    center = models.JSONField(default=dict, blank=True)
+    volume = models.FloatField(default=0.0)
+    ref_count = models.PositiveIntegerField(default=0, help_text='Components using this asset')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.original_file.name} ({self.ref_count} refs)"
+
+
+class CatalogVersion(models.Model):
+    """
+    Catalog-wide change counter, a single row.
+
+    Bumped by every write to components, connection points and categories
+    (signals and ComponentQuerySet); the catalog API derives its ETag and
+    Last-Modified headers from it (see components/catalog.py).
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+    @classmethod
+    def bump(cls):
+        """Count a catalog change; part of the caller's transaction"""
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1, updated_at=timezone.now()):
+            cls.objects.get_or_create(pk=1)
+
+    @classmethod
+    def current(cls):
+        """The catalog version row, created on first use"""
+        return cls.objects.get_or_create(pk=1)[0]
+
+
+class ComponentQuerySet(models.QuerySet):
+    """
+    Bulk writes bump the catalog version and invalidate cached catalog
+    responses, like saving a single component does. Updates also set
+    updated_at, which auto_now does not do for them (the stuck-processing
+    sweep in components/processing.py relies on it).
+    """
+
+    def update(self, **kwargs):
+        from .catalog import invalidate_catalog
+        kwargs.setdefault('updated_at', timezone.now())
+        component_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        if rows:
+            CatalogVersion.bump()
+            invalidate_catalog(component_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .catalog import invalidate_catalog
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            CatalogVersion.bump()
+            invalidate_catalog([obj.pk for obj in created if obj.pk is not None])
+        return created
+
+
 class Component(models.Model):
     """Simplified CAD component with auto geometry processing"""
     CATEGORY_CHOICES = [
@@ -31,6 +114,18 @@ class Component(models.Model):
     category_label = models.CharField(max_length=32, choices=CATEGORY_CHOICES, default="Base")
     original_file = models.FileField(upload_to='components/original/', help_text='CAD file (GLB/GLTF, STEP, STL, OBJ)')
     glb_file = models.FileField(upload_to='components/glb/', blank=True, null=True, help_text='GLB file for web visualization (converted from original if needed)')
+    lod_files = models.JSONField(default=list, blank=True, help_text='Level-of-detail GLB chain, finest first (level 0 is glb_file)')
+    triangle_budget = models.PositiveIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(100)],
+        help_text='Target triangle count when tessellating a STEP file (blank = CAD_STEP_TRIANGLE_BUDGET)'
+    )
+    
+    # Content hashes of original_file and glb_file, and the shared asset holding them
+    original_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    glb_sha256 = models.CharField(max_length=64, blank=True)
+    asset = models.ForeignKey(
+        ProcessedAsset, on_delete=models.SET_NULL, blank=True, null=True, related_name='components'
+    )
     
     # Auto-filled geometry fields
     bounding_box = models.JSONField(default=dict, blank=True)
@@ -51,12 +146,20 @@ class Component(models.Model):
         default='pending'
     )
     processing_error = models.TextField(blank=True, null=True)
+    # Bumped whenever original_file is replaced; processing jobs carry the version they
+    # were queued for, so stale or repeated jobs are skipped (see components/dispatch.py)
+    file_version = models.PositiveIntegerField(default=1)
+    processed_version = models.PositiveIntegerField(blank=True, null=True)
+    
+    objects = ComponentQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['category_label', 'processing_status']),
+            # Keyset pagination order of the catalog (components/pagination.py)
+            models.Index(fields=['-created_at', 'id']),
         ]
     
     def __str__(self):
@@ -116,3 +219,42 @@ class ConnectionPoint(models.Model):
         """Return normal vector as list"""
         return [self.normal_x, self.normal_y, self.normal_z]
 
+
+class UploadSession(models.Model):
+    """
+    Resumable upload of a component's CAD file, received in chunks.
+
+    Each chunk is stored as a part file; when the last byte arrives the parts
+    are joined into the component's original_file (see components/uploads.py).
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('assembling', 'Assembling'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text='Total file size in bytes')
+    offset = models.BigIntegerField(default=0, help_text='Bytes received so far')
+    parts = models.JSONField(default=list, blank=True, help_text='Stored chunks: [offset, storage name, size]')
+    expected_sha256 = models.CharField(max_length=64, blank=True, help_text='SHA-256 of the whole file, if the client gave one')
+    sha256 = models.CharField(max_length=64, blank=True, help_text='SHA-256 of the assembled file')
+    component_data = models.JSONField(default=dict, blank=True, help_text='Fields for the component created on completion')
+    component = models.ForeignKey(
+        Component, on_delete=models.SET_NULL, blank=True, null=True, related_name='upload_sessions'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
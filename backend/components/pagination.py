@@ -0,0 +1,128 @@
+"""
+Keyset pagination of the component catalog.
+
+Pages are read with WHERE (created_at, id) past the cursor ORDER BY
+-created_at, id LIMIT n, served by the index on those columns, so a
+page deep into the catalog costs the same as the first one. Responses keep
+the {count, next, previous, results} shape of page-number pagination;
+?count=false leaves out the count and with it the COUNT(*) query.
+
+Clients that still send ?page=N get page-number pagination.
+
+The queryset may be a .values() queryset; its rows need created_at and id.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ComponentCursorPagination(BasePagination):
+    """
+    Query parameters: cursor (from the next/previous links), page_size (up to
+    max_page_size) and count=false for count-free pages.
+    """
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    ordering = ('-created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, obj, reverse=False):
+        # Components, or .values() rows of them
+        created_at, pk = (obj['created_at'], obj['id']) if isinstance(obj, dict) else (obj.created_at, obj.pk)
+        position = [created_at.isoformat(), pk, reverse]
+        token = base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """(created_at, id, reverse) of the cursor parameter, or None on the first page"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return datetime.fromisoformat(created_at), int(pk), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'page' in request.query_params:
+            self.page_number = PageNumberPagination()
+            return self.page_number.paginate_queryset(queryset, request, view)
+        self.page_number = None
+
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.include_count = request.query_params.get(self.count_query_param, '').lower() not in ('false', '0')
+        self.count = queryset.count() if self.include_count else None
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+        if cursor is not None:
+            created_at, pk, _ = cursor
+            if reverse:
+                # Rows before the cursor, read backwards
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+        queryset = queryset.order_by(*(('created_at', '-id') if reverse else self.ordering))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+
+        # Reading forward there are rows after the page if one more was found, and rows
+        # before it if a cursor was given; reading backwards the other way round
+        has_next, has_previous = (cursor is not None, has_more) if reverse else (has_more, cursor is not None)
+        self.next_link = self.encode_cursor(page[-1]) if page and has_next else None
+        self.previous_link = self.encode_cursor(page[0], reverse=True) if page and has_previous else None
+        return page
+
+    def get_paginated_response(self, data):
+        if self.page_number is not None:
+            return self.page_number.get_paginated_response(data)
+        body = {'next': self.next_link, 'previous': self.previous_link, 'results': data}
+        if self.include_count:
+            body = {'count': self.count, **body}
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Pagination cursor value.', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': 'Number of results to return per page.', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': 'Set to false to leave out the total count.', 'schema': {'type': 'boolean'}},
+        ]
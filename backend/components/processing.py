@@ -0,0 +1,367 @@
+"""
+CAD processing of Components: running the conversion and storing its results.
+Shared by the processing dispatch (components/dispatch.py), the Celery task,
+the conversion executor workers and the job queue.
+"""
+import logging
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import OperationalError
+from django.utils import timezone
+
+from cad_processing.cache import file_sha256
+from cad_processing.converters import is_backend_fault
+from cad_processing.executor import get_conversion_executor
+from cad_processing.utils import SCRATCH_SIZE_FACTOR, process_cad_file
+from cad_processing.workspace import scratch_workspace
+from jobqueue.queue import enqueue, job_status
+from .assets import (
+    asset_key, create_asset, delete_stored_files, release_asset, reuse_processed_asset
+)
+from .models import Component
+from .utils import COMPONENT_PLACEMENT_RULES
+
+logger = logging.getLogger(__name__)
+
+# Job queue priority of bulk reprocessing, below interactive uploads (0)
+BULK_PRIORITY = -10
+
+
+def save_component_lods(component, lods):
+    """
+    Store the level-of-detail chain of a processing result on a component.
+
+    Level 0 is the component's glb_file, which the caller saves; coarser levels
+    are written next to it as {glb name}_lod{level}.glb. The component itself
+    is not saved.
+
+    Args:
+        component: Component instance with its glb_file saved
+        lods: list of LOD dicts from process_cad_file
+    """
+    storage = component.glb_file.storage
+    stem = Path(component.glb_file.name).stem if component.glb_file else str(component.id)
+
+    lod_files = []
+    for lod in lods:
+        if lod['level'] == 0:
+            if not component.glb_file:
+                continue
+            name = component.glb_file.name
+        else:
+            with open(lod['path'], 'rb') as lod_file:
+                name = storage.save(f"components/glb/{stem}_lod{lod['level']}.glb", File(lod_file))
+        lod_files.append({
+            'level': lod['level'],
+            'face_count': lod['face_count'],
+            'geometric_error': lod['geometric_error'],
+            'name': name,
+            'size': lod['size'],
+        })
+
+    component.lod_files = lod_files
+    logger.info(f"Stored {len(lod_files)} LOD level(s) for component {component.id}")
+
+
+def component_file_names(component):
+    """Storage names of a component's GLB and LOD files"""
+    names = [component.glb_file.name] + [entry.get('name') for entry in component.lod_files or []]
+    return [name for name in names if name]
+
+
+def apply_placement_rules_for(component):
+    rules = COMPONENT_PLACEMENT_RULES.get(component.category_label, {})
+    component.mountable_sides = rules.get('mountable_sides', [])
+    component.supported_orientations = rules.get('supported_orientations', ['fixed'])
+    component.compatible_types = rules.get('compatible', [])
+
+
+def complete_from_processed_asset(component, apply_placement_rules=True):
+    """
+    Finish a pending component without converting, when its original_file
+    was processed before (see components/assets.py).
+
+    Returns:
+        True when an existing asset was attached and the component saved
+    """
+    previous_asset_id, previous_files = component.asset_id, component_file_names(component)
+    if reuse_processed_asset(component, asset_key(component)) is None:
+        # Keep the computed hash so processing does not read the file again
+        Component.objects.filter(id=component.id).update(original_sha256=component.original_sha256)
+        return False
+    if apply_placement_rules:
+        apply_placement_rules_for(component)
+    component.processing_status = 'completed'
+    component.processing_error = None
+    component.processed_version = component.file_version
+    component.save()
+    release_previous_files(component, previous_asset_id, previous_files)
+    return True
+
+
+def release_previous_files(component, previous_asset_id, previous_files):
+    """
+    After a component got new files, drop its reference to the asset it used
+    before, or delete its previous unshared GLB files.
+    """
+    in_use = [component.original_file.name] + component_file_names(component)
+    if previous_asset_id is not None:
+        if previous_asset_id != component.asset_id:
+            release_asset(previous_asset_id, component.glb_file.storage, keep=in_use)
+    else:
+        delete_stored_files(component.glb_file.storage, previous_files, keep=in_use)
+
+
+def conversion_error_message(error_message):
+    """Add setup hints to STEP conversion failures"""
+    if 'STEP' in error_message or 'step' in error_message.lower() or 'conversion' in error_message.lower():
+        return (
+            f"STEP file conversion failed: {error_message}\n\n"
+            "SOLUTIONS:\n"
+            "1. Pre-convert STEP to STL/OBJ:\n"
+            "   - Use FreeCAD (free): https://www.freecad.org/\n"
+            "   - Or use online converters\n"
+            "   - Then upload the STL or OBJ file instead\n\n"
+            "2. Set up FreeCAD Docker service:\n"
+            "   - Build the FreeCAD Docker container\n"
+            "   - Set FREECAD_DOCKER_URL environment variable\n"
+            "   - See backend/README.md for details\n\n"
+            "3. For development, use Python 3.10-3.12:\n"
+            "   - Install pythonocc-core: pip install pythonocc-core"
+        )
+    return error_message
+
+
+def convert_component(component, key):
+    """
+    Run the conversion of a component's original_file and store the GLB, LODs
+    and geometry as a new shared asset. The component is not saved.
+    """
+    # The GLB levels are staged in a scratch workspace, copied to storage and
+    # removed with the workspace, whether processing succeeds or not
+    expected_size = component.original_file.size * SCRATCH_SIZE_FACTOR
+    with scratch_workspace(expected_size=expected_size) as workspace:
+        glb_output_path = workspace.file(f'{component.id}.glb')
+
+        process_result = process_cad_file(
+            component.original_file.path,
+            extract_geometry=True,
+            copy_glb_to=str(glb_output_path),
+            triangle_budget=component.triangle_budget,
+        )
+
+        geometry_data = process_result.get('geometry_data', {})
+        center = geometry_data.get('center', {})
+        component.bounding_box = geometry_data.get('bounding_box', {}) or component.bounding_box
+        if isinstance(center, list):
+            component.center = {'x': center[0], 'y': center[1], 'z': center[2]}
+        elif isinstance(center, dict):
+            component.center = center
+        component.volume = geometry_data.get('volume', component.volume)
+
+        glb_path = process_result.get('glb_path')
+        if glb_path and Path(glb_path).exists() and Path(glb_path).stat().st_size > 0:
+            component.glb_sha256 = file_sha256(glb_path)
+            with open(glb_path, 'rb') as glb_file:
+                # Content-addressed name: the file is shared by every component with this original
+                component.glb_file.save(
+                    f'{key}.glb',
+                    glb_file,
+                    save=False  # Don't save yet, we'll save after setting other fields
+                )
+            save_component_lods(component, process_result.get('lods', []))
+            logger.info(f"GLB file saved for component {component.id}: {component.glb_file.name}")
+            create_asset(component, key)
+        else:
+            logger.warning(f"GLB file not found for component {component.id}. Conversion may have failed.")
+
+
+class TransientProcessingError(Exception):
+    """Processing failed for a reason a later retry may not run into"""
+
+
+def is_transient_error(error):
+    """
+    Whether a processing error is worth retrying: a conversion backend that
+    timed out or could not be reached, or a lost database connection. A file
+    that cannot be converted fails the same way every time.
+    """
+    if isinstance(error, OperationalError):
+        return True
+    return is_backend_fault(error) and not isinstance(error, FileNotFoundError)
+
+
+def process_component(component_id, apply_placement_rules=True, file_version=None, raise_transient=False):
+    """
+    Convert a component's original_file and store the geometry, GLB and LODs.
+
+    Runs in a conversion worker process, a Celery worker or inline. The
+    outcome is recorded in processing_status / processing_error.
+
+    Args:
+        component_id: id of the Component to process
+        apply_placement_rules: fill mountable_sides, supported_orientations and
+            compatible_types from COMPONENT_PLACEMENT_RULES
+        file_version: file_version the job was queued for; the job is skipped
+            when the component has a newer file or this version was processed
+        raise_transient: on a transient error (see is_transient_error) leave the
+            component pending and raise TransientProcessingError, for callers
+            that retry the job
+
+    Returns:
+        dict with status ('completed', 'skipped' or 'error') and component_id or message
+    """
+    try:
+        component = Component.objects.get(id=component_id)
+    except Component.DoesNotExist:
+        logger.error(f"Component {component_id} not found")
+        return {'status': 'error', 'message': 'Component not found'}
+
+    if file_version is not None:
+        if component.file_version != file_version:
+            logger.info(
+                f"Skipping processing of component {component_id}: file version {file_version} "
+                f"was replaced by version {component.file_version}"
+            )
+            return {'status': 'skipped', 'component_id': component_id}
+        if component.processed_version == file_version and component.processing_status == 'completed':
+            logger.info(f"Skipping processing of component {component_id}: version {file_version} already processed")
+            return {'status': 'skipped', 'component_id': component_id}
+
+    component.processing_status = 'processing'
+    component.processing_error = None
+    component.save(update_fields=['processing_status', 'processing_error', 'updated_at'])
+
+    previous_asset_id, previous_files = component.asset_id, component_file_names(component)
+    try:
+        key = asset_key(component)
+        if reuse_processed_asset(component, key) is None:
+            convert_component(component, key)
+
+        if apply_placement_rules:
+            apply_placement_rules_for(component)
+
+        component.processing_status = 'completed'
+        component.processed_version = component.file_version
+        component.save()
+        release_previous_files(component, previous_asset_id, previous_files)
+    except Exception as e:
+        if raise_transient and is_transient_error(e):
+            Component.objects.filter(id=component_id).update(processing_status='pending', processing_error=None)
+            logger.warning(f"Processing of component {component_id} failed, to be retried: {e}")
+            raise TransientProcessingError(str(e)) from e
+        error_message = conversion_error_message(str(e))
+        component.processing_status = 'failed'
+        component.processing_error = error_message
+        component.save()
+        logger.error(f"Component processing failed: {error_message}", exc_info=True)
+        return {'status': 'error', 'message': error_message}
+
+    logger.info(f"Successfully processed component {component_id}")
+    return {'status': 'completed', 'component_id': component_id}
+
+
+def mark_component_failed(job_id, error_message, component_id, *args):
+    """Executor failure handler: record a job that died or timed out on the component"""
+    Component.objects.filter(id=component_id).exclude(processing_status='completed').update(
+        processing_status='failed',
+        processing_error=error_message,
+    )
+
+
+def submit_component_processing(component_id, apply_placement_rules=True, job_id=None, file_version=None,
+                                bulk=False):
+    """
+    Queue processing of a component on the conversion executor, or on the
+    database job queue when CAD_PROCESSING_BACKEND is 'jobqueue' (the job is
+    inserted when the current transaction commits). Bulk jobs get a lower
+    job queue priority than interactive ones. Job queue jobs raise transient
+    errors, so the queue retries them; mark_component_failed records the
+    error of the last attempt.
+
+    Returns:
+        The job dict
+
+    Raises:
+        ExecutorBusy: if the conversion queue is full
+    """
+    if getattr(settings, 'CAD_PROCESSING_BACKEND', 'executor') == 'jobqueue':
+        return enqueue(
+            process_component,
+            component_id,
+            apply_placement_rules,
+            file_version,
+            True,  # raise_transient
+            queue='conversions',
+            priority=BULK_PRIORITY if bulk else 0,
+            job_id=job_id,
+            on_failure=mark_component_failed,
+        )
+    sweep_stuck_components()
+    return get_conversion_executor().submit(
+        'components.processing.process_component',
+        component_id,
+        apply_placement_rules,
+        file_version,
+        job_id=job_id,
+        on_failure=mark_component_failed,
+    )
+
+
+_last_sweep = None
+
+
+def fail_stuck_components(timeout=None):
+    """
+    Fail components left pending or processing for longer than timeout
+    seconds (default CAD_PROCESSING_STUCK_TIMEOUT).
+
+    The conversion executor keeps its jobs in the memory of the web process,
+    so a restarted or OOM-killed process loses them and nothing would ever
+    finish their components. Every status change updates updated_at, so a
+    component idle that long has no job left. Should a job still finish later,
+    it completes the component as usual.
+
+    Returns:
+        Number of components failed
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'CAD_PROCESSING_STUCK_TIMEOUT', 3 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    count = Component.objects.filter(
+        processing_status__in=['pending', 'processing'], updated_at__lt=cutoff
+    ).update(
+        processing_status='failed',
+        processing_error=(
+            f"Processing did not finish within {timeout // 60} minutes (its conversion job was lost). "
+            "Please re-upload the file."
+        ),
+    )
+    if count:
+        logger.warning(f"Failed {count} component(s) stuck in processing for over {timeout}s")
+    return count
+
+
+def sweep_stuck_components():
+    """fail_stuck_components() at most once per CAD_PROCESSING_SWEEP_INTERVAL in this process"""
+    global _last_sweep
+    interval = getattr(settings, 'CAD_PROCESSING_SWEEP_INTERVAL', 600)
+    now = time.monotonic()
+    if _last_sweep is not None and now - _last_sweep < interval:
+        return
+    _last_sweep = now
+    try:
+        fail_stuck_components()
+    except OperationalError as e:
+        logger.warning(f"Sweep of stuck components failed: {e}")
+
+
+def processing_job_status(job_id):
+    """State of a processing job, from this process's executor or the job queue"""
+    if getattr(settings, 'CAD_PROCESSING_BACKEND', 'executor') == 'executor':
+        sweep_stuck_components()
+    return get_conversion_executor().job_status(job_id) or job_status(job_id)
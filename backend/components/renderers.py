@@ -0,0 +1,44 @@
+"""
+JSON rendering with orjson, when it is installed.
+"""
+import logging
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.info("orjson not installed; responses are rendered with the json module")
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson. The JSON is the same as
+    JSONRenderer's (compact, UTF-8, U+2028/U+2029 escaped); values orjson
+    does not encode itself (datetimes, Decimal, lazy strings, ...) go through
+    DRF's encoder. Without orjson, for indented output and for data orjson
+    rejects it renders with JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not ORJSON_AVAILABLE or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer: valid JSON, but not valid JavaScript unescaped
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
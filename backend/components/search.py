@@ -0,0 +1,132 @@
+"""
+Search of the component catalog.
+
+On PostgreSQL a query matches components through two GIN indexes (created
+by migration 0010): a tsvector over name, category and processing status,
+queried with prefix terms ("rol mot" finds "Roller motor"), and a pg_trgm
+index on UPPER(name) that serves the substring match of ?search= and
+catches what the word prefixes miss. Matches are ranked by a weighted
+ts_rank (name over category over status) plus trigram similarity of the
+name.
+
+Other databases (SQLite in development and tests) match word prefixes with
+LIKE and rank exact, leading and word-prefix name matches first.
+
+The expressions below must stay identical to the index definitions in the
+migration, or PostgreSQL cannot use the indexes.
+"""
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'simple'
+SEARCH_FIELDS = ('name', 'category_label', 'processing_status')
+
+
+def search_terms(query):
+    """Lowercased words of a query, safe to use as tsquery lexemes"""
+    return re.findall(r'\w+', query.lower())[:8]
+
+
+def _postgres():
+    return connection.vendor == 'postgresql'
+
+
+def _prefix_query(terms):
+    from django.contrib.postgres.search import SearchQuery
+    return SearchQuery(' & '.join(f"{term}:*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def _vector():
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+
+
+def filter_components(queryset, query):
+    """
+    Components matching a search query, in the queryset's order (the
+    ?search= filter of the component list).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if _postgres():
+        queryset = queryset.alias(search_vector=_vector())
+        return queryset.filter(Q(search_vector=_prefix_query(terms)) | Q(name__icontains=query.strip()))
+    return queryset.filter(_word_prefix_filter(terms))
+
+
+def _word_prefix_filter(terms):
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(name__istartswith=term) | Q(name__icontains=f" {term}")
+            | Q(category_label__istartswith=term) | Q(processing_status__istartswith=term)
+        )
+    return condition
+
+
+def rank_components(queryset, query):
+    """Components matching a query, best matches first"""
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if _postgres():
+        from django.contrib.postgres.search import SearchRank, SearchVector, TrigramSimilarity
+        weighted = (
+            SearchVector('name', config=SEARCH_CONFIG, weight='A')
+            + SearchVector('category_label', config=SEARCH_CONFIG, weight='B')
+            + SearchVector('processing_status', config=SEARCH_CONFIG, weight='C')
+        )
+        queryset = filter_components(queryset, query).annotate(
+            search_rank=SearchRank(weighted, _prefix_query(terms)) + TrigramSimilarity('name', query.strip())
+        )
+        return queryset.order_by('-search_rank', 'name', 'id')
+
+    name = query.strip()
+    queryset = queryset.filter(_word_prefix_filter(terms)).annotate(
+        search_rank=Case(
+            When(name__iexact=name, then=Value(3)),
+            When(name__istartswith=name, then=Value(2)),
+            When(Q(name__istartswith=terms[0]) | Q(name__icontains=f" {terms[0]}"), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    return queryset.order_by('-search_rank', 'name', 'id')
+
+
+def typeahead(queryset, query, limit):
+    """
+    Best matches for a (partial) query within the CAD_SEARCH_TIME_BUDGET.
+
+    On PostgreSQL the ranked query runs with that statement timeout; when it
+    is cancelled, unranked index matches are returned instead, so a slow plan
+    never holds up the builder's search palette. Inside a transaction the
+    timeout would outlive the query, so there the query runs without it.
+
+    Returns:
+        (list of components, whether they are ranked)
+    """
+    budget = getattr(settings, 'CAD_SEARCH_TIME_BUDGET', 20)  # milliseconds
+    if not _postgres() or not budget or connection.in_atomic_block:
+        return list(rank_components(queryset, query)[:limit]), True
+
+    started = time.monotonic()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL statement_timeout = {int(budget)}")
+            return list(rank_components(queryset, query)[:limit]), True
+    except DatabaseError as e:
+        logger.warning(
+            f"Ranked search for {query!r} exceeded {budget} ms "
+            f"({(time.monotonic() - started) * 1000:.0f} ms): {e}"
+        )
+    return list(filter_components(queryset, query).order_by('name', 'id')[:limit]), False
@@ -1,6 +1,9 @@
+from pathlib import Path
+
 from rest_framework import serializers
 from django.conf import settings
-from .models import Component, ComponentCategory, ConnectionPoint
+from django.urls import reverse
+from .models import Component, ComponentCategory, ConnectionPoint, UploadSession
 
 
 class ConnectionPointSerializer(serializers.ModelSerializer):
@@ -28,58 +31,166 @@ class ComponentCategorySerializer(serializers.ModelSerializer):
 
 
 class ComponentSerializer(serializers.ModelSerializer):
+    """
+    Component with its file URLs and geometry.
+
+    Pass fields=[...] to serialize only some fields (sparse fieldsets, see
+    ComponentViewSet); model_columns() gives the columns they are read from,
+    for loading the rows with .only().
+    """
     glb_url = serializers.SerializerMethodField()
     original_url = serializers.SerializerMethodField()
+    lods = serializers.SerializerMethodField()
     # Backward-compatible aliases for frontend
     category = serializers.CharField(source='category_label', read_only=True)
     type = serializers.CharField(source='category_label', read_only=True)
     
+    # Model columns read by fields that are not columns themselves
+    FIELD_COLUMNS = {
+        'category': ['category_label'],
+        'type': ['category_label'],
+        'glb_url': ['glb_file'],
+        'original_url': ['original_file'],
+        'lods': ['glb_file', 'lod_files'],
+    }
+    
     class Meta:
         model = Component
         fields = [
-            'id', 'name', 'category_label', 'category', 'type', 'glb_url', 'original_url',
-            'bounding_box', 'center', 'volume',
+            'id', 'name', 'category_label', 'category', 'type', 'glb_url', 'original_url', 'lods',
+            'triangle_budget', 'original_sha256', 'glb_sha256', 'bounding_box', 'center', 'volume',
             'mountable_sides', 'supported_orientations', 'compatible_types',
             'processing_status', 'processing_error', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'glb_url', 'original_url', 'bounding_box', 'center', 'volume',
+            'id', 'glb_url', 'original_url', 'lods', 'triangle_budget', 'original_sha256', 'glb_sha256',
+            'bounding_box', 'center', 'volume',
             'mountable_sides', 'supported_orientations', 'compatible_types',
             'processing_status', 'processing_error', 'created_at', 'updated_at'
         ]
         # Allow name and category_label to be updated, but original_file is handled in the view
     
-    def get_glb_url(self, obj):
-        if obj.glb_file:
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        self._url_base = None
+    
+    @classmethod
+    def model_columns(cls, fields):
+        """
+        Model columns needed to serialize the given fields.
+
+        Raises:
+            serializers.ValidationError: for a field the serializer does not have
+        """
+        unknown = [name for name in fields if name not in cls.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(cls.Meta.fields)}"
+            })
+        columns = []
+        for name in fields:
+            for column in cls.FIELD_COLUMNS.get(name, [name]):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+    
+    def _absolute_url(self, url):
+        """Absolute URL of a stored file; the request's scheme and host are resolved once"""
+        if not url.startswith('/'):
+            return url
+        if self._url_base is None:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.glb_file.url)
+                self._url_base = request.build_absolute_uri('/')[:-1]
             else:
                 # Build absolute URL using settings if request not available
-                base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-                media_url = obj.glb_file.url
-                if media_url.startswith('/'):
-                    return f"{base_url}{media_url}"
-                return media_url
+                self._url_base = getattr(settings, 'BASE_URL', 'http://localhost:8000')
+        return f"{self._url_base}{url}"
+    
+    def get_glb_url(self, obj):
+        if obj.glb_file:
+            return self._absolute_url(obj.glb_file.url)
         return None
     
+    def get_lods(self, obj):
+        """Level-of-detail GLB chain, finest first, so the viewer can load coarse levels first"""
+        lods = []
+        for entry in obj.lod_files or []:
+            lods.append({
+                'level': entry['level'],
+                'face_count': entry.get('face_count'),
+                'geometric_error': entry.get('geometric_error'),
+                'size': entry.get('size'),
+                'url': self._absolute_url(obj.glb_file.storage.url(entry['name'])),
+            })
+        return lods
+    
     def get_original_url(self, obj):
         if obj.original_file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.original_file.url)
-            else:
-                # Build absolute URL using settings if request not available
-                base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-                media_url = obj.original_file.url
-                if media_url.startswith('/'):
-                    return f"{base_url}{media_url}"
-                return media_url
+            return self._absolute_url(obj.original_file.url)
         return None
 
 
 class ComponentUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Component
-        fields = ['name', 'category_label', 'original_file']
+        fields = ['name', 'category_label', 'original_file', 'triangle_budget']
+
 
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Start of a resumable upload: the file's name and size plus the component's fields"""
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+    name = serializers.CharField(max_length=200)
+    category_label = serializers.ChoiceField(choices=Component.CATEGORY_CHOICES, required=False)
+    triangle_budget = serializers.IntegerField(min_value=100, required=False, allow_null=True)
+    
+    def validate_filename(self, value):
+        file_ext = Path(value).suffix.lower()
+        if file_ext not in settings.CAD_ALLOWED_EXTENSIONS:
+            raise serializers.ValidationError(
+                f'Invalid file type. Allowed: {", ".join(settings.CAD_ALLOWED_EXTENSIONS)}'
+            )
+        return Path(value).name
+    
+    def validate_size(self, value):
+        if value > settings.CAD_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'File too large. Maximum size: {settings.CAD_UPLOAD_MAX_SIZE / (1024*1024)} MB'
+            )
+        return value
+    
+    def create(self, validated_data):
+        component_data = {
+            key: validated_data[key]
+            for key in ('name', 'category_label', 'triangle_budget')
+            if validated_data.get(key) is not None
+        }
+        return UploadSession.objects.create(
+            filename=validated_data['filename'],
+            size=validated_data['size'],
+            expected_sha256=(validated_data.get('sha256') or '').lower(),
+            component_data=component_data,
+        )
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    upload_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'size', 'offset', 'status', 'error', 'sha256',
+            'component', 'upload_url', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_upload_url(self, obj):
+        url = reverse('component-upload-session', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
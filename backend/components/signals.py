@@ -1,87 +1,48 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.conf import settings
-from pathlib import Path
 import logging
-from .models import Component
-from cad_processing.utils import process_cad_file
-from .utils import COMPONENT_PLACEMENT_RULES
+from cad_processing.executor import ExecutorBusy
+from .assets import release_asset
+from .catalog import invalidate_catalog
+from .dispatch import dispatch_processing, is_processing_suppressed
+from .models import CatalogVersion, Component, ComponentCategory, ConnectionPoint
 
 logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Component)
-def handle_component_post_save(sender, instance: Component, created, **kwargs):
-    if not created:
+def handle_component_post_save(sender, instance: Component, created, raw=False, **kwargs):
+    # Fixtures (raw) and callers that dispatch the job themselves are left alone
+    if not created or raw or is_processing_suppressed():
         return
-    try:
-        instance.processing_status = 'processing'
-        instance.processing_error = None
-        instance.save(update_fields=['processing_status', 'processing_error'])
-
-        temp_path = Path(instance.original_file.path)
-        glb_output_path = Path(settings.MEDIA_ROOT) / 'components' / 'glb' / f'{instance.id}.glb'
-        glb_output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        process_result = process_cad_file(
-            temp_path,
-            extract_geometry=True,
-            copy_glb_to=str(glb_output_path)
+    try:
+        # Queued once the component row is committed
+        dispatch_processing(instance)
+    except ExecutorBusy as e:
+        Component.objects.filter(id=instance.id).update(
+            processing_status='failed',
+            processing_error=f"{e}. Please re-upload the file later.",
         )
+        logger.error(f"Could not queue processing for component {instance.id}: {e}")
 
-        geometry_data = process_result.get('geometry_data', {})
-        bbox = geometry_data.get('bounding_box', {})
-        center = geometry_data.get('center', {})
-
-        instance.bounding_box = bbox or instance.bounding_box
-        if isinstance(center, list):
-            instance.center = {'x': center[0], 'y': center[1], 'z': center[2]}
-        elif isinstance(center, dict):
-            instance.center = center
-        instance.volume = geometry_data.get('volume', instance.volume)
 
-        glb_path = process_result.get('glb_path')
-        if glb_path:
-            glb_path_obj = Path(glb_path)
-            # Check if GLB file was actually created and save it properly
-            if glb_path_obj.exists() and glb_path_obj.stat().st_size > 0:
-                with open(glb_path_obj, 'rb') as glb_file:
-                    instance.glb_file.save(
-                        f'{instance.id}.glb',
-                        glb_file,
-                        save=False  # Don't save yet, we'll save after setting other fields
-                    )
-                logger.info(f"GLB file saved for component {instance.id}: {instance.glb_file.name}")
-            else:
-                logger.warning(f"GLB conversion returned path but file doesn't exist or is empty: {glb_path}")
-
-        rules = COMPONENT_PLACEMENT_RULES.get(instance.category_label, {})
-        instance.mountable_sides = rules.get('mountable_sides', [])
-        instance.supported_orientations = rules.get('supported_orientations', ['fixed'])
-        instance.compatible_types = rules.get('compatible', [])
-
-        instance.processing_status = 'completed'
-        instance.save()
-    except Exception as e:
-        error_message = str(e)
-        # Provide more helpful error messages for STEP conversion failures
-        if 'STEP' in error_message or 'step' in error_message.lower() or 'conversion' in error_message.lower():
-            error_message = (
-                f"STEP file conversion failed: {error_message}\n\n"
-                "SOLUTIONS:\n"
-                "1. Pre-convert STEP to STL/OBJ:\n"
-                "   - Use FreeCAD (free): https://www.freecad.org/\n"
-                "   - Or use online converters\n"
-                "   - Then upload the STL or OBJ file instead\n\n"
-                "2. Set up FreeCAD Docker service:\n"
-                "   - Build the FreeCAD Docker container\n"
-                "   - Set FREECAD_DOCKER_URL environment variable\n"
-                "   - See backend/README.md for details\n\n"
-                "3. For development, use Python 3.10-3.12:\n"
-                "   - Install pythonocc-core: pip install pythonocc-core"
-            )
-        instance.processing_status = 'failed'
-        instance.processing_error = error_message
-        instance.save()
-        logger.error(f"Component processing failed: {error_message}", exc_info=True)
+@receiver(post_delete, sender=Component)
+def handle_component_post_delete(sender, instance: Component, **kwargs):
+    # Shared files are deleted with the last component referencing them
+    release_asset(instance.asset_id, instance.glb_file.storage)
 
 
+@receiver(post_save, sender=Component)
+@receiver(post_delete, sender=Component)
+@receiver(post_save, sender=ConnectionPoint)
+@receiver(post_delete, sender=ConnectionPoint)
+@receiver(post_save, sender=ComponentCategory)
+@receiver(post_delete, sender=ComponentCategory)
+def bump_catalog_version(sender, instance, **kwargs):
+    # Changes the ETag of every catalog response and drops the cached responses
+    # showing the instance (see components/catalog.py)
+    CatalogVersion.bump()
+    if sender is ComponentCategory:
+        invalidate_catalog(categories=True)
+    elif sender is Component:
+        invalidate_catalog([instance.pk])
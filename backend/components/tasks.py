@@ -1,101 +1,97 @@
 """
 Celery tasks for background CAD processing
+
+Conversions are routed by weight so a long STEP tessellation never holds up
+a worker that should convert a small mesh in seconds:
+
+- cad_heavy: STEP files and files over CAD_CELERY_HEAVY_FILE_SIZE
+- cad_light: GLB/GLTF, STL and OBJ files
+- cad_bulk:  reprocessing of many components (reprocess_components), kept
+  apart so it never delays interactive uploads
+
+Run a worker per queue, e.g.
+
+    celery -A cadbuilder worker -Q cad_light -c 4
+    celery -A cadbuilder worker -Q cad_heavy,cad_bulk -c 1
+
+Each queue has its own soft and hard time limit. Tasks are acknowledged
+after they ran (acks_late), so a task a worker was running when it shut
+down or lost its broker connection is delivered again; redelivery is safe
+because process_component skips a file_version that was already processed.
+Backend timeouts and connection errors are retried with exponential backoff.
 """
+import logging
+from pathlib import Path
+
 from celery import shared_task
 from django.conf import settings
-from pathlib import Path
-from .models import Component, ConnectionPoint
-from cad_processing.utils import process_cad_file
-from .utils import COMPONENT_PLACEMENT_RULES
-import logging
+
+from .models import Component
+from .processing import TransientProcessingError, process_component
 
 logger = logging.getLogger(__name__)
 
+HEAVY_QUEUE = 'cad_heavy'
+LIGHT_QUEUE = 'cad_light'
+BULK_QUEUE = 'cad_bulk'
+
+HEAVY_EXTENSIONS = ('.step', '.stp')
 
-@shared_task
-def process_component_async(component_id):
+
+def _time_limits(limit):
+    margin = getattr(settings, 'CAD_CELERY_SOFT_TIME_LIMIT_MARGIN', 30)
+    return {'time_limit': limit, 'soft_time_limit': max(limit - margin, 1)}
+
+
+def is_heavy_conversion(component):
+    """Whether converting the component's original_file needs tessellation or is large"""
+    if not component.original_file:
+        return False
+    if Path(component.original_file.name).suffix.lower() in HEAVY_EXTENSIONS:
+        return True
+    try:
+        size = component.original_file.size
+    except (OSError, ValueError):
+        return False
+    return size > getattr(settings, 'CAD_CELERY_HEAVY_FILE_SIZE', 25 * 1024 * 1024)
+
+
+def conversion_task_options(component, bulk=False):
     """
-    Process GLB/GLTF component file asynchronously.
-    Extracts geometry data from GLB file (no conversion needed).
+    apply_async options (queue, time limits) for processing a component.
+
+    Args:
+        component: Component to process
+        bulk: part of a bulk reprocessing run, queued behind interactive uploads
     """
-    try:
-        component = Component.objects.get(id=component_id)
-        
-        if component.processing_status == 'completed':
-            logger.warning(f"Component {component_id} already processed")
-            return
-        
-        component.processing_status = 'processing'
-        component.processing_error = None
-        component.save()
-        
-        # Get original file path
-        original_file_path = component.original_file.path
-        
-        # Process GLB file (no conversion needed)
-        glb_output_path = Path(settings.MEDIA_ROOT) / 'components' / 'glb' / f'{component.id}.glb'
-        glb_output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        process_result = process_cad_file(
-            original_file_path,
-            extract_geometry=True,
-            copy_glb_to=str(glb_output_path)
-        )
-        
-        geometry_data = process_result.get('geometry_data', {})
-        bbox = geometry_data.get('bounding_box', {})
-        center = geometry_data.get('center', {})
-        component.bounding_box = bbox
-        component.center = {'x': center[0], 'y': center[1], 'z': center[2]} if isinstance(center, list) else center
-        component.volume = geometry_data.get('volume', 0.0)
-        
-        # Save GLB file properly using Django FileField
-        if process_result.get('glb_path') and Path(process_result['glb_path']).exists():
-            glb_file_path = Path(process_result['glb_path'])
-            with open(glb_file_path, 'rb') as glb_file:
-                component.glb_file.save(
-                    f'{component.id}.glb',
-                    glb_file,
-                    save=False  # Don't save yet, we'll save after setting other fields
-                )
-        
-        # Fill from rules
-        rules = COMPONENT_PLACEMENT_RULES.get(component.category_label, {})
-        component.mountable_sides = rules.get('mountable_sides', [])
-        component.supported_orientations = rules.get('supported_orientations', ['fixed'])
-        component.compatible_types = rules.get('compatible', [])
-        
-        component.processing_status = 'completed'
-        component.save()
-        
-        logger.info(f"Successfully processed component {component_id}")
-        return {'status': 'completed', 'component_id': component_id}
-        
-    except Component.DoesNotExist:
-        logger.error(f"Component {component_id} not found")
-        return {'status': 'error', 'message': 'Component not found'}
-    except Exception as e:
-        error_message = str(e)
-        # Provide more helpful error messages for STEP conversion failures
-        if 'STEP' in error_message or 'step' in error_message.lower() or 'conversion' in error_message.lower():
-            error_message = (
-                f"STEP file conversion failed: {error_message}\n\n"
-                "SOLUTIONS:\n"
-                "1. Pre-convert STEP to STL/OBJ:\n"
-                "   - Use FreeCAD (free): https://www.freecad.org/\n"
-                "   - Or use online converters\n"
-                "   - Then upload the STL or OBJ file instead\n\n"
-                "2. Set up FreeCAD Docker service:\n"
-                "   - Build the FreeCAD Docker container\n"
-                "   - Set FREECAD_DOCKER_URL environment variable\n"
-                "   - See backend/README.md for details\n\n"
-                "3. For development, use Python 3.10-3.12:\n"
-                "   - Install pythonocc-core: pip install pythonocc-core"
-            )
-        logger.error(f"Error processing component {component_id}: {error_message}", exc_info=True)
-        if component:
-            component.processing_status = 'failed'
-            component.processing_error = error_message
-            component.save()
-        return {'status': 'error', 'message': error_message}
+    heavy = is_heavy_conversion(component)
+    if heavy:
+        limit = getattr(settings, 'CAD_CELERY_HEAVY_TIME_LIMIT', 600)
+    else:
+        limit = getattr(settings, 'CAD_CELERY_LIGHT_TIME_LIMIT', 120)
+    queue = BULK_QUEUE if bulk else HEAVY_QUEUE if heavy else LIGHT_QUEUE
+    return {'queue': queue, **_time_limits(limit)}
+
 
+@shared_task(
+    bind=True,
+    acks_late=True,
+    max_retries=getattr(settings, 'CAD_CELERY_MAX_RETRIES', 3),
+    retry_backoff=getattr(settings, 'CAD_CELERY_RETRY_BACKOFF', 30),
+    retry_backoff_max=getattr(settings, 'CAD_CELERY_RETRY_BACKOFF_MAX', 600),
+    retry_jitter=True,
+    autoretry_for=(TransientProcessingError,),
+)
+def process_component_async(self, component_id, apply_placement_rules=True, file_version=None):
+    """
+    Process a component's CAD file asynchronously.
+    Extracts geometry data and converts to GLB (see processing.process_component).
+
+    The last attempt records a transient error on the component like any
+    other failure instead of raising it for another retry.
+    """
+    if file_version is None and Component.objects.filter(id=component_id, processing_status='completed').exists():
+        logger.warning(f"Component {component_id} already processed")
+        return
+    retry_left = self.request.retries < self.max_retries
+    return process_component(component_id, apply_placement_rules, file_version, raise_transient=retry_left)
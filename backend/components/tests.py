@@ -0,0 +1,791 @@
+import base64
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from cadbuilder.celery import app as celery_app
+from jobqueue.models import Job
+from jobqueue.worker import Worker
+from projects.fast_serializers import project_data
+from projects.models import AssemblyItem, Project
+from projects.serializers import ProjectSerializer
+from .dispatch import dispatch_processing, processing_suppressed
+from .catalog import catalog_cache
+from .fast_serializers import ComponentRowSerializer
+from .processing import submit_component_processing
+from .models import CatalogVersion, Component, ComponentCategory, ConnectionPoint, ProcessedAsset, UploadSession
+from .renderers import FastJSONRenderer
+from .search import filter_components, rank_components, typeahead
+from .serializers import ComponentSerializer
+from .uploads import UploadConflict, UploadError, append_chunk
+from .tasks import BULK_QUEUE, HEAVY_QUEUE, LIGHT_QUEUE, conversion_task_options, process_component_async
+
+
+def create_component(**kwargs):
+    kwargs.setdefault('name', 'Roller')
+    kwargs.setdefault('category_label', 'other')
+    kwargs.setdefault('original_file', 'components/original/roller.step')
+    with processing_suppressed():
+        return Component.objects.create(**kwargs)
+
+
+@mock.patch('components.dispatch._submit')
+class DispatchProcessingTests(TestCase):
+    def test_submitted_on_commit(self, submit):
+        component = create_component()
+        with self.captureOnCommitCallbacks(execute=True):
+            job = dispatch_processing(component, job_id='a' * 32)
+            submit.assert_not_called()
+
+        self.assertEqual(job, {'id': 'a' * 32, 'status': 'queued'})
+        submit.assert_called_once_with(component.pk, component.file_version, True, None, 'a' * 32, False)
+
+    def test_nothing_submitted_after_rollback(self, submit):
+        component = create_component()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    dispatch_processing(component)
+                    raise ValueError()
+            except ValueError:
+                pass
+            # A later dispatch of the same version is queued
+            dispatch_processing(component)
+
+        self.assertEqual(len(callbacks), 1)
+        submit.assert_called_once()
+
+
+def backend_timeout():
+    """A conversion error as convert_step_via_* raise it for a backend that timed out"""
+    try:
+        raise requests.ConnectTimeout('converter unreachable')
+    except requests.ConnectTimeout as e:
+        try:
+            raise ValueError(f'STEP conversion failed: {e}') from e
+        except ValueError as error:
+            return error
+
+
+def raise_(error):
+    raise error
+
+
+@override_settings(CAD_CELERY_HEAVY_TIME_LIMIT=600, CAD_CELERY_LIGHT_TIME_LIMIT=120, CAD_CELERY_SOFT_TIME_LIMIT_MARGIN=30)
+class CeleryProcessingTests(TestCase):
+    def setUp(self):
+        # Tasks run in the test process; the Django settings were read into the
+        # app's configuration already, so it is changed there
+        previous = celery_app.conf['CELERY_TASK_ALWAYS_EAGER']
+        celery_app.conf['CELERY_TASK_ALWAYS_EAGER'] = True
+        self.addCleanup(celery_app.conf.__setitem__, 'CELERY_TASK_ALWAYS_EAGER', previous)
+        for name, value in [('asset_key', 'asset-key'), ('reuse_processed_asset', None)]:
+            patcher = mock.patch(f'components.processing.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('components.processing.convert_component')
+        self.convert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_task_options_route_by_weight(self):
+        step = create_component(original_file='components/original/frame.STEP')
+        mesh = create_component(original_file='components/original/roller.glb')
+
+        self.assertEqual(conversion_task_options(step), {'queue': HEAVY_QUEUE, 'time_limit': 600, 'soft_time_limit': 570})
+        with mock.patch('components.tasks.is_heavy_conversion', return_value=False):
+            self.assertEqual(conversion_task_options(mesh), {'queue': LIGHT_QUEUE, 'time_limit': 120, 'soft_time_limit': 90})
+        self.assertEqual(conversion_task_options(step, bulk=True)['queue'], BULK_QUEUE)
+
+    def test_dispatch_sends_task_to_its_queue(self):
+        component = create_component(original_file='components/original/frame.step')
+        with mock.patch.object(process_component_async, 'apply_async', wraps=process_component_async.apply_async) as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = dispatch_processing(component, apply_placement_rules=False, use_celery=True)
+
+        send.assert_called_once_with(
+            args=[component.pk, False, component.file_version], task_id=job['id'],
+            queue=HEAVY_QUEUE, time_limit=600, soft_time_limit=570,
+        )
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'completed')
+        self.assertEqual(component.processed_version, component.file_version)
+
+    def test_transient_error_retried(self):
+        component = create_component()
+        self.convert.side_effect = [backend_timeout(), backend_timeout(), None]
+
+        with self.assertLogs('components.processing', 'WARNING'):
+            result = process_component_async.apply(args=[component.pk, False, component.file_version])
+
+        self.assertTrue(result.successful())
+        self.assertEqual(self.convert.call_count, 3)
+        component.refresh_from_db()
+        self.assertEqual((component.processing_status, component.processing_error), ('completed', None))
+
+    def test_failed_after_last_retry(self):
+        component = create_component()
+        self.convert.side_effect = lambda *args: raise_(backend_timeout())
+
+        with self.assertLogs('components.processing', 'ERROR'):
+            result = process_component_async.apply(args=[component.pk, False, component.file_version])
+
+        # Recorded on the component by the last attempt instead of raised
+        self.assertTrue(result.successful())
+        self.assertEqual(result.result['status'], 'error')
+        self.assertEqual(self.convert.call_count, process_component_async.max_retries + 1)
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'failed')
+        self.assertTrue(component.processing_error)
+
+    def test_permanent_error_not_retried(self):
+        component = create_component()
+        self.convert.side_effect = ValueError('Invalid STEP file')
+
+        with self.assertLogs('components.processing', 'ERROR'):
+            process_component_async.apply(args=[component.pk, False, component.file_version])
+
+        self.assertEqual(self.convert.call_count, 1)
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'failed')
+
+
+@override_settings(CAD_PROCESSING_BACKEND='jobqueue', JOBQUEUE_MAX_ATTEMPTS=3)
+class JobQueueProcessingTests(TestCase):
+    def setUp(self):
+        for name, value in [('asset_key', 'asset-key'), ('reuse_processed_asset', None)]:
+            patcher = mock.patch(f'components.processing.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('components.processing.convert_component')
+        self.convert = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, component):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_component_processing(component.pk, False, file_version=component.file_version)
+        return Job.objects.get(id=job['id'])
+
+    def run_worker(self, job):
+        # Due now, whatever the retry backoff
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        Worker(concurrency=0, worker_id='worker-a').run_once()
+        job.refresh_from_db()
+
+    def test_transient_error_retried(self):
+        component = create_component()
+        self.convert.side_effect = [backend_timeout(), None]
+        job = self.submit(component)
+
+        with self.assertLogs('components.processing', 'WARNING'):
+            self.run_worker(job)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('converter unreachable', job.error)
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'pending')
+
+        self.run_worker(job)
+        self.assertEqual((job.status, job.attempts), ('completed', 2))
+        self.assertEqual(self.convert.call_count, 2)
+        component.refresh_from_db()
+        self.assertEqual((component.processing_status, component.processing_error), ('completed', None))
+
+    def test_failed_after_last_attempt(self):
+        component = create_component()
+        self.convert.side_effect = lambda *args: raise_(backend_timeout())
+        job = self.submit(component)
+
+        with self.assertLogs('components.processing', 'WARNING'):
+            for _ in range(3):
+                self.run_worker(job)
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'failed')
+        self.assertIn('converter unreachable', component.processing_error)
+
+    def test_permanent_error_not_retried(self):
+        component = create_component()
+        self.convert.side_effect = ValueError('Invalid STEP file')
+        job = self.submit(component)
+
+        with self.assertLogs('components.processing', 'ERROR'):
+            self.run_worker(job)
+        self.assertEqual((job.status, job.attempts), ('completed', 1))
+        component.refresh_from_db()
+        self.assertEqual(component.processing_status, 'failed')
+
+
+class SearchTests(APITestCase):
+    """The LIKE fallback used on SQLite"""
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ['Drive roller', 'Roller motor', 'Roller', 'Controller', 'Roller-chain', 'Belt drive']
+        cls.components = {name: create_component(name=name, category_label='Base') for name in names}
+        cls.components['Idler'] = create_component(name='Idler', category_label='Roller')
+
+    def names(self, components):
+        return [component.name for component in components]
+
+    def test_filter_matches_word_prefixes(self):
+        queryset = Component.objects.order_by('name')
+        self.assertEqual(
+            self.names(filter_components(queryset, 'rol')),
+            ['Drive roller', 'Idler', 'Roller', 'Roller motor', 'Roller-chain'],
+        )
+        # Every word has to match
+        self.assertEqual(self.names(filter_components(queryset, 'DRI rol')), ['Drive roller'])
+        self.assertEqual(self.names(filter_components(queryset, 'roller motor')), ['Roller motor'])
+
+    def test_rank_exact_then_leading_then_word_prefix(self):
+        self.assertEqual(
+            self.names(rank_components(Component.objects.all(), 'Roller')),
+            # Exact name, names starting with the query, a later word, the category
+            ['Roller', 'Roller motor', 'Roller-chain', 'Drive roller', 'Idler'],
+        )
+        self.assertEqual(self.names(rank_components(Component.objects.all(), 'roller m')),
+                         ['Roller motor'])
+        self.assertEqual(self.names(rank_components(Component.objects.all(), 'drive')),
+                         ['Drive roller', 'Belt drive'])
+
+    def test_empty_and_punctuation_queries_match_nothing(self):
+        for query in ['', '   ', '-', '?!.*%', "'"]:
+            with self.subTest(query=query):
+                self.assertEqual(list(filter_components(Component.objects.all(), query)), [])
+                self.assertEqual(list(rank_components(Component.objects.all(), query)), [])
+                self.assertEqual(typeahead(Component.objects.all(), query, 10), ([], True))
+
+    def test_typeahead_limit(self):
+        components, ranked = typeahead(Component.objects.all(), 'roller', 2)
+        self.assertEqual(self.names(components), ['Roller', 'Roller motor'])
+        self.assertTrue(ranked)
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/components/search/', {'q': 'rol', 'limit': 3})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['query'], data['ranked']), ('rol', True))
+        self.assertEqual([result['name'] for result in data['results']], ['Roller', 'Roller motor', 'Roller-chain'])
+        # The palette fields unless ?fields= asks for others
+        self.assertEqual(list(data['results'][0]), ['id', 'name', 'category', 'glb_url'])
+        self.assertEqual(data['results'][0]['id'], self.components['Roller'].id)
+
+    def test_search_endpoint_fields(self):
+        response = self.client.get('/api/components/search/', {'q': 'idler', 'fields': 'id,processing_status'})
+        self.assertEqual(response.json()['results'], [
+            {'id': self.components['Idler'].id, 'processing_status': 'pending'},
+        ])
+
+    def test_search_endpoint_without_matches(self):
+        for query in ['', '...', 'gearbox']:
+            with self.subTest(query=query):
+                response = self.client.get('/api/components/search/', {'q': query})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['results'], [])
+
+    def test_search_endpoint_bad_limit(self):
+        response = self.client.get('/api/components/search/', {'q': 'roller', 'limit': 'all'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CATALOG_CACHE_ENABLED=False)
+class CursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now()
+        # Three rows at the newest time, a single one, then two that tie again
+        times = [start, start, start, start - timedelta(seconds=1), start - timedelta(seconds=2),
+                 start - timedelta(seconds=2)]
+        for index, created_at in enumerate(times):
+            component = create_component(name=f'Roller {index}')
+            Component.objects.filter(id=component.id).update(created_at=created_at)
+        # -created_at, then id
+        cls.ordered = [component.id for component in Component.objects.order_by('-created_at', 'id')]
+
+    def get(self, url, **params):
+        # Links from the responses carry their parameters already
+        response = self.client.get(url, {'fields': 'id', **params} if '?' not in url else None)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, page):
+        return [row['id'] for row in page['results']]
+
+    def test_forward_and_back_across_ties(self):
+        for page_size in (1, 2, 4):
+            with self.subTest(page_size=page_size):
+                page = self.get('/api/components/', page_size=page_size)
+                self.assertEqual((page['count'], page['previous']), (6, None))
+                pages = [self.ids(page)]
+                while page['next']:
+                    page = self.get(page['next'])
+                    pages.append(self.ids(page))
+                self.assertEqual(sum(pages, []), self.ordered)
+                self.assertTrue(all(len(ids) == page_size for ids in pages[:-1]))
+
+                # Back again from the last page through the reverse cursors
+                back = [pages[-1]]
+                while page['previous']:
+                    page = self.get(page['previous'])
+                    back.append(self.ids(page))
+                self.assertEqual(back, pages[::-1])
+                # The first page reached backwards links forward only
+                self.assertIsNone(page['previous'])
+                self.assertEqual(self.ids(self.get(page['next'])), pages[1])
+
+    def test_without_count(self):
+        page = self.get('/api/components/', page_size=2, count='false')
+        self.assertNotIn('count', page)
+        self.assertEqual(self.ids(page), self.ordered[:2])
+        self.assertIn('count=false', page['next'])
+        self.assertEqual(self.ids(self.get(page['next'])), self.ordered[2:4])
+
+    def test_page_number_fallback(self):
+        page = self.get('/api/components/', page=1, page_size=2)
+        # PAGE_SIZE rows per page, page_size is a cursor pagination parameter
+        self.assertEqual((page['count'], page['next'], page['previous']), (6, None, None))
+        self.assertEqual(self.ids(page), self.ordered)
+        self.assertEqual(self.client.get('/api/components/', {'page': 2}).status_code, 404)
+
+    def test_invalid_cursor(self):
+        for cursor in ['not a cursor', 'e30', base64.urlsafe_b64encode(b'["yesterday", 1, false]').decode(),
+                       base64.urlsafe_b64encode(b'[null, 1, false]').decode()]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/components/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+
+@override_settings(
+    CATALOG_CACHE_ENABLED=True,
+    CATALOG_CACHE_ALIAS='default',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'catalog-tests'}},
+)
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        catalog_cache().clear()
+        self.roller = create_component(name='Roller')
+        self.motor = create_component(name='Motor')
+        self.category = ComponentCategory.objects.create(name='Drives')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def cache_states(self, *urls):
+        return [self.get(url)['X-Cache'] for url in urls]
+
+    def save(self, instance, **changes):
+        for name, value in changes.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_hit_returns_the_miss_body(self):
+        for url in ['/api/components/', '/api/components/?fields=id,name', f'/api/components/{self.roller.id}/',
+                    '/api/components/search/?q=rol', '/api/component-categories/']:
+            with self.subTest(url=url):
+                miss, hit = self.get(url), self.get(url)
+                self.assertEqual((miss['X-Cache'], hit['X-Cache']), ('MISS', 'HIT'))
+                self.assertEqual(hit.content, miss.content)
+                self.assertEqual(hit['Content-Type'], miss['Content-Type'])
+                self.assertEqual(hit['ETag'], miss['ETag'])
+
+    def test_query_parameter_order_shares_an_entry(self):
+        self.get('/api/components/?fields=id,name&page_size=1')
+        self.assertEqual(self.get('/api/components/?page_size=1&fields=id,name')['X-Cache'], 'HIT')
+
+    def test_component_save_drops_its_detail_and_the_lists(self):
+        roller_url, motor_url = f'/api/components/{self.roller.id}/', f'/api/components/{self.motor.id}/'
+        urls = [roller_url, motor_url, '/api/components/', '/api/components/search/?q=rol', '/api/component-categories/']
+        self.cache_states(*urls)
+
+        self.save(self.roller, name='Roller 2')
+
+        self.assertEqual(self.cache_states(*urls), ['MISS', 'HIT', 'MISS', 'MISS', 'HIT'])
+        self.assertEqual(self.get(roller_url).json()['name'], 'Roller 2')
+        self.assertIn('Roller 2', [component['name'] for component in self.get('/api/components/').json()['results']])
+
+    def test_component_delete_drops_the_lists(self):
+        self.cache_states('/api/components/', f'/api/components/{self.motor.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.roller.delete()
+
+        self.assertEqual(self.cache_states('/api/components/', f'/api/components/{self.motor.id}/'), ['MISS', 'HIT'])
+
+    def test_invalidated_on_commit(self):
+        url = f'/api/components/{self.roller.id}/'
+        self.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.roller.name = 'Roller 2'
+            self.roller.save()
+            self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+
+    def test_category_writes_drop_category_responses(self):
+        urls = ['/api/component-categories/', f'/api/component-categories/{self.category.id}/',
+                '/api/components/', f'/api/components/{self.roller.id}/']
+        self.cache_states(*urls)
+
+        self.save(self.category, description='Motors and gearboxes')
+        self.assertEqual(self.cache_states(*urls), ['MISS', 'MISS', 'HIT', 'HIT'])
+        self.assertEqual(self.get(urls[1]).json()['description'], 'Motors and gearboxes')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ComponentCategory.objects.create(name='Frames')
+        self.assertEqual(self.cache_states(*urls), ['MISS', 'MISS', 'HIT', 'HIT'])
+        self.assertEqual(len(self.get(urls[0]).json()), 2)
+
+    def test_last_modified_after_a_write_in_the_same_second(self):
+        written = timezone.now().replace(microsecond=300000) - timedelta(seconds=10)
+        CatalogVersion.objects.filter(pk=1).update(updated_at=written)
+
+        # Not sent while a later write could still get the same Last-Modified
+        with mock.patch('components.catalog.time.time', return_value=written.timestamp() + 0.5):
+            self.assertNotIn('Last-Modified', self.get('/api/components/'))
+        response = self.get('/api/components/')
+        # Rounded up to the end of the second
+        self.assertEqual(response['Last-Modified'], http_date(int(written.timestamp()) + 1))
+        response = self.client.get('/api/components/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.save(self.roller, name='Drive roller')
+        response = self.client.get(
+            '/api/components/', HTTP_IF_MODIFIED_SINCE=http_date(int(written.timestamp()) + 1)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CATALOG_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.get('/api/components/')
+        self.assertNotIn('X-Cache', self.get('/api/components/'))
+
+
+class FastSerializerTests(TestCase):
+    """ComponentRowSerializer and project_data give the DRF serializers' output"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.complete = create_component(
+            name='Drive roller',
+            category_label='Roller',
+            # Not URL-safe, so the name is quoted
+            original_file='components/original/Förder band #1 (v2).step',
+            glb_file='components/glb/drive_roller.glb',
+            lod_files=[
+                {'level': 0, 'name': 'components/glb/drive_roller.glb', 'face_count': 4000,
+                 'geometric_error': 0.0, 'size': 81920},
+                {'level': 1, 'name': 'components/glb/drive roller_lod1.glb', 'face_count': 1000,
+                 'geometric_error': 0.25, 'size': 20480},
+                {'level': 2, 'name': 'components/glb/drive_roller_lod2.glb'},
+            ],
+            triangle_budget=5000,
+            original_sha256='a' * 64,
+            bounding_box={'min': [0, 0, 0], 'max': [1.5, 0.25, 1e-7]},
+            center=[0.75, 0.125, 5e-8],
+            volume=0.1875,
+            mountable_sides=['bottom'],
+            supported_orientations=[{'axis': 'z', 'angle': 90}],
+            compatible_types=['mount', 'screw'],
+            processing_status='completed',
+        )
+        # No GLB yet, empty JSON columns, no asset
+        cls.pending = create_component(name='Motor', category_label='Motor', glb_file=None,
+                                       processing_error='Converter unreachable')
+        cls.empty_files = create_component(name='Frame', category_label='Frame', original_file='', glb_file='',
+                                           bounding_box={}, center={})
+        cls.request = APIRequestFactory().get('/api/components/', secure=True)
+
+    def assertSameJSON(self, drf_data, fast_data):
+        expected = json.loads(JSONRenderer().render(drf_data))
+        actual = json.loads(FastJSONRenderer().render(fast_data))
+        self.assertEqual(actual, expected)
+        # Same field order as well
+        for expected_row, actual_row in zip(expected, actual):
+            self.assertEqual(list(actual_row), list(expected_row))
+
+    def components(self, request, fields=None):
+        queryset = Component.objects.order_by('-created_at', 'id')
+        kwargs = {} if fields is None else {'fields': fields}
+        drf = ComponentSerializer(queryset, many=True, context={'request': request}, **kwargs).data
+        serializer = ComponentRowSerializer(request, fields=fields)
+        return drf, serializer.serialize(serializer.values(queryset))
+
+    def test_components(self):
+        drf, fast = self.components(self.request)
+        self.assertEqual(len(fast), 3)
+        self.assertSameJSON(drf, fast)
+        row = {component['id']: component for component in fast}[self.complete.id]
+        self.assertTrue(row['original_url'].startswith('https://testserver/'))
+
+    def test_components_without_request(self):
+        with override_settings(BASE_URL='https://cad.example.com'):
+            self.assertSameJSON(*self.components(None))
+
+    def test_sparse_fieldsets(self):
+        for fields in [['id'], ['id', 'name', 'category', 'glb_url'], ['lods'], ['lods', 'created_at', 'type'],
+                       ['original_url', 'bounding_box', 'processing_error', 'updated_at'],
+                       list(reversed(ComponentSerializer.Meta.fields))]:
+            with self.subTest(fields=fields):
+                drf, fast = self.components(self.request, fields)
+                self.assertSameJSON(drf, fast)
+                self.assertEqual(set(fast[0]), set(fields))
+
+    def test_unknown_field(self):
+        with self.assertRaises(serializers.ValidationError):
+            ComponentRowSerializer(fields=['id', 'password'])
+
+    def test_project(self):
+        owner = User.objects.create_user('planner')
+        project = Project.objects.create(name='Line 1', owner=owner, metadata={'units': 'mm'})
+        other = Project.objects.create(name='Line 2')
+        point = ConnectionPoint.objects.create(component=self.complete, name='shaft', position_x=0.0, position_y=0.5, position_z=0.25,
+                                               compatible_types=['mount'], side_label='left')
+        # A parent in another project, so it is not among the project's rows
+        outside = AssemblyItem.objects.create(project=other, component=self.pending, position_x=10.0)
+        base = AssemblyItem.objects.create(project=project, component=self.complete, position_x=1.0, order=0,
+                                           parent=outside, connection_point=point, attached_at_point='shaft')
+        child = AssemblyItem.objects.create(project=project, component=self.pending, position_y=2.0, order=1,
+                                            parent=base, connected_to=base, rotation_z=0.7071, rotation_w=0.7071)
+        AssemblyItem.objects.create(project=project, component=self.empty_files, position_z=-3.0, order=2,
+                                    parent=child, custom_name='Frame A', metadata={'note': None})
+        AssemblyItem.objects.create(project=project, component=self.complete, order=3)
+
+        instance = Project.objects.get(id=project.id)
+        self.assertSameJSON([ProjectSerializer(instance, context={'request': self.request}).data],
+                            [project_data(instance, self.request)])
+        data = project_data(instance, self.request)
+        self.assertEqual(data['assembly_items'][2]['world_transform']['position'], [11.0, 2.0, -3.0])
+
+    def test_project_without_owner_or_items(self):
+        instance = Project.objects.create(name='Empty')
+        instance = Project.objects.get(id=instance.id)
+        self.assertSameJSON([ProjectSerializer(instance).data], [project_data(instance)])
+        self.assertNotIn('owner_username', project_data(instance))
+
+
+class DirectGLBUpdateTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_glb_upload_releases_shared_asset(self):
+        original = default_storage.save('components/original/roller.step', io.BytesIO(b'ISO-10303-21;'))
+        glb = default_storage.save('components/glb/roller.glb', io.BytesIO(b'glTF shared'))
+        asset = ProcessedAsset.objects.create(key='k' * 64, original_sha256='a' * 64, original_file=original,
+                                              glb_file=glb, ref_count=2)
+        first, second = [create_component(original_file=original, glb_file=glb, asset=asset) for _ in range(2)]
+
+        for component, ref_count in [(first, 1), (second, None)]:
+            before = Component.objects.get(id=component.id).updated_at
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    f'/api/components/{component.id}/',
+                    {'glb_file': SimpleUploadedFile('custom.glb', b'glTF custom')},
+                    format='multipart',
+                )
+            self.assertEqual(response.status_code, 200)
+
+            component.refresh_from_db()
+            self.assertIsNone(component.asset_id)
+            self.assertGreater(component.updated_at, before)
+            self.assertEqual(ProcessedAsset.objects.filter(id=asset.id).values_list('ref_count', flat=True).first(),
+                             ref_count)
+            # A copy of the original file of its own, the asset's one is untouched
+            self.assertNotEqual(component.original_file.name, original)
+            with component.original_file.open('rb') as file:
+                self.assertEqual(file.read(), b'ISO-10303-21;')
+            with component.glb_file.open('rb') as file:
+                self.assertEqual(file.read(), b'glTF custom')
+
+        # Deleted with the last reference
+        self.assertFalse(default_storage.exists(original))
+        self.assertFalse(default_storage.exists(glb))
+
+
+@mock.patch('components.dispatch._submit')
+class ResumableUploadTests(APITestCase):
+    content = bytes(range(256)) * 40
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, CAD_UPLOAD_CHUNK_MAX_SIZE=4096)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create(self, **data):
+        data = {'filename': 'belt.stl', 'size': len(self.content), 'name': 'Belt', **data}
+        response = self.client.post('/api/components/uploads/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def patch(self, upload_id, offset, chunk, **headers):
+        return self.client.generic(
+            'PATCH', f'/api/components/uploads/{upload_id}/', chunk,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def finalize(self, upload_id):
+        return self.client.post(f'/api/components/uploads/{upload_id}/finalize/')
+
+    def test_create(self, submit):
+        upload_id = self.create(sha256=hashlib.sha256(self.content).hexdigest().upper())
+
+        response = self.client.get(f'/api/components/uploads/{upload_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response['Upload-Offset'], response['Upload-Length']), ('0', str(len(self.content))))
+        data = response.json()
+        self.assertEqual((data['filename'], data['offset'], data['status']), ('belt.stl', 0, 'uploading'))
+        self.assertTrue(data['upload_url'].endswith(f'/api/components/uploads/{upload_id}/'))
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual(session.expected_sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(session.component_data, {'name': 'Belt'})
+
+    def test_create_rejects_bad_files(self, submit):
+        for data in [{'filename': 'belt.exe'}, {'size': 0}, {'sha256': 'abc'}]:
+            with self.subTest(data=data):
+                response = self.client.post(
+                    '/api/components/uploads/', {'filename': 'belt.stl', 'size': 10, 'name': 'Belt', **data},
+                    format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunked_upload(self, submit):
+        upload_id = self.create(sha256=hashlib.sha256(self.content).hexdigest())
+
+        for offset in range(0, len(self.content) - 4096, 4096):
+            chunk = self.content[offset:offset + 4096]
+            checksum = base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+            response = self.patch(upload_id, offset, chunk, HTTP_UPLOAD_CHECKSUM=f'sha256 {checksum}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Upload-Offset'], str(offset + len(chunk)))
+
+        # The final PATCH completes the upload and queues processing
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.patch(upload_id, 8192, self.content[8192:])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Upload-Offset'], str(len(self.content)))
+        component = Component.objects.get(id=response.json()['id'])
+        self.assertEqual(component.name, 'Belt')
+        self.assertEqual(component.original_sha256, hashlib.sha256(self.content).hexdigest())
+        with component.original_file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        submit.assert_called_once()
+
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual((session.status, session.component_id, session.parts), ('completed', component.id, []))
+        # A retried finalize returns the component without queueing it again
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], component.id)
+        submit.assert_called_once()
+
+    def test_resume_after_offset_conflict(self, submit):
+        upload_id = self.create()
+        self.assertEqual(self.patch(upload_id, 0, self.content[:4096]).status_code, 200)
+
+        # A repeated chunk, e.g. after a lost response, is refused with the current offset
+        response = self.patch(upload_id, 0, self.content[:4096])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '4096')
+        self.assertIn('does not match', response.json()['error'])
+
+        # The client continues from there
+        self.assertEqual(self.client.head(f'/api/components/uploads/{upload_id}/')['Upload-Offset'], '4096')
+        self.assertEqual(self.patch(upload_id, 4096, self.content[4096:8192]).status_code, 200)
+        self.assertEqual(self.patch(upload_id, 8192, self.content[8192:]).status_code, 202)
+        component = UploadSession.objects.get(id=upload_id).component
+        with component.original_file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_conditional_commit(self, submit):
+        upload_id = self.create()
+        session = UploadSession.objects.get(id=upload_id)
+        # Another request stores the same range while this one reads its body
+        UploadSession.objects.filter(id=upload_id).update(offset=4096)
+
+        with self.assertRaises(UploadConflict):
+            append_chunk(session, io.BytesIO(self.content[:4096]), 0, 4096)
+        session.refresh_from_db()
+        self.assertEqual((session.offset, session.parts), (4096, []))
+        # The part file of the losing request was deleted
+        self.assertEqual(default_storage.listdir(f'uploads/{upload_id}')[1], [])
+
+    def test_bad_chunks(self, submit):
+        upload_id = self.create()
+        wrong_checksum = base64.b64encode(hashlib.sha256(b'other').digest()).decode()
+        for chunk, headers, status_code in [
+            (self.content[:4096], {'HTTP_UPLOAD_CHECKSUM': f'sha256 {wrong_checksum}'}, 400),
+            (self.content[:4096], {'HTTP_UPLOAD_CHECKSUM': 'md5 abc'}, 400),
+            (self.content[:4097], {}, 413),
+        ]:
+            with self.subTest(headers=headers, size=len(chunk)):
+                response = self.patch(upload_id, 0, chunk, **headers)
+                self.assertEqual(response.status_code, status_code)
+        # A body that ends before its Content-Length (the test client cannot send one)
+        session = UploadSession.objects.get(id=upload_id)
+        with self.assertRaisesMessage(UploadError, 'Chunk ended after 100 of 4096 bytes'):
+            append_chunk(session, io.BytesIO(self.content[:100]), 0, 4096)
+
+        session.refresh_from_db()
+        self.assertEqual((session.offset, session.parts), (0, []))
+        self.assertEqual(self.patch(upload_id, 0, self.content[:4096]).status_code, 200)
+
+    def test_checksum_mismatch(self, submit):
+        upload_id = self.create(sha256='0' * 64)
+        for offset in range(0, len(self.content), 4096):
+            response = self.patch(upload_id, offset, self.content[offset:offset + 4096])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('checksum mismatch', response.json()['error'])
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual((session.status, session.parts), ('failed', []))
+        self.assertEqual(session.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertFalse(Component.objects.exists())
+        # Nothing left to finalize
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'failed')
+        submit.assert_not_called()
+
+    def test_finalize_retries_failed_assembly(self, submit):
+        upload_id = self.create()
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+        for offset in range(0, len(self.content) - 4096, 4096):
+            self.patch(upload_id, offset, self.content[offset:offset + 4096])
+
+        with mock.patch('components.uploads.JoinedParts.read', side_effect=OSError('storage unavailable')):
+            with self.assertRaises(OSError):
+                self.patch(upload_id, 8192, self.content[8192:])
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual((session.status, session.offset), ('uploading', len(self.content)))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 202)
+        component = Component.objects.get(id=response.json()['id'])
+        with component.original_file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
@@ -0,0 +1,278 @@
+"""
+Resumable, chunked uploads of component CAD files.
+
+The protocol follows tus (https://tus.io) in spirit:
+
+    POST   /api/components/uploads/                create a session (filename, size, name,
+                                                   category_label, optional triangle_budget/sha256)
+    HEAD   /api/components/uploads/{id}/           Upload-Offset / Upload-Length headers
+    GET    /api/components/uploads/{id}/           session state as JSON
+    PATCH  /api/components/uploads/{id}/           raw chunk bytes; Upload-Offset must equal the
+                                                   current offset, optional Upload-Checksum:
+                                                   sha256 <base64 digest of the chunk>
+    POST   /api/components/uploads/{id}/finalize/  complete a session whose bytes are all in
+    DELETE /api/components/uploads/{id}/           abort and delete the stored chunks
+
+A client that loses its connection asks for the offset and continues from
+there. Each chunk is streamed into storage as a part file while its SHA-256
+is computed; the offset only advances once the part is stored, with a
+conditional update, so concurrent or repeated PATCHes of the same offset
+cannot both be committed. When the last byte arrives the parts are joined,
+streamed, into the component's original_file and the whole-file SHA-256 is
+checked against the one announced at creation.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Component, UploadSession
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Chunks up to this size are buffered in memory before they go to storage
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """The request cannot be applied to the upload session (HTTP 400)"""
+
+
+class UploadConflict(ValueError):
+    """The chunk does not start at the session's current offset, or the session is not open (HTTP 409)"""
+
+
+def max_chunk_size():
+    return getattr(settings, 'CAD_UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+
+
+def parse_checksum_header(value):
+    """
+    Parse an Upload-Checksum header ("sha256 <base64 digest>").
+
+    Returns:
+        The digest bytes, or None when the header is absent
+    """
+    if not value:
+        return None
+    algorithm, _, encoded = value.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError(f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        return base64.b64decode(encoded.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError("Malformed Upload-Checksum header")
+
+
+def _part_name(session, offset):
+    return f"uploads/{session.id}/{offset:015d}.part"
+
+
+def append_chunk(session, stream, offset, length, checksum=None):
+    """
+    Store one chunk of an upload and advance the session's offset.
+
+    Args:
+        session: UploadSession
+        stream: file-like request body to read the chunk from
+        offset: Upload-Offset given by the client
+        length: chunk size in bytes (the request's Content-Length)
+        checksum: expected SHA-256 digest bytes of the chunk, or None
+
+    Returns:
+        The refreshed UploadSession
+
+    Raises:
+        UploadConflict: offset mismatch, or the session is no longer uploading
+        UploadError: bad length, short body or checksum mismatch
+    """
+    if session.status != 'uploading':
+        raise UploadConflict(f"Upload is {session.status}")
+    if offset != session.offset:
+        raise UploadConflict(f"Upload-Offset {offset} does not match the current offset {session.offset}")
+    if length <= 0:
+        raise UploadError("Empty chunk")
+    if length > max_chunk_size():
+        raise UploadError(f"Chunk too large. Maximum chunk size: {max_chunk_size()} bytes")
+    if offset + length > session.size:
+        raise UploadError(f"Chunk ends at byte {offset + length}, past the declared size {session.size}")
+
+    digest = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as buffer:
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            buffer.write(data)
+            remaining -= len(data)
+        if remaining:
+            raise UploadError(f"Chunk ended after {length - remaining} of {length} bytes")
+        if checksum is not None and digest.digest() != checksum:
+            raise UploadError("Chunk checksum mismatch")
+        buffer.seek(0)
+        part_name = default_storage.save(_part_name(session, offset), File(buffer))
+
+    parts = list(session.parts) + [[offset, part_name, length]]
+    committed = UploadSession.objects.filter(id=session.id, status='uploading', offset=offset).update(
+        offset=offset + length,
+        parts=parts,
+        updated_at=timezone.now(),
+    )
+    if not committed:
+        # Another request stored this range first
+        default_storage.delete(part_name)
+        session.refresh_from_db()
+        raise UploadConflict(f"Upload-Offset {offset} does not match the current offset {session.offset}")
+    session.refresh_from_db()
+    return session
+
+
+class JoinedParts:
+    """Read-only stream over the stored parts of an upload, hashing as it goes"""
+
+    def __init__(self, parts):
+        self.parts = sorted(parts)
+        self.size = sum(part_size for _, _, part_size in self.parts)
+        self.sha256 = hashlib.sha256()
+        self.closed = False
+        self._index = 0
+        self._current = None
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("JoinedParts is not seekable")
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size
+        chunks = []
+        while size > 0 and self._index < len(self.parts):
+            if self._current is None:
+                self._current = default_storage.open(self.parts[self._index][1], 'rb')
+            data = self._current.read(min(size, STREAM_CHUNK_SIZE))
+            if not data:
+                self._current.close()
+                self._current = None
+                self._index += 1
+                continue
+            chunks.append(data)
+            size -= len(data)
+        data = b''.join(chunks)
+        self.sha256.update(data)
+        return data
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+        self.closed = True
+
+
+def delete_parts(session):
+    for _, part_name, _ in session.parts:
+        try:
+            default_storage.delete(part_name)
+        except Exception as e:
+            logger.warning(f"Could not delete upload part {part_name}: {e}")
+    try:
+        # Local storage keeps the emptied per-upload directory around
+        os.rmdir(default_storage.path(f"uploads/{session.id}"))
+    except (NotImplementedError, OSError):
+        pass
+
+
+def complete_upload(session):
+    """
+    Join the parts of a fully received upload into a new Component.
+
+    The component is saved with processing_status 'pending'; queueing its
+    conversion is left to the caller.
+
+    Returns:
+        The new Component
+
+    Raises:
+        UploadConflict: bytes are missing, or another request is completing it
+        UploadError: the assembled file does not match the announced SHA-256
+    """
+    if session.status == 'completed' and session.component_id:
+        return session.component
+    if session.offset != session.size:
+        raise UploadConflict(f"Upload incomplete: {session.offset} of {session.size} bytes received")
+    claimed = UploadSession.objects.filter(id=session.id, status='uploading', offset=session.size).update(
+        status='assembling', updated_at=timezone.now()
+    )
+    if not claimed:
+        session.refresh_from_db()
+        raise UploadConflict(f"Upload is {session.status}")
+
+    component = Component(processing_status='pending', **session.component_data)
+    stream = JoinedParts(session.parts)
+    try:
+        component.original_file.save(session.filename, File(stream, name=session.filename), save=False)
+    except Exception:
+        UploadSession.objects.filter(id=session.id).update(status='uploading')
+        raise
+    finally:
+        stream.close()
+
+    session.sha256 = stream.sha256.hexdigest()
+    if session.expected_sha256 and session.sha256 != session.expected_sha256.lower():
+        component.original_file.delete(save=False)
+        delete_parts(session)
+        session.status = 'failed'
+        session.error = f"File checksum mismatch: expected {session.expected_sha256}, got {session.sha256}"
+        session.parts = []
+        session.save(update_fields=['status', 'error', 'sha256', 'parts', 'updated_at'])
+        raise UploadError(session.error)
+
+    # The hash is known already, processing does not need to read the file again
+    component.original_sha256 = session.sha256
+    component.save()
+    delete_parts(session)
+    session.component = component
+    session.status = 'completed'
+    session.parts = []
+    session.save(update_fields=['component', 'status', 'sha256', 'parts', 'updated_at'])
+    logger.info(f"Upload {session.id} completed as component {component.id} ({session.size} bytes)")
+    return component
+
+
+def abort_upload(session):
+    """Delete an upload session and its stored parts"""
+    delete_parts(session)
+    session.delete()
+
+
+def purge_stale_uploads(max_age=None):
+    """
+    Delete unfinished upload sessions not touched for max_age seconds.
+
+    Returns:
+        Number of sessions deleted
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'CAD_UPLOAD_SESSION_MAX_AGE', 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status='completed')
+    count = 0
+    for session in stale.iterator():
+        abort_upload(session)
+        count += 1
+    if count:
+        logger.info(f"Purged {count} stale upload sessions")
+    return count
@@ -2,48 +2,77 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
 from django.db import transaction
+from django.db.models import F
 from django.conf import settings
+from django.urls import reverse
 from pathlib import Path
-import os
 import logging
-from django.db.models.signals import post_save
-from .signals import handle_component_post_save
 
 logger = logging.getLogger(__name__)
 
 from .models import Component, ComponentCategory, ConnectionPoint
 from .serializers import (
     ComponentSerializer, ComponentCategorySerializer,
-    ComponentUploadSerializer, ConnectionPointSerializer
+    ComponentUploadSerializer, ConnectionPointSerializer,
+    UploadSessionCreateSerializer, UploadSessionSerializer
 )
-from cad_processing.utils import process_cad_file
-
-# Try to import Celery task for async processing
-try:
-    from .tasks import process_component_async
-    CELERY_AVAILABLE = True
-except ImportError:
-    CELERY_AVAILABLE = False
+from .models import UploadSession
+from .fast_serializers import ComponentRowSerializer
+from .pagination import ComponentCursorPagination
+from .renderers import FastJSONRenderer
+from .catalog import CATEGORIES, ConditionalCatalogMixin
+from .assets import delete_stored_files, release_asset, uploaded_file_sha256
+from .dispatch import CELERY_AVAILABLE, dispatch_processing, processing_suppressed
+from .processing import complete_from_processed_asset, component_file_names, processing_job_status
+from .search import filter_components, typeahead
+from .uploads import (
+    UploadConflict, UploadError, abort_upload, append_chunk, complete_upload, max_chunk_size,
+    parse_checksum_header
+)
+from cad_processing.executor import ExecutorBusy
+from cad_processing.converters import get_converter_registry
+from cad_processing.occ_tessellation import PYTHONOCC_AVAILABLE
 
+# category_label for a ?category= value, by choice value or display label
+CATEGORY_LABELS = {
+    name.lower(): value for value, label in Component.CATEGORY_CHOICES for name in (value, label)
+}
 
-class ComponentCategoryViewSet(viewsets.ModelViewSet):
+class ComponentCategoryViewSet(ConditionalCatalogMixin, viewsets.ModelViewSet):
     """ViewSet for component categories"""
     queryset = ComponentCategory.objects.all()
     serializer_class = ComponentCategorySerializer
     pagination_class = None
+    cache_scope = CATEGORIES
+
 
+class ComponentViewSet(ConditionalCatalogMixin, viewsets.ModelViewSet):
+    """
+    Simplified components API
 
-class ComponentViewSet(viewsets.ModelViewSet):
-    """Simplified components API"""
+    Lists are keyset paginated (see components/pagination.py). On list,
+    retrieve and search, ?fields=id,name,glb_url returns only those fields
+    and loads only the columns they need. Their responses carry ETags, and
+    a repeated request for an unchanged catalog gets 304 (see components/catalog.py).
+    Lists are serialized from .values() rows (see components/fast_serializers.py).
+    """
     queryset = Component.objects.all()
     serializer_class = ComponentSerializer
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    renderer_classes = [FastJSONRenderer]
+    pagination_class = ComponentCursorPagination
+    conditional_actions = ('list', 'retrieve', 'search')
+    # Fields of search results unless ?fields= asks for others
+    palette_fields = ['id', 'name', 'category', 'glb_url']
     
     def update(self, request, *args, **kwargs):
         """
         Update component, including handling original_file and glb_file updates.
-        When original_file is updated, regenerate GLB file and geometry data.
+        When original_file is updated, GLB file and geometry data are regenerated
+        by a conversion job and the response is 202 with a job handle.
         When glb_file is updated directly, use it without processing.
         """
         instance = self.get_object()
@@ -77,9 +106,30 @@ class ComponentViewSet(viewsets.ModelViewSet):
             if 'category_label' in request.data:
                 instance.category_label = request.data['category_label']
             
-            # Save the GLB file directly
+            # The replaced GLB and LOD files are deleted, unless a shared asset owns them
+            previous_asset_id = instance.asset_id
+            previous_files = [] if previous_asset_id else component_file_names(instance)
+            storage = instance.glb_file.storage
+            
+            if previous_asset_id:
+                # The component no longer matches the asset; it keeps its own copy of
+                # the original file, which the asset may delete with its last reference
+                with storage.open(instance.original_file.name, 'rb') as shared_original:
+                    instance.original_file.save(
+                        Path(instance.original_file.name).name, File(shared_original), save=False
+                    )
+                instance.asset = None
+            
+            # Save the GLB file directly (replaces any generated LOD chain)
             instance.glb_file = uploaded_glb_file
-            instance.save(update_fields=['name', 'category_label', 'glb_file'])
+            instance.glb_sha256 = uploaded_file_sha256(uploaded_glb_file)
+            instance.lod_files = []
+            instance.save(update_fields=[
+                'name', 'category_label', 'original_file', 'glb_file', 'glb_sha256', 'lod_files', 'asset', 'updated_at'
+            ])
+            keep = [instance.glb_file.name, instance.original_file.name]
+            release_asset(previous_asset_id, storage, keep=keep)
+            transaction.on_commit(lambda: delete_stored_files(storage, previous_files, keep=keep))
             
             # Return updated component
             response_serializer = ComponentSerializer(instance, context={'request': request})
@@ -96,101 +146,67 @@ class ComponentViewSet(viewsets.ModelViewSet):
                 )
             
             # Validate file size
-            if uploaded_file.size > settings.CAD_UPLOAD_MAX_SIZE:
+            if uploaded_original_file.size > settings.CAD_UPLOAD_MAX_SIZE:
                 return Response(
                     {'error': f'File too large. Maximum size: {settings.CAD_UPLOAD_MAX_SIZE / (1024*1024)} MB'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Process the file update synchronously
-            post_save.disconnect(handle_component_post_save, sender=Component)
+            # The new file is tessellated with the triangle budget given here, if any
+            if 'triangle_budget' in request.data:
+                budget_serializer = ComponentUploadSerializer(
+                    instance, data={'triangle_budget': request.data['triangle_budget']}, partial=True
+                )
+                if not budget_serializer.is_valid():
+                    return Response(budget_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                instance.triangle_budget = budget_serializer.validated_data['triangle_budget']
+            
+            with transaction.atomic():
+                # Update name and category_label if provided
+                if 'name' in request.data:
+                    instance.name = request.data['name']
+                if 'category_label' in request.data:
+                    instance.category_label = request.data['category_label']
+                
+                # Save the original_file; GLB and geometry are regenerated by the conversion job
+                instance.original_file = uploaded_original_file
+                instance.original_sha256 = ''  # Recomputed for the new file before processing
+                instance.file_version = F('file_version') + 1  # Jobs queued for the old file are skipped
+                instance.processing_status = 'pending'
+                instance.processing_error = None
+                instance.save(update_fields=[
+                    'name', 'category_label', 'original_file', 'original_sha256', 'file_version',
+                    'triangle_budget', 'processing_status', 'processing_error', 'updated_at',
+                ])
+                instance.refresh_from_db(fields=['file_version'])
+            
             try:
-                with transaction.atomic():
-                    # Update name and category_label if provided
-                    if 'name' in request.data:
-                        instance.name = request.data['name']
-                    if 'category_label' in request.data:
-                        instance.category_label = request.data['category_label']
-                    
-                    # Save the original_file and other fields
-                    instance.original_file = uploaded_original_file
-                    instance.processing_status = 'processing'
-                    instance.processing_error = None
-                    instance.save(update_fields=['name', 'category_label', 'original_file', 'processing_status', 'processing_error'])
-                    
-                    # Process the new file
-                    temp_file_path = Path(settings.MEDIA_ROOT) / 'temp' / f'{instance.id}_{uploaded_original_file.name}'
-                    temp_file_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    with open(temp_file_path, 'wb+') as temp_file:
-                        for chunk in uploaded_original_file.chunks():
-                            temp_file.write(chunk)
-                    
-                    try:
-                        # Process CAD file and regenerate GLB
-                        glb_output_path = Path(settings.MEDIA_ROOT) / 'components' / 'glb' / f'{instance.id}.glb'
-                        glb_output_path.parent.mkdir(parents=True, exist_ok=True)
-                        
-                        process_result = process_cad_file(
-                            temp_file_path,
-                            extract_geometry=True,
-                            copy_glb_to=str(glb_output_path)
-                        )
-                        
-                        geometry_data = process_result.get('geometry_data', {})
-                        bbox = geometry_data.get('bounding_box', {})
-                        center = geometry_data.get('center', {})
-                        instance.bounding_box = bbox
-                        instance.center = {'x': center[0], 'y': center[1], 'z': center[2]} if isinstance(center, list) else center
-                        instance.volume = geometry_data.get('volume', 0.0)
-                        
-                        # Update GLB file
-                        glb_file_path = None
-                        if process_result.get('glb_path') and Path(process_result['glb_path']).exists():
-                            glb_file_path = Path(process_result['glb_path'])
-                        elif temp_file_path.exists() and temp_file_path.suffix.lower() in ['.glb', '.gltf']:
-                            # Fallback: Original file is already GLB/GLTF, use it
-                            glb_file_path = temp_file_path
-                        
-                        if glb_file_path and glb_file_path.exists():
-                            with open(glb_file_path, 'rb') as glb_file:
-                                instance.glb_file.save(
-                                    f'{instance.id}.glb',
-                                    glb_file,
-                                    save=False
-                                )
-                            logger.info(f"GLB file updated for component {instance.id}: {instance.glb_file.name}")
-                        else:
-                            logger.warning(f"GLB file not found for component {instance.id}. Conversion may have failed.")
-                        
-                        instance.processing_status = 'completed'
-                        instance.save()
-                        
-                    except Exception as e:
-                        error_message = str(e)
-                        instance.processing_status = 'failed'
-                        instance.processing_error = error_message
-                        instance.save()
-                        logger.error(f"Component update processing failed: {error_message}", exc_info=True)
-                        return Response(
-                            {'error': f'Error processing file: {error_message}'},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                        )
-                    finally:
-                        # Clean up temp file
-                        if temp_file_path.exists():
-                            os.remove(temp_file_path)
-            finally:
-                # Re-enable signal
-                post_save.connect(handle_component_post_save, sender=Component)
+                job = self._queue_processing(instance, apply_placement_rules=False)
+            except ExecutorBusy as e:
+                Component.objects.filter(id=instance.id).update(
+                    processing_status='failed',
+                    processing_error=f"{e}. Please re-upload the file later.",
+                )
+                return self._busy_response(e)
             
-            # Return updated component
-            response_serializer = ComponentSerializer(instance, context={'request': request})
-            return Response(response_serializer.data, status=status.HTTP_200_OK)
+            return self._job_response(instance, job, status.HTTP_200_OK)
         else:
             # Standard update without file change
             return super().update(request, *args, **kwargs)
     
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self._list, request, *args, **kwargs)
+    
+    def _list(self, request, *args, **kwargs):
+        """ListModelMixin.list with ComponentRowSerializer instead of ComponentSerializer"""
+        serializer = ComponentRowSerializer(request, fields=self._requested_fields())
+        # created_at and id are the pagination key
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()), 'created_at', 'id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+    
     def get_queryset(self):
         queryset = super().get_queryset()
         
@@ -198,7 +214,8 @@ class ComponentViewSet(viewsets.ModelViewSet):
         category = self.request.query_params.get('category', None)
         if category:
             # Accept both friendly UI labels and our internal choices; ignore unknowns
-            if queryset.filter(category_label=category).exists():
+            category = CATEGORY_LABELS.get(category.lower())
+            if category:
                 queryset = queryset.filter(category_label=category)
         
         # Filter by processing status
@@ -206,10 +223,15 @@ class ComponentViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(processing_status=status_filter)
         
-        # Search by name
+        # Search by name, category and status (indexed on PostgreSQL, see components/search.py)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = filter_components(queryset, search)
+        
+        # Sparse fieldsets: load only the requested columns (created_at is the pagination key)
+        fields = self._requested_fields()
+        if fields is not None:
+            queryset = queryset.only(*ComponentSerializer.model_columns(fields), 'created_at')
         
         return queryset
     
@@ -218,11 +240,27 @@ class ComponentViewSet(viewsets.ModelViewSet):
             return ComponentUploadSerializer
         return ComponentSerializer
     
+    def get_serializer(self, *args, **kwargs):
+        fields = self._requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+    
+    def _requested_fields(self):
+        """Field names of the ?fields= parameter on list, retrieve and search, None when absent"""
+        if self.action not in ('list', 'retrieve', 'search'):
+            return None
+        value = self.request.query_params.get('fields')
+        if not value:
+            return self.palette_fields if self.action == 'search' else None
+        return [name.strip() for name in value.split(',') if name.strip()]
+    
     @action(detail=False, methods=['post'], url_path='upload_component', parser_classes=[MultiPartParser, FormParser])
     def upload(self, request):
         """
         Upload a new component with CAD file (GLB/GLTF, STEP, STL, OBJ).
-        Extracts geometry data and converts to GLB for web visualization.
+        Geometry extraction and GLB conversion run in the conversion executor;
+        the response is 202 with a job handle to poll.
         
         STEP files are converted using FreeCAD Docker (deployment-friendly).
         """
@@ -247,62 +285,9 @@ class ComponentViewSet(viewsets.ModelViewSet):
             )
         
         # Check STEP file conversion availability
-        if file_ext in ['.step', '.stp']:
-            # Check if STEP conversion is available
-            step_conversion_available = False
-            
-            # Check for pythonocc-core
-            try:
-                from OCC.Core.STEPControl_Reader import STEPControl_Reader
-                step_conversion_available = True
-            except ImportError:
-                pass
-            
-            # Check for FreeCAD Docker
-            if not step_conversion_available:
-                freecad_docker_url = getattr(settings, 'FREECAD_DOCKER_URL', None)
-                if freecad_docker_url:
-                    try:
-                        import requests
-                        response = requests.get(f"{freecad_docker_url}/health", timeout=2)
-                        if response.status_code == 200:
-                            step_conversion_available = True
-                    except:
-                        pass
-            
-            # Check for Docker command (for FreeCAD Docker subprocess)
-            if not step_conversion_available:
-                try:
-                    import subprocess
-                    subprocess.run(['docker', '--version'], capture_output=True, check=True, timeout=2)
-                    # Docker is available, but we still need the FreeCAD image
-                    # This is not a guarantee, but we'll let it try
-                    step_conversion_available = True
-                except:
-                    pass
-            
-            if not step_conversion_available:
-                return Response(
-                    {
-                        'error': 'STEP file conversion is not available',
-                        'message': (
-                            'STEP file conversion requires pythonocc-core or FreeCAD Docker, which are not currently available.\n\n'
-                            'SOLUTIONS:\n'
-                            '1. Use Docker (Recommended):\n'
-                            '   docker build -f Dockerfile.converter -t step-converter:latest .\n'
-                            '   docker run -d -p 8001:8001 --name freecad-service step-converter:latest\n'
-                            '   Then set FREECAD_DOCKER_URL=http://localhost:8001 in your environment\n\n'
-                            '2. Use Python 3.10-3.12:\n'
-                            '   Install Python 3.12, create a new virtual environment, and install pythonocc-core\n\n'
-                            '3. Pre-convert STEP files:\n'
-                            '   Convert your STEP file to STL or OBJ using FreeCAD (free): https://www.freecad.org/\n'
-                            '   Then upload the STL or OBJ file instead.\n\n'
-                            'For detailed instructions, see: backend/INSTALL_PYTHONOCC.md'
-                        ),
-                        'allowed_formats': settings.CAD_ALLOWED_EXTENSIONS
-                    },
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        unavailable = self._step_conversion_unavailable_response(file_ext)
+        if unavailable is not None:
+            return unavailable
         
         # Validate file size
         if uploaded_file.size > settings.CAD_UPLOAD_MAX_SIZE:
@@ -311,121 +296,262 @@ class ComponentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if async processing is requested and available
-        use_async = request.data.get('async', 'false').lower() == 'true' and CELERY_AVAILABLE
+        # Celery can be requested explicitly; otherwise the conversion executor is used
+        use_celery = request.data.get('async', 'false').lower() == 'true' and CELERY_AVAILABLE
+        
+        # The conversion job is queued below, not by the post_save signal
+        with processing_suppressed(), transaction.atomic():
+            component = serializer.save(processing_status='pending')
         
         try:
-            with transaction.atomic():
-                component = serializer.save(processing_status='pending' if use_async else 'processing')
-            
-            if use_async:
-                # Process asynchronously with Celery
-                process_component_async.delay(component.id)
-                component.processing_status = 'processing'
-                component.save()
-            else:
-                # Process synchronously - disable signal to avoid double processing
-                post_save.disconnect(handle_component_post_save, sender=Component)
-                try:
-                    # Process synchronously
-                    with transaction.atomic():
-                        # Save uploaded file temporarily for processing
-                        temp_file_path = Path(settings.MEDIA_ROOT) / 'temp' / f'{component.id}_{uploaded_file.name}'
-                        temp_file_path.parent.mkdir(parents=True, exist_ok=True)
-                        
-                        with open(temp_file_path, 'wb+') as temp_file:
-                            for chunk in uploaded_file.chunks():
-                                temp_file.write(chunk)
-                        
-                        try:
-                            # Process CAD file (GLB/GLTF, STL, OBJ)
-                            # Extract geometry and convert to GLB for web visualization
-                            glb_output_path = Path(settings.MEDIA_ROOT) / 'components' / 'glb' / f'{component.id}.glb'
-                            glb_output_path.parent.mkdir(parents=True, exist_ok=True)
-                            
-                            process_result = process_cad_file(
-                                temp_file_path,
-                                extract_geometry=True,
-                                copy_glb_to=str(glb_output_path)
-                            )
-                            
-                            geometry_data = process_result.get('geometry_data', {})
-                            bbox = geometry_data.get('bounding_box', {})
-                            center = geometry_data.get('center', {})
-                            component.bounding_box = bbox
-                            component.center = {'x': center[0], 'y': center[1], 'z': center[2]} if isinstance(center, list) else center
-                            component.volume = geometry_data.get('volume', 0.0)
-                            
-                            # Save GLB file properly using Django FileField
-                            # The process_result should contain the converted/copied GLB file
-                            glb_file_path = None
-                            if process_result.get('glb_path') and Path(process_result['glb_path']).exists():
-                                glb_file_path = Path(process_result['glb_path'])
-                            elif temp_file_path.exists() and temp_file_path.suffix.lower() in ['.glb', '.gltf']:
-                                # Fallback: Original file is already GLB/GLTF, use it
-                                glb_file_path = temp_file_path
-                            
-                            if glb_file_path and glb_file_path.exists():
-                                with open(glb_file_path, 'rb') as glb_file:
-                                    component.glb_file.save(
-                                        f'{component.id}.glb',
-                                        glb_file,
-                                        save=False  # Don't save yet, we'll save after setting other fields
-                                    )
-                                logger.info(f"GLB file saved for component {component.id}: {component.glb_file.name}")
-                            else:
-                                logger.warning(f"GLB file not found for component {component.id}. Conversion may have failed.")
-                            
-                            # Auto-fill mountable_sides and compatibility via rules
-                            from .utils import COMPONENT_PLACEMENT_RULES
-                            rules = COMPONENT_PLACEMENT_RULES.get(component.category_label, {})
-                            component.mountable_sides = rules.get('mountable_sides', [])
-                            component.supported_orientations = rules.get('supported_orientations', ['fixed'])
-                            component.compatible_types = rules.get('compatible', [])
-                            
-                            component.processing_status = 'completed'
-                            component.save()
-                            
-                        except Exception as e:
-                            error_message = str(e)
-                            # Provide more helpful error messages for STEP conversion failures
-                            if 'STEP' in error_message or 'step' in error_message.lower() or 'conversion' in error_message.lower():
-                                error_message = (
-                                    f"STEP file conversion failed: {error_message}\n\n"
-                                    "SOLUTIONS:\n"
-                                    "1. Pre-convert STEP to STL/OBJ:\n"
-                                    "   - Use FreeCAD (free): https://www.freecad.org/\n"
-                                    "   - Or use online converters\n"
-                                    "   - Then upload the STL or OBJ file instead\n\n"
-                                    "2. Set up FreeCAD Docker service:\n"
-                                    "   - Build the FreeCAD Docker container\n"
-                                    "   - Set FREECAD_DOCKER_URL environment variable\n"
-                                    "   - See backend/README.md for details\n\n"
-                                    "3. For development, use Python 3.10-3.12:\n"
-                                    "   - Install pythonocc-core: pip install pythonocc-core"
-                                )
-                            component.processing_status = 'failed'
-                            component.processing_error = error_message
-                            component.save()
-                            logger.error(f"Component processing failed: {error_message}", exc_info=True)
-                            raise
-                        
-                        finally:
-                            # Clean up temp file
-                            if temp_file_path.exists():
-                                os.remove(temp_file_path)
-                finally:
-                    # Re-enable signal
-                    post_save.connect(handle_component_post_save, sender=Component)
-            
-            # Return created component
-            response_serializer = ComponentSerializer(component, context={'request': request})
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        except Exception as e:
+            job = self._queue_processing(component, use_celery=use_celery)
+        except ExecutorBusy as e:
+            # Nothing was converted; drop the component so the client can simply retry
+            component.original_file.delete(save=False)
+            component.delete()
+            return self._busy_response(e)
+        
+        return self._job_response(component, job, status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], url_path='uploads', parser_classes=[JSONParser, FormParser])
+    def create_upload(self, request):
+        """
+        Start a resumable upload (see components/uploads.py for the protocol).
+        
+        The response is 201 with the session and its upload_url; send the file
+        to it in chunks with PATCH and the Upload-Offset header.
+        """
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        unavailable = self._step_conversion_unavailable_response(
+            Path(serializer.validated_data['filename']).suffix.lower()
+        )
+        if unavailable is not None:
+            return unavailable
+        
+        session = serializer.save()
+        return self._upload_session_response(session, status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get', 'patch', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-fA-F-]{32,36})',
+            url_name='upload-session', parser_classes=[])
+    def upload_session(self, request, upload_id=None):
+        """
+        GET/HEAD: state and offset of an upload.
+        PATCH: append the request body at Upload-Offset; the final chunk
+        completes the upload and queues processing of the new component.
+        DELETE: abort the upload.
+        """
+        try:
+            session = UploadSession.objects.get(id=upload_id)
+        except (UploadSession.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if request.method == 'DELETE':
+            if session.status == 'assembling':
+                return Response({'error': 'Upload is being assembled'}, status=status.HTTP_409_CONFLICT)
+            abort_upload(session)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        if request.method == 'PATCH':
+            try:
+                offset = int(request.headers['Upload-Offset'])
+                length = int(request.headers.get('Content-Length') or 0)
+            except (KeyError, ValueError):
+                return Response(
+                    {'error': 'Upload-Offset and Content-Length headers are required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if length > max_chunk_size():
+                return Response(
+                    {'error': f'Chunk too large. Maximum chunk size: {max_chunk_size()} bytes'},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+            try:
+                checksum = parse_checksum_header(request.headers.get('Upload-Checksum'))
+                # Read the raw body; request.data is never touched, so nothing is buffered by a parser
+                session = append_chunk(session, request.stream, offset, length, checksum)
+            except UploadConflict as e:
+                return self._upload_session_response(session, status.HTTP_409_CONFLICT, error=str(e))
+            except UploadError as e:
+                return self._upload_session_response(session, status.HTTP_400_BAD_REQUEST, error=str(e))
+            if session.offset == session.size:
+                return self._finish_upload(session)
+        
+        return self._upload_session_response(session, status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-fA-F-]{32,36})/finalize',
+            url_name='upload-session-finalize')
+    def finalize_upload(self, request, upload_id=None):
+        """Complete an upload whose bytes have all been received (retry after a failed final PATCH)"""
+        try:
+            session = UploadSession.objects.get(id=upload_id)
+        except (UploadSession.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return self._finish_upload(session)
+    
+    def _finish_upload(self, session):
+        """Assemble the component of a fully received upload and queue its processing"""
+        already_completed = session.status == 'completed' and session.component_id
+        # The conversion job is queued below, not by the post_save signal
+        try:
+            with processing_suppressed():
+                component = complete_upload(session)
+        except UploadConflict as e:
+            return self._upload_session_response(session, status.HTTP_409_CONFLICT, error=str(e))
+        except UploadError as e:
+            return self._upload_session_response(session, status.HTTP_400_BAD_REQUEST, error=str(e))
+        
+        if already_completed:
+            data = ComponentSerializer(component, context={'request': self.request}).data
+            return Response(data, status=status.HTTP_200_OK)
+        
+        try:
+            job = self._queue_processing(component)
+        except ExecutorBusy as e:
+            # The file is kept; processing can be retried by re-uploading the original_file
+            Component.objects.filter(id=component.id).update(
+                processing_status='failed',
+                processing_error=f"{e}. Please re-upload the file later.",
+            )
+            return self._busy_response(e)
+        response = self._job_response(component, job, status.HTTP_201_CREATED)
+        response['Upload-Offset'] = str(session.offset)
+        return response
+    
+    def _upload_session_response(self, session, response_status, error=None):
+        data = UploadSessionSerializer(session, context={'request': self.request}).data
+        if error:
+            data['error'] = error
+        return Response(data, status=response_status, headers={
+            'Upload-Offset': str(session.offset),
+            'Upload-Length': str(session.size),
+            'Cache-Control': 'no-store',
+        })
+    
+    def _step_conversion_unavailable_response(self, file_ext):
+        """400 response when a STEP file cannot be converted by any backend, else None"""
+        if file_ext not in ['.step', '.stp']:
+            return None
+        # Probes run in the background, so this never waits on health checks or
+        # subprocesses; backends still being probed count as available
+        step_conversion_available = PYTHONOCC_AVAILABLE or get_converter_registry().is_available('stl')
+        
+        if not step_conversion_available:
             return Response(
-                {'error': f'Error processing file: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {
+                    'error': 'STEP file conversion is not available',
+                    'message': (
+                        'STEP file conversion requires pythonocc-core or FreeCAD Docker, which are not currently available.\n\n'
+                        'SOLUTIONS:\n'
+                        '1. Use Docker (Recommended):\n'
+                        '   docker build -f Dockerfile.converter -t step-converter:latest .\n'
+                        '   docker run -d -p 8001:8001 --name freecad-service step-converter:latest\n'
+                        '   Then set FREECAD_DOCKER_URL=http://localhost:8001 in your environment\n\n'
+                        '2. Use Python 3.10-3.12:\n'
+                        '   Install Python 3.12, create a new virtual environment, and install pythonocc-core\n\n'
+                        '3. Pre-convert STEP files:\n'
+                        '   Convert your STEP file to STL or OBJ using FreeCAD (free): https://www.freecad.org/\n'
+                        '   Then upload the STL or OBJ file instead.\n\n'
+                        'For detailed instructions, see: backend/INSTALL_PYTHONOCC.md'
+                    ),
+                    'allowed_formats': settings.CAD_ALLOWED_EXTENSIONS
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
+        return None
+    
+    def _queue_processing(self, component, apply_placement_rules=True, use_celery=False):
+        """
+        Queue conversion of a component's original_file.
+        
+        Returns the job dict; with CAD_CONVERSION_EXECUTOR_WORKERS=0 the job has
+        already run inline and its status is final. A file that was processed
+        before reuses the stored asset right away, and no job is queued
+        (the job id is None).
+        """
+        if complete_from_processed_asset(component, apply_placement_rules):
+            return {'id': None, 'status': 'completed'}
+        return dispatch_processing(component, apply_placement_rules, use_celery=use_celery)
+    
+    def _job_response(self, component, job, finished_status):
+        """Component data plus a job handle; 202 while the job is still queued or running"""
+        finished = job['status'] in ('completed', 'failed')
+        if finished:
+            component.refresh_from_db()
+        data = ComponentSerializer(component, context={'request': self.request}).data
+        if job['id'] is None:
+            return Response(data, status=finished_status)
+        status_url = reverse('component-processing', args=[component.id])
+        data['job'] = {
+            'id': job['id'],
+            'status': job['status'],
+            'status_url': self.request.build_absolute_uri(f"{status_url}?job={job['id']}"),
+        }
+        return Response(data, status=finished_status if finished else status.HTTP_202_ACCEPTED)
+    
+    def _busy_response(self, error):
+        return Response(
+            {'error': f'{error}. Please retry shortly.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '30'}
+        )
+    
+    @action(detail=True, methods=['get'])
+    def processing(self, request, pk=None):
+        """
+        Processing status of a component. Pass ?job=<id> (from the upload response)
+        to include the job state, when this server process or the job queue knows it.
+        """
+        component = self.get_object()
+        data = {
+            'component_id': component.id,
+            'processing_status': component.processing_status,
+            'processing_error': component.processing_error,
+        }
+        job_id = request.query_params.get('job')
+        if job_id:
+            job = processing_job_status(job_id)
+            if job:
+                data['job'] = {
+                    'id': job['id'],
+                    'status': job['status'],
+                    'submitted_at': job['submitted_at'],
+                    'finished_at': job['finished_at'],
+                    'error': job['error'],
+                }
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked search for the builder's component palette, as the user types.
+        ?q= is matched as word prefixes ("rol mot" finds "Roller motor"); ?limit=
+        defaults to 10, at most CAD_SEARCH_MAX_RESULTS. On PostgreSQL results
+        come back unranked ("ranked": false) when ranking would exceed
+        CAD_SEARCH_TIME_BUDGET.
+        """
+        return self.conditional_response(self._search, request)
+    
+    def _search(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), getattr(settings, 'CAD_SEARCH_MAX_RESULTS', 50))
+        
+        if not query:
+            return Response({'query': query, 'ranked': True, 'results': []})
+        components, ranked = typeahead(self.get_queryset(), query, limit)
+        serializer = self.get_serializer(components, many=True)
+        response = Response({'query': query, 'ranked': ranked, 'results': serializer.data})
+        if not ranked:
+            # A fallback for a slow query, not what the ETag of this catalog version stands for
+            response['Cache-Control'] = 'no-store'
+        return response
+    
     @action(detail=False, methods=['get'])
     def placement_suggestions(self, request):
         comp_type = request.query_params.get('component')
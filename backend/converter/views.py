@@ -1,10 +1,11 @@
 """
 STEP to GLB Converter API
 Converts STEP files to GLB format using pythonocc-core, trimesh, and pygltflib
+(the tessellation is turned into a GLB in memory, with no intermediate STL;
+assemblies keep their part hierarchy and repeated parts are instanced)
 """
 import logging
 import os
-import tempfile
 from pathlib import Path
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -15,15 +16,11 @@ from django.core.files.base import ContentFile
 
 logger = logging.getLogger(__name__)
 
-# Try to import required libraries
-try:
-    from OCC.Core.IFSelect import IFSelect_RetDone
-    from OCC.Core.STEPControl_Reader import STEPControl_Reader
-    from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
-    from OCC.Core.StlAPI import StlAPI_Writer
-    PYTHONOCC_AVAILABLE = True
-except ImportError:
-    PYTHONOCC_AVAILABLE = False
+from cad_processing.occ_tessellation import PYTHONOCC_AVAILABLE, step_to_scene
+from cad_processing.utils import SCRATCH_SIZE_FACTOR
+from cad_processing.workspace import Workspace
+
+if not PYTHONOCC_AVAILABLE:
     logger.warning("pythonocc-core not available. STEP conversion will not work.")
 
 try:
@@ -82,107 +79,45 @@ def convert_step_to_glb(request):
             "error": f"Invalid file type. Expected .step or .stp, got {file_ext}"
         }, status=400)
     
-    # Create temporary directory for processing
-    temp_dir = None
-    step_file_path = None
-    stl_file_path = None
-    glb_file_path = None
+    # Scratch workspace for the uploaded file, removed when the request ends
+    workspace = None
     
     try:
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix='step_converter_')
-        logger.info(f"Created temp directory: {temp_dir}")
+        workspace = Workspace(expected_size=uploaded_file.size * SCRATCH_SIZE_FACTOR)
+        logger.info(f"Created scratch workspace: {workspace.path}")
         
-        # Save uploaded STEP file to temp directory
-        step_file_path = os.path.join(temp_dir, f"input{file_ext}")
+        # Save uploaded STEP file to the workspace
+        step_file_path = workspace.file(f"input{file_ext}")
         with open(step_file_path, 'wb') as f:
             for chunk in uploaded_file.chunks():
                 f.write(chunk)
         
         logger.info(f"Saved STEP file: {step_file_path}")
         
-        # Step 1: Convert STEP → STL using pythonocc-core
-        stl_file_path = os.path.join(temp_dir, "output.stl")
-        logger.info("Starting STEP → STL conversion...")
-        
-        # Read STEP file
-        step_reader = STEPControl_Reader()
-        status = step_reader.ReadFile(step_file_path)
-        
-        if status != IFSelect_RetDone:
-            return JsonResponse({
-                "ok": False,
-                "error": f"Failed to read STEP file. Status: {status}"
-            }, status=400)
-        
-        # Transfer all roots
-        step_reader.TransferRoots()
-        shape = step_reader.OneShape()
-        
-        if shape.IsNull():
+        # Step 1: Read the assembly structure and tessellate each distinct part once
+        logger.info("Starting STEP tessellation...")
+        # Deflection follows the size of each part, within the triangle budget
+        try:
+            scene = step_to_scene(
+                step_file_path,
+                workers=getattr(settings, 'CAD_STEP_TESSELLATION_WORKERS', None),
+                triangle_budget=getattr(settings, 'CAD_STEP_TRIANGLE_BUDGET', None),
+            )
+        except ValueError as e:
             return JsonResponse({
                 "ok": False,
-                "error": "STEP file contains no valid geometry"
+                "error": str(e)
             }, status=400)
         
-        # Mesh the shape (tessellate to triangles)
-        # Lower deviation = higher quality (0.1 is a good default)
-        mesh_deviation = 0.1
-        mesh = BRepMesh_IncrementalMesh(shape, mesh_deviation, False, mesh_deviation, True)
-        mesh.Perform()
-        
-        # Write STL file
-        stl_writer = StlAPI_Writer()
-        stl_writer.SetASCIIMode(False)  # Use binary STL
-        success = stl_writer.Write(shape, stl_file_path)
-        
-        if not success:
-            return JsonResponse({
-                "ok": False,
-                "error": "Failed to write STL file"
-            }, status=500)
-        
-        logger.info(f"STEP → STL conversion complete: {stl_file_path}")
-        
-        # Step 2: Convert STL → GLB using trimesh
-        logger.info("Starting STL → GLB conversion...")
-        
-        # Load STL with trimesh
-        mesh_obj = trimesh.load(stl_file_path)
-        
-        # Handle scene (multiple meshes)
-        if isinstance(mesh_obj, trimesh.Scene):
-            # Combine all meshes into one
-            mesh_list = []
-            for node_name in mesh_obj.graph.nodes_geometry:
-                transform, geometry_name = mesh_obj.graph[node_name]
-                geometry = mesh_obj.geometry[geometry_name]
-                if isinstance(geometry, trimesh.Trimesh):
-                    mesh_list.append(geometry.copy())
-            if mesh_list:
-                mesh_obj = trimesh.util.concatenate(mesh_list)
-        
-        # Ensure we have a Trimesh object
-        if not isinstance(mesh_obj, trimesh.Trimesh):
-            return JsonResponse({
-                "ok": False,
-                "error": f"Failed to extract mesh from STL. Got type: {type(mesh_obj)}"
-            }, status=500)
-        
-        # Export to GLB
-        glb_file_path = os.path.join(temp_dir, "output.glb")
-        mesh_obj.export(glb_file_path, file_type='glb')
-        
-        logger.info(f"STL → GLB conversion complete: {glb_file_path}")
+        # Step 2: Build the GLB in memory; repeated parts are written once and
+        # referenced by one node per instance
+        glb_content = scene.export(file_type='glb')
+        logger.info(f"STEP → GLB conversion complete: {len(scene.geometry)} distinct geometries")
         
         # Step 3: Save GLB file to media storage
         output_filename = f"{Path(file_name).stem}_{os.urandom(4).hex()}.glb"
         media_path = os.path.join("converted", output_filename)
         
-        # Read the GLB file
-        with open(glb_file_path, 'rb') as f:
-            glb_content = f.read()
-        
         # Save to media storage
         saved_path = default_storage.save(media_path, ContentFile(glb_content))
         
@@ -218,11 +153,5 @@ def convert_step_to_glb(request):
         }, status=500)
     
     finally:
-        # Cleanup temporary files
-        try:
-            if temp_dir and os.path.exists(temp_dir):
-                import shutil
-                shutil.rmtree(temp_dir)
-                logger.info(f"Cleaned up temp directory: {temp_dir}")
-        except Exception as e:
-            logger.warning(f"Failed to cleanup temp directory: {e}")
+        if workspace is not None:
+            workspace.cleanup()
@@ -2,12 +2,24 @@
 """
 FreeCAD headless STEP to STL/OBJ converter
 Can be run as a standalone service or called via subprocess
+
+    python3 freecad_converter.py model.step model.stl --format stl --jobs 8
+    python3 freecad_converter.py --serve --port 8001 --workers 4
+
+Service API:
+    GET  /health   JSON status of the conversion slots
+    POST /convert  STEP bytes as the body (?format=stl|obj&budget=250000), or a
+                   multipart form with a 'file' part and an 'output_format'
+                   field; responds with the converted file. 'quality' sets a
+                   fixed deviation instead of one derived from each solid's size
 """
 import sys
 import os
 import argparse
 from pathlib import Path
 
+import numpy as np
+
 # Add FreeCAD Python modules to path
 # FreeCAD installs its Python modules in different locations depending on installation
 freecad_paths = [
@@ -25,7 +37,6 @@ for path in freecad_paths:
 try:
     import FreeCAD
     import Part
-    import Mesh
     FREECAD_AVAILABLE = True
 except ImportError:
     # Try alternative import method
@@ -33,7 +44,6 @@ except ImportError:
         # FreeCAD might be installed as a system package
         import freecad
         import freecad.Part
-        import freecad.Mesh
         FREECAD_AVAILABLE = True
     except ImportError:
         FREECAD_AVAILABLE = False
@@ -43,141 +53,503 @@ except ImportError:
         sys.exit(1)
 
 
-def convert_step_to_stl(step_file, output_file, mesh_deviation=0.1):
+def read_step_shapes(step_file):
+    """Read a STEP file into a list of non-null Part shapes"""
+    # Part.read() returns a shape or list of shapes
+    import_result = Part.read(str(step_file))
+    shapes = import_result if isinstance(import_result, list) else [import_result]
+    shapes = [shape for shape in shapes if not shape.isNull()]
+    if not shapes:
+        raise ValueError("No valid shapes found in STEP file")
+    return shapes
+
+
+def fan_triangulate(faces):
+    """
+    Fan-triangulate a list of polygon index tuples in bulk.
+
+    tessellate() normally returns triangles already, in which case the list is
+    converted to an array directly.
+
+    Returns:
+        int64 array of shape (n, 3)
+    """
+    counts = np.fromiter((len(face) for face in faces), dtype=np.int64, count=len(faces))
+    if len(counts) and (counts == 3).all():
+        return np.array(faces, dtype=np.int64).reshape(-1, 3)
+    keep = counts >= 3
+    corners = np.fromiter(
+        (index for face, polygon in zip(faces, keep) if polygon for index in face),
+        dtype=np.int64,
+    )
+    counts = counts[keep]
+    starts = np.cumsum(counts) - counts
+    triangles_per_polygon = counts - 2
+    base = np.repeat(starts, triangles_per_polygon)
+    first_triangle = np.cumsum(triangles_per_polygon) - triangles_per_polygon
+    step = np.arange(len(base)) - np.repeat(first_triangle, triangles_per_polygon) + 1
+    return np.column_stack((corners[base], corners[base + step], corners[base + step + 1]))
+
+
+# Below this many solids, forking tessellation workers costs more than it saves
+PARALLEL_MIN_SOLIDS = 16
+
+# Solids handed to a tessellation worker at a time
+SOLIDS_PER_TASK = 4
+
+# Deviation as a fraction of each solid's bounding-box diagonal, unless --quality is given
+RELATIVE_DEFLECTION = 0.002
+
+# Lower bound for derived deviations (degenerate or tiny solids)
+MIN_DEFLECTION = 1e-4
+
+# A tessellation may overshoot its --budget by this factor before it is redone coarser
+BUDGET_SLACK = 1.25
+
+# Solids being tessellated in parallel; forked workers inherit the list, so
+# the shapes never have to be serialized
+_PARALLEL_SOLIDS = []
+
+
+def solid_deviations(solids, mesh_deviation=None):
+    """Mesh deviation for each solid: the fixed one if given, else scaled to its size"""
+    if mesh_deviation:
+        return [mesh_deviation] * len(solids)
+    return [max(solid.BoundBox.DiagonalLength * RELATIVE_DEFLECTION, MIN_DEFLECTION) for solid in solids]
+
+
+def _tessellate_one(shape, mesh_deviation):
+    """(vertices, faces) arrays of one shape, or None when it tessellates to nothing"""
+    # tessellate returns (vertices, faces) where faces are index tuples
+    vertices, face_indices = shape.tessellate(mesh_deviation)
+    if not vertices or not face_indices:
+        return None
+    # FreeCAD.Vector supports the sequence protocol, so this is one bulk conversion
+    return np.array(vertices, dtype=np.float64).reshape(-1, 3), fan_triangulate(face_indices)
+
+
+def _tessellate_parallel_solid(index, mesh_deviation):
+    return _tessellate_one(_PARALLEL_SOLIDS[index], mesh_deviation)
+
+
+def split_solids(shapes):
+    """The solids of the shapes (shapes without solids are kept whole)"""
+    solids = []
+    for shape in shapes:
+        solids.extend(shape.Solids or [shape])
+    return solids
+
+
+def _tessellate_solids(solids, deviations, jobs):
+    """(vertices, faces) or None for each solid, in forked workers when worthwhile"""
+    import multiprocessing
+
+    if jobs > 1 and len(solids) >= PARALLEL_MIN_SOLIDS and not multiprocessing.current_process().daemon:
+        _PARALLEL_SOLIDS[:] = solids
+        try:
+            with multiprocessing.get_context('fork').Pool(min(jobs, len(solids))) as pool:
+                return pool.starmap(
+                    _tessellate_parallel_solid,
+                    list(enumerate(deviations)),
+                    chunksize=SOLIDS_PER_TASK,
+                )
+        finally:
+            _PARALLEL_SOLIDS.clear()
+    return [_tessellate_one(solid, deviation) for solid, deviation in zip(solids, deviations)]
+
+
+def tessellate_shapes(shapes, mesh_deviation=None, jobs=1, triangle_budget=None):
+    """
+    Tessellate shapes into a single vertex/face array pair.
+
+    Each solid is meshed with a deviation derived from its own size unless
+    mesh_deviation is given. When the result exceeds triangle_budget by more
+    than BUDGET_SLACK, it is redone once with all deviations scaled by the
+    overshoot (triangle counts grow roughly inversely with the deviation).
+
+    With jobs > 1, assemblies of at least PARALLEL_MIN_SOLIDS solids are
+    tessellated solid by solid in forked worker processes. Service workers are
+    daemonic and cannot fork, so the service tessellates serially and runs
+    requests in parallel instead.
+
+    Returns:
+        (vertices, faces): float64 (n, 3) and int64 (m, 3) arrays
+    """
+    solids = split_solids(shapes)
+    deviations = solid_deviations(solids, mesh_deviation)
+    parts = _tessellate_solids(solids, deviations, jobs)
+
+    if triangle_budget:
+        triangles = sum(len(part[1]) for part in parts if part is not None)
+        if triangles > triangle_budget * BUDGET_SLACK:
+            factor = triangles / triangle_budget
+            print(f"Tessellation has {triangles} triangles for a budget of {triangle_budget}, "
+                  f"coarsening by {factor:.1f}x")
+            parts = _tessellate_solids(solids, [deviation * factor for deviation in deviations], jobs)
+
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        raise ValueError("STEP file produced an empty tessellation")
+    offsets = np.cumsum([0] + [len(vertices) for vertices, _ in parts[:-1]])
+    vertices = np.concatenate([vertices for vertices, _ in parts])
+    faces = np.concatenate([faces + offset for (_, faces), offset in zip(parts, offsets)])
+    return vertices, faces
+
+
+def write_binary_stl(output_file, vertices, faces):
+    """Write triangles to a binary STL file straight from the arrays"""
+    triangles = vertices[faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+    records = np.zeros(len(faces), dtype=np.dtype([
+        ('normal', '<f4', (3,)),
+        ('vertices', '<f4', (3, 3)),
+        ('attributes', '<u2'),
+    ]))
+    records['normal'] = normals
+    records['vertices'] = triangles
+    with open(output_file, 'wb') as f:
+        f.write(b'Converted by freecad_converter.py'.ljust(80, b' '))
+        f.write(np.uint32(len(faces)).tobytes())
+        records.tofile(f)
+
+
+def write_obj(output_file, vertices, faces):
+    """Write a Wavefront OBJ file straight from the arrays"""
+    with open(output_file, 'w') as f:
+        f.write('# Converted by freecad_converter.py\n')
+        np.savetxt(f, vertices, fmt='v %.6g %.6g %.6g')
+        np.savetxt(f, faces + 1, fmt='f %d %d %d')
+
+
+def convert_step_to_stl(step_file, output_file, mesh_deviation=None, jobs=1, triangle_budget=None):
     """
     Convert STEP file to STL using FreeCAD
     
     Args:
         step_file: Path to input STEP file
         output_file: Path to output STL file
-        mesh_deviation: Mesh quality (smaller = higher quality, default 0.1)
+        mesh_deviation: Fixed mesh deviation (default: derived from each solid's size)
+        jobs: Processes for tessellating the solids of an assembly in parallel
+        triangle_budget: Target triangle count (default: no limit)
     """
     try:
-        # Open FreeCAD document
-        doc = FreeCAD.newDocument("Conversion")
-        
-        # Import STEP file - Part.read() returns a shape or list of shapes
-        import_result = Part.read(str(step_file))
-        
-        # Handle single shape or list of shapes
-        if isinstance(import_result, list):
-            shapes = import_result
-        else:
-            shapes = [import_result]
-        
-        # Create mesh from all shapes
-        mesh_objects = []
-        for i, shape in enumerate(shapes):
-            if shape.isNull():
-                continue
-            
-            # Create part object
-            part = doc.addObject("Part::Feature", f"ImportedPart{i}")
-            part.Shape = shape
-            
-            # Create mesh from shape using tessellate
-            # tessellate returns (vertices, faces) where faces are indices
-            vertices, face_indices = part.Shape.tessellate(mesh_deviation)
-            
-            # Convert face indices to triangle list for Mesh.Mesh()
-            # Each face is a list of vertex indices, convert to triangles
-            triangles = []
-            for face in face_indices:
-                # Triangulate polygon face (fan triangulation)
-                if len(face) >= 3:
-                    for j in range(1, len(face) - 1):
-                        triangles.append([face[0], face[j], face[j+1]])
-            
-            # Create mesh object
-            mesh_obj = doc.addObject("Mesh::Feature", f"Mesh{i}")
-            # Mesh.Mesh() takes list of triangles (each triangle is 3 vertex indices)
-            mesh_obj.Mesh = Mesh.Mesh([(vertices[v[0]], vertices[v[1]], vertices[v[2]]) for v in triangles])
-            mesh_objects.append(mesh_obj)
-        
-        if not mesh_objects:
-            raise ValueError("No valid shapes found in STEP file")
-        
-        # Export all meshes to single STL file
-        if len(mesh_objects) == 1:
-            mesh_objects[0].Mesh.write(str(output_file))
-        else:
-            # Combine multiple meshes
-            combined_mesh = mesh_objects[0].Mesh
-            for mesh_obj in mesh_objects[1:]:
-                combined_mesh.addMesh(mesh_obj.Mesh)
-            combined_mesh.write(str(output_file))
-        
-        # Close document
-        FreeCAD.closeDocument(doc.Name)
-        
-        print(f"SUCCESS: Converted {step_file} to {output_file}")
+        vertices, faces = tessellate_shapes(read_step_shapes(step_file), mesh_deviation, jobs, triangle_budget)
+        write_binary_stl(output_file, vertices, faces)
+        print(f"SUCCESS: Converted {step_file} to {output_file} ({len(faces)} triangles)")
         return True
         
     except Exception as e:
         print(f"ERROR: Conversion failed: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc(file=sys.stderr)
-        if 'doc' in locals():
-            try:
-                FreeCAD.closeDocument(doc.Name)
-            except:
-                pass
         return False
 
 
-def convert_step_to_obj(step_file, output_file, mesh_deviation=0.1):
+def convert_step_to_obj(step_file, output_file, mesh_deviation=None, jobs=1, triangle_budget=None):
     """
     Convert STEP file to OBJ using FreeCAD
     
     Args:
         step_file: Path to input STEP file
         output_file: Path to output OBJ file
-        mesh_deviation: Mesh quality (smaller = higher quality, default 0.1)
+        mesh_deviation: Fixed mesh deviation (default: derived from each solid's size)
+        jobs: Processes for tessellating the solids of an assembly in parallel
+        triangle_budget: Target triangle count (default: no limit)
     """
     try:
-        # Open FreeCAD document
-        doc = FreeCAD.newDocument("Conversion")
-        
-        # Import STEP file
-        shape = Part.Shape()
-        shape.read(str(step_file))
-        part = doc.addObject("Part::Feature", "ImportedPart")
-        part.Shape = shape
-        
-        # Create mesh from shape
-        mesh = part.Shape.tessellate(mesh_deviation)
-        mesh_obj = doc.addObject("Mesh::Feature", "Mesh")
-        mesh_obj.Mesh = Mesh.Mesh(mesh)
-        
-        # Export to OBJ (FreeCAD can export mesh to OBJ)
-        import Mesh
-        Mesh.export([mesh_obj], str(output_file))
-        
-        # Close document
-        FreeCAD.closeDocument(doc.Name)
-        
-        print(f"SUCCESS: Converted {step_file} to {output_file}")
+        vertices, faces = tessellate_shapes(read_step_shapes(step_file), mesh_deviation, jobs, triangle_budget)
+        write_obj(output_file, vertices, faces)
+        print(f"SUCCESS: Converted {step_file} to {output_file} ({len(faces)} triangles)")
         return True
         
     except Exception as e:
         print(f"ERROR: Conversion failed: {e}", file=sys.stderr)
-        if 'doc' in locals():
-            try:
-                FreeCAD.closeDocument(doc.Name)
-            except:
-                pass
         return False
 
 
+# ---------------------------------------------------------------------------
+# Conversion service (--serve)
+#
+# The service imports FreeCAD once and forks a process per conversion from
+# it, so a conversion does not pay interpreter start-up and FreeCAD import
+# time, and one that hangs can be killed. Request bodies are spooled to disk in chunks and converted
+# files are streamed back, so memory use does not grow with the model size.
+# ---------------------------------------------------------------------------
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MB
+CONVERTERS = {
+    'stl': convert_step_to_stl,
+    'obj': convert_step_to_obj,
+}
+
+
+def _worker_convert(input_path, output_path, output_format, quality, triangle_budget):
+    """Run one conversion in a forked job process (FreeCAD is already imported); exits 0 on success"""
+    success = CONVERTERS[output_format](input_path, output_path, quality, triangle_budget=triangle_budget)
+    sys.exit(0 if success else 1)
+
+
+def _copy_range(source, start, end, destination):
+    """Copy bytes [start, end) of an mmap to a file in chunks"""
+    with open(destination, 'wb') as out_file:
+        for offset in range(start, end, STREAM_CHUNK_SIZE):
+            out_file.write(source[offset:min(offset + STREAM_CHUNK_SIZE, end)])
+
+
+def _extract_multipart(spool_path, boundary, input_path):
+    """
+    Extract the uploaded file and form fields from a spooled multipart body.
+
+    The body is memory-mapped, so large uploads are never read into memory.
+    Returns a dict of the text form fields; the file part is written to input_path.
+    """
+    import mmap
+    import re
+
+    delimiter = b'--' + boundary
+    fields = {}
+    found_file = False
+    with open(spool_path, 'rb') as spool, mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as body:
+        position = body.find(delimiter)
+        while position != -1:
+            headers_start = position + len(delimiter)
+            if body[headers_start:headers_start + 2] == b'--':
+                break  # Closing delimiter
+            headers_end = body.find(b'\r\n\r\n', headers_start)
+            if headers_end == -1:
+                break
+            next_position = body.find(b'\r\n' + delimiter, headers_end)
+            if next_position == -1:
+                raise ValueError("Malformed multipart body")
+            headers = body[headers_start:headers_end].decode('utf-8', 'replace')
+            name = re.search(r'name="([^"]*)"', headers)
+            content_start = headers_end + 4
+            if 'filename=' in headers:
+                _copy_range(body, content_start, next_position, input_path)
+                found_file = True
+            elif name:
+                fields[name.group(1)] = body[content_start:next_position].decode('utf-8', 'replace')
+            position = next_position + 2
+    if not found_file:
+        raise ValueError("No file part in multipart body")
+    return fields
+
+
+def run_server(host, port, workers, max_concurrent, job_timeout, work_dir):
+    """
+    Serve /health and /convert over HTTP.
+
+    Each conversion runs in a process forked from the server, which has
+    FreeCAD imported already, so it starts warm. At most `workers` of them
+    run at once; one that exceeds job_timeout is killed, not abandoned, so it
+    can neither keep a CPU busy nor write into a removed job directory.
+    """
+    import json
+    import multiprocessing
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    context = multiprocessing.get_context('fork')
+    worker_slots = threading.BoundedSemaphore(workers)
+    slots = threading.BoundedSemaphore(max_concurrent)
+    state = {'active': 0, 'completed': 0, 'failed': 0}
+    state_lock = threading.Lock()
+
+    def run_job(args):
+        """
+        Run _worker_convert(*args) in a job process once a worker slot is free.
+        Returns whether it succeeded, or None when it did not finish within
+        job_timeout (waiting for the slot included); the process is then dead.
+        """
+        deadline = time.monotonic() + job_timeout
+        if not worker_slots.acquire(timeout=job_timeout):
+            return None
+        try:
+            # Daemonic, so the service exiting takes its jobs along
+            process = context.Process(target=_worker_convert, args=args, daemon=True)
+            process.start()
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.exitcode is None:
+                process.kill()
+                process.join()
+                return None
+            return process.exitcode == 0
+        finally:
+            worker_slots.release()
+
+    class ConversionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status_code, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for header, value in (headers or {}).items():
+                self.send_header(header, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path != '/health':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            with state_lock:
+                payload = dict(state)
+            payload.update({
+                'status': 'ok',
+                'freecad_version': '.'.join(FreeCAD.Version()[:3]),
+                'workers': workers,
+                'max_concurrent': max_concurrent,
+            })
+            self._send_json(200, payload)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/convert':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            length = self.headers.get('Content-Length')
+            if length is None:
+                self._send_json(411, {'error': 'Content-Length required'})
+                self.close_connection = True
+                return
+            if not slots.acquire(blocking=False):
+                # Drain the body so the connection stays usable, then shed load
+                self._discard_body(int(length))
+                self._send_json(503, {'error': 'Converter busy'}, headers={'Retry-After': '5'})
+                return
+            job_dir = tempfile.mkdtemp(prefix='freecad-', dir=work_dir)
+            with state_lock:
+                state['active'] += 1
+            try:
+                self._convert(url, int(length), Path(job_dir))
+            finally:
+                # _convert only returns once the job process has exited
+                shutil.rmtree(job_dir, ignore_errors=True)
+                with state_lock:
+                    state['active'] -= 1
+                slots.release()
+
+        def _discard_body(self, length):
+            while length > 0:
+                chunk = self.rfile.read(min(STREAM_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+
+        def _spool_body(self, length, path):
+            with open(path, 'wb') as spool:
+                remaining = length
+                while remaining > 0:
+                    chunk = self.rfile.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ValueError("Request body ended early")
+                    spool.write(chunk)
+                    remaining -= len(chunk)
+
+        def _convert(self, url, length, job_dir):
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            input_path = job_dir / 'input.step'
+            try:
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('multipart/form-data'):
+                    boundary = content_type.split('boundary=', 1)[-1].strip().strip('"').encode('latin-1')
+                    spool_path = job_dir / 'body'
+                    self._spool_body(length, spool_path)
+                    params.update(_extract_multipart(spool_path, boundary, input_path))
+                    spool_path.unlink()
+                else:
+                    # Raw STEP bytes as the request body
+                    self._spool_body(length, input_path)
+                output_format = params.get('output_format') or params.get('format') or 'stl'
+                quality = float(params['quality']) if params.get('quality') else None
+                triangle_budget = int(params['budget']) if params.get('budget') else None
+                if output_format not in CONVERTERS:
+                    raise ValueError(f"Unsupported output format: {output_format}")
+            except ValueError as e:
+                self.close_connection = True
+                self._send_json(400, {'error': str(e)})
+                return
+
+            output_path = job_dir / f'output.{output_format}'
+            success = run_job((str(input_path), str(output_path), output_format, quality, triangle_budget))
+            if success is None:
+                with state_lock:
+                    state['failed'] += 1
+                self._send_json(504, {'error': f'Conversion timed out after {job_timeout}s'})
+                return
+            if not success or not output_path.exists() or output_path.stat().st_size == 0:
+                with state_lock:
+                    state['failed'] += 1
+                self._send_json(422, {'error': 'Conversion failed, see converter logs'})
+                return
+
+            with state_lock:
+                state['completed'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(output_path.stat().st_size))
+            self.send_header('Content-Disposition', f'attachment; filename="converted.{output_format}"')
+            self.end_headers()
+            with open(output_path, 'rb') as output_file:
+                shutil.copyfileobj(output_file, self.wfile, STREAM_CHUNK_SIZE)
+
+    server = ThreadingHTTPServer((host, port), ConversionHandler)
+    print(f"FreeCAD conversion service listening on {host}:{port} "
+          f"({workers} workers, {max_concurrent} concurrent conversions)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Convert STEP files to STL or OBJ using FreeCAD')
-    parser.add_argument('input', help='Input STEP file path')
-    parser.add_argument('output', help='Output STL or OBJ file path')
+    parser.add_argument('input', nargs='?', help='Input STEP file path')
+    parser.add_argument('output', nargs='?', help='Output STL or OBJ file path')
     parser.add_argument('--format', choices=['stl', 'obj'], default='stl', help='Output format (default: stl)')
-    parser.add_argument('--quality', type=float, default=0.1, help='Mesh quality (0.01-1.0, smaller = higher quality)')
+    parser.add_argument('--quality', type=float, default=None,
+                        help='Fixed mesh deviation (smaller = higher quality; default: derived from each solid\'s size)')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='Target triangle count; the mesh is redone coarser when it overshoots (default: no limit)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Processes for tessellating assembly solids in parallel (default: CPU count)')
+    parser.add_argument('--serve', action='store_true', help='Run as an HTTP conversion service')
+    parser.add_argument('--host', default='0.0.0.0', help='Service bind address (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=8001, help='Service port (default: 8001)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Conversions running at once (default: CPU count)')
+    parser.add_argument('--max-concurrent', type=int, default=None,
+                        help='Conversions accepted at once before answering 503 (default: 2 x workers)')
+    parser.add_argument('--timeout', type=int, default=300, help='Per-conversion timeout in seconds (default: 300)')
+    parser.add_argument('--work-dir', default=None, help='Directory for request spool files (default: system temp)')
     
     args = parser.parse_args()
     
+    if args.serve:
+        run_server(
+            args.host,
+            args.port,
+            args.workers,
+            args.max_concurrent or 2 * args.workers,
+            args.timeout,
+            args.work_dir,
+        )
+        sys.exit(0)
+    
+    if not args.input or not args.output:
+        parser.error('input and output are required unless --serve is given')
+    
     input_path = Path(args.input)
     output_path = Path(args.output)
     
@@ -190,10 +562,8 @@ if __name__ == "__main__":
     
     # Convert based on format
     if args.format == 'stl':
-        success = convert_step_to_stl(input_path, output_path, args.quality)
+        success = convert_step_to_stl(input_path, output_path, args.quality, args.jobs, args.budget)
     else:
-        success = convert_step_to_obj(input_path, output_path, args.quality)
+        success = convert_step_to_obj(input_path, output_path, args.quality, args.jobs, args.budget)
     
     sys.exit(0 if success else 1)
-
-
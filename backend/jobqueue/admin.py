@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['function', 'queue', 'status', 'attempts', 'priority', 'created_at', 'finished_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['function', 'id']
+    readonly_fields = [field.name for field in Job._meta.fields]
@@ -0,0 +1,22 @@
+"""
+Delete finished jobs from the database job queue.
+
+    python manage.py purge_jobs
+    python manage.py purge_jobs --max-age 86400
+"""
+from django.core.management.base import BaseCommand
+
+from jobqueue.queue import purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete completed and failed jobs older than a given age'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Seconds since a job finished after which it is deleted '
+                                 '(default: JOBQUEUE_KEEP_FINISHED)')
+
+    def handle(self, *args, **options):
+        count = purge_finished_jobs(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} finished job(s)"))
@@ -0,0 +1,38 @@
+"""
+Run a worker of the database job queue.
+
+    python manage.py run_job_worker
+    python manage.py run_job_worker --queue conversions --concurrency 2
+    python manage.py run_job_worker --burst --concurrency 0
+
+Start as many workers as needed, on any number of hosts; they share the
+queue through the database. SIGTERM lets running jobs finish before exiting.
+"""
+from django.core.management.base import BaseCommand
+
+from jobqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Process jobs from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', default=[],
+                            help='Queue to take jobs from (repeatable, default: all queues)')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Jobs run at the same time, each in its own process (0 = inline)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for jobs')
+        parser.add_argument('--max-jobs', type=int, default=None,
+                            help='Exit after this many jobs')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            queues=options['queues'],
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+        )
+        processed = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker.worker_id} processed {processed} job(s)"))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:12
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('queue', models.CharField(default='default', max_length=50)),
+                ('function', models.CharField(help_text='Dotted path of a module-level function', max_length=200)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('on_failure', models.CharField(blank=True, help_text='Dotted path of a function(job_id, error_message, *args) run when the job fails for good', max_length=200)),
+                ('priority', models.IntegerField(default=0, help_text='Higher runs first')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_at', models.DateTimeField(help_text='Not claimed before this time (retry backoff)')),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'queue', 'run_at'], name='jobqueue_jo_status_839a7c_idx'), models.Index(fields=['status', 'lease_expires_at'], name='jobqueue_jo_status_2f06f3_idx')],
+            },
+        ),
+    ]
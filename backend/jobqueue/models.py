@@ -0,0 +1,50 @@
+import uuid
+
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    A background job stored in the database (see jobqueue/queue.py).
+
+    Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED and hold
+    a lease on them, renewed by heartbeats while the job runs; a job whose
+    lease expired (its worker died) is claimed again by another worker.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    queue = models.CharField(max_length=50, default='default')
+    function = models.CharField(max_length=200, help_text='Dotted path of a module-level function')
+    args = models.JSONField(default=list, blank=True)
+    on_failure = models.CharField(
+        max_length=200, blank=True,
+        help_text='Dotted path of a function(job_id, error_message, *args) run when the job fails for good'
+    )
+    priority = models.IntegerField(default=0, help_text='Higher runs first')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(help_text='Not claimed before this time (retry backoff)')
+    locked_by = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.function} [{self.status}]"
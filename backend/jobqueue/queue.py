@@ -0,0 +1,268 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in the jobqueue_job table, so background work needs nothing
+but the database the app already uses:
+
+- enqueue() inserts the job when the caller's transaction commits, so a
+  worker never sees a job for rows it cannot read yet, and a rolled back
+  request leaves no job behind;
+- workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL,
+  MySQL 8), so concurrent workers never wait on or take the same row; on
+  SQLite, which has no row locks, the conditional update that marks a job
+  running decides which worker got it;
+- a claimed job carries a lease that its worker renews with heartbeats; a
+  job whose lease ran out (the worker was killed) is claimed again;
+- failed jobs are retried after an exponential backoff with jitter until
+  max_attempts, then their on_failure handler runs.
+
+Run workers with `python manage.py run_job_worker` (see jobqueue/worker.py).
+"""
+import importlib
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+
+
+def _import_function(path):
+    module_name, function_name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _function_path(function):
+    if isinstance(function, str):
+        return function
+    return f"{function.__module__}.{function.__qualname__}"
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'JOBQUEUE_LEASE', 120))
+
+
+def retry_delay(attempt):
+    """
+    Seconds to wait before retrying a job that failed its attempt-th run:
+    exponential in the attempt number, capped, with full jitter so jobs that
+    failed together do not all come back at once.
+    """
+    base = getattr(settings, 'JOBQUEUE_RETRY_BASE_DELAY', 10)
+    cap = getattr(settings, 'JOBQUEUE_RETRY_MAX_DELAY', 600)
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+def enqueue(function, *args, queue=DEFAULT_QUEUE, priority=0, max_attempts=None, on_failure=None,
+            delay=0, job_id=None):
+    """
+    Queue a job, inserted once the current transaction commits.
+
+    Args:
+        function: module-level function or its dotted path
+        *args: JSON-serializable arguments
+        queue: queue name, workers can be limited to some queues
+        priority: higher runs first
+        max_attempts: runs before the job fails for good (default JOBQUEUE_MAX_ATTEMPTS)
+        on_failure: function(job_id, error_message, *args), or its dotted path,
+            run by the worker when the job fails for good
+        delay: seconds before the job may run
+        job_id: identifier to use for the job (a UUID is generated if omitted)
+
+    Returns:
+        The job dict (id, status)
+    """
+    job = Job(
+        id=uuid.UUID(job_id) if job_id else uuid.uuid4(),
+        queue=queue,
+        function=_function_path(function),
+        args=list(args),
+        on_failure=_function_path(on_failure) if on_failure else '',
+        priority=priority,
+        max_attempts=max_attempts or getattr(settings, 'JOBQUEUE_MAX_ATTEMPTS', 3),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+    def insert():
+        job.save(force_insert=True)
+        logger.info(f"Queued job {job.id.hex} ({job.function}) on '{job.queue}'")
+
+    transaction.on_commit(insert)
+    return {'id': job.id.hex, 'status': 'queued'}
+
+
+def claim_jobs(worker_id, queues=None, limit=1):
+    """
+    Claim up to limit runnable jobs for a worker.
+
+    Runnable are queued jobs whose run_at has passed and running jobs whose
+    lease expired with attempts left. Claiming marks them running, counts the
+    attempt and gives them a fresh lease.
+
+    Returns:
+        List of claimed Job instances
+    """
+    now = timezone.now()
+    runnable = Q(status='queued', run_at__lte=now) | Q(
+        status='running', lease_expires_at__lt=now, attempts__lt=F('max_attempts')
+    )
+    claimed = []
+    with transaction.atomic():
+        candidates = Job.objects.select_for_update(skip_locked=True).filter(runnable)
+        if queues:
+            candidates = candidates.filter(queue__in=queues)
+        for job in candidates.order_by('-priority', 'run_at')[:limit]:
+            if job.status == 'running':
+                logger.warning(f"Lease of job {job.id.hex} held by {job.locked_by} expired, reclaiming it")
+            updated = Job.objects.filter(id=job.id, status=job.status, attempts=job.attempts).update(
+                status='running',
+                attempts=F('attempts') + 1,
+                locked_by=worker_id,
+                lease_expires_at=now + lease_duration(),
+                heartbeat_at=now,
+                started_at=now,
+            )
+            if updated:
+                job.status = 'running'
+                job.attempts += 1
+                job.locked_by = worker_id
+                claimed.append(job)
+    return claimed
+
+
+def heartbeat(job_ids, worker_id):
+    """
+    Renew the leases of jobs a worker is running.
+
+    Returns:
+        Number of jobs whose lease was renewed (fewer than given when a lease
+        expired and another worker took the job over)
+    """
+    now = timezone.now()
+    return Job.objects.filter(id__in=job_ids, locked_by=worker_id, status='running').update(
+        lease_expires_at=now + lease_duration(),
+        heartbeat_at=now,
+    )
+
+
+def complete_job(job, worker_id):
+    """Mark a job completed; False when the worker no longer held it"""
+    return bool(Job.objects.filter(id=job.id, locked_by=worker_id, status='running').update(
+        status='completed',
+        finished_at=timezone.now(),
+        lease_expires_at=None,
+        error=None,
+    ))
+
+
+def fail_job(job, worker_id, error_message):
+    """
+    Record a failed run: the job is queued again after a backoff, or fails
+    for good (running its on_failure handler) once it used all its attempts.
+    """
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = retry_delay(job.attempts)
+        updated = Job.objects.filter(id=job.id, locked_by=worker_id, status='running').update(
+            status='queued',
+            run_at=now + timedelta(seconds=delay),
+            locked_by='',
+            lease_expires_at=None,
+            error=error_message,
+        )
+        if updated:
+            logger.warning(
+                f"Job {job.id.hex} failed (attempt {job.attempts}/{job.max_attempts}), "
+                f"retrying in {delay:.0f}s: {error_message}"
+            )
+        return
+    updated = Job.objects.filter(id=job.id, locked_by=worker_id, status='running').update(
+        status='failed',
+        finished_at=now,
+        lease_expires_at=None,
+        error=error_message,
+    )
+    if updated:
+        logger.error(f"Job {job.id.hex} failed after {job.attempts} attempts: {error_message}")
+        run_failure_handler(job, error_message)
+
+
+def run_failure_handler(job, error_message):
+    if not job.on_failure:
+        return
+    try:
+        _import_function(job.on_failure)(job.id.hex, error_message, *job.args)
+    except Exception as e:
+        logger.error(f"Failure handler for job {job.id.hex} raised: {e}", exc_info=True)
+
+
+def fail_expired_jobs():
+    """
+    Fail running jobs whose lease expired after their last attempt (their
+    worker died every time, e.g. killed for running out of memory).
+
+    Returns:
+        Number of jobs failed
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(status='running', lease_expires_at__lt=now, attempts__gte=F('max_attempts'))
+    count = 0
+    for job in expired:
+        error_message = f"Worker {job.locked_by} stopped responding (attempt {job.attempts}/{job.max_attempts})"
+        updated = Job.objects.filter(id=job.id, status='running', lease_expires_at=job.lease_expires_at).update(
+            status='failed',
+            finished_at=now,
+            lease_expires_at=None,
+            error=error_message,
+        )
+        if updated:
+            logger.error(f"Job {job.id.hex} failed: {error_message}")
+            run_failure_handler(job, error_message)
+            count += 1
+    return count
+
+
+def job_status(job_id):
+    """
+    State of a job in the shape of ConversionExecutor.job_status, or None if
+    there is no such job (yet: jobs are inserted when the enqueueing
+    transaction commits).
+    """
+    try:
+        job = Job.objects.filter(id=uuid.UUID(str(job_id))).first()
+    except ValueError:
+        return None
+    if job is None:
+        return None
+    return {
+        'id': job.id.hex,
+        'function': job.function,
+        'status': job.status,
+        'submitted_at': job.created_at.timestamp(),
+        'finished_at': job.finished_at.timestamp() if job.finished_at else None,
+        'error': job.error,
+        'attempts': job.attempts,
+    }
+
+
+def purge_finished_jobs(max_age=None):
+    """
+    Delete completed and failed jobs that finished more than max_age seconds ago.
+
+    Returns:
+        Number of jobs deleted
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'JOBQUEUE_KEEP_FINISHED', 7 * 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    deleted, _ = Job.objects.filter(status__in=['completed', 'failed'], finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,186 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+failures = []
+
+
+def noop(*args):
+    pass
+
+
+def record_failure(job_id, error_message, *args):
+    failures.append((job_id, error_message, *args))
+
+
+def expire_lease(job):
+    Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+
+@override_settings(JOBQUEUE_LEASE=120, JOBQUEUE_MAX_ATTEMPTS=3)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        failures.clear()
+
+    def enqueue(self, *args, **kwargs):
+        kwargs.setdefault('on_failure', record_failure)
+        with self.captureOnCommitCallbacks(execute=True):
+            job = queue.enqueue(noop, *args, **kwargs)
+        return Job.objects.get(id=job['id'])
+
+    def test_enqueue_inserts_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = queue.enqueue(noop, 7, queue='conversions')
+            self.assertFalse(Job.objects.exists())
+            self.assertIsNone(queue.job_status(job['id']))
+        for callback in callbacks:
+            callback()
+
+        stored = Job.objects.get(id=job['id'])
+        self.assertEqual(stored.function, 'jobqueue.tests.noop')
+        self.assertEqual(stored.args, [7])
+        self.assertEqual(stored.queue, 'conversions')
+        self.assertEqual(stored.max_attempts, 3)
+        self.assertEqual(queue.job_status(job['id'])['status'], 'queued')
+
+    def test_enqueue_rolled_back(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    queue.enqueue(noop)
+                    raise ValueError()
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        first, second = self.enqueue(1), self.enqueue(2, priority=5)
+
+        claimed = queue.claim_jobs('worker-a')
+        self.assertEqual([job.id for job in claimed], [second.id])
+        self.assertEqual([job.id for job in queue.claim_jobs('worker-b', limit=5)], [first.id])
+        self.assertEqual(queue.claim_jobs('worker-c', limit=5), [])
+
+        job = Job.objects.get(id=second.id)
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'worker-a', 1))
+
+    def test_claim_filters_queues_and_run_at(self):
+        self.enqueue(queue='conversions')
+        delayed = self.enqueue(delay=60)
+
+        self.assertEqual(queue.claim_jobs('worker-a', queues=['default']), [])
+        Job.objects.filter(id=delayed.id).update(run_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([job.id for job in queue.claim_jobs('worker-a', queues=['default'])], [delayed.id])
+
+    def test_claim_of_a_job_taken_meanwhile_is_skipped(self):
+        job = self.enqueue()
+        # The job as worker-b selected it, before worker-a claimed it
+        stale = Job.objects.get(id=job.id)
+        queue.claim_jobs('worker-a')
+        candidates = mock.MagicMock()
+        candidates.filter.return_value.order_by.return_value.__getitem__.return_value = [stale]
+        with mock.patch.object(Job.objects, 'select_for_update', return_value=candidates):
+            self.assertEqual(queue.claim_jobs('worker-b'), [])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('worker-a', 1))
+
+    def test_expired_lease_is_reclaimed(self):
+        job = self.enqueue()
+        queue.claim_jobs('worker-a')
+        self.assertEqual(queue.claim_jobs('worker-b'), [])
+
+        expire_lease(job)
+        claimed = queue.claim_jobs('worker-b')
+        self.assertEqual([claimed_job.id for claimed_job in claimed], [job.id])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('worker-b', 2))
+        self.assertGreater(job.lease_expires_at, timezone.now())
+
+        # The first worker lost the job
+        self.assertEqual(queue.heartbeat([job.id], 'worker-a'), 0)
+        self.assertFalse(queue.complete_job(job, 'worker-a'))
+        self.assertTrue(queue.complete_job(job, 'worker-b'))
+        self.assertEqual(Job.objects.get(id=job.id).status, 'completed')
+
+    def test_heartbeat_renews_lease(self):
+        job = self.enqueue()
+        queue.claim_jobs('worker-a')
+        expire_lease(job)
+
+        self.assertEqual(queue.heartbeat([job.id], 'worker-a'), 1)
+        job.refresh_from_db()
+        self.assertGreater(job.lease_expires_at, timezone.now() + timedelta(seconds=100))
+        self.assertEqual(queue.claim_jobs('worker-b'), [])
+
+    @override_settings(JOBQUEUE_RETRY_BASE_DELAY=10, JOBQUEUE_RETRY_MAX_DELAY=15)
+    def test_fail_job_backs_off_then_runs_on_failure(self):
+        job = self.enqueue('model.step')
+        delays = []
+        # The longest delay the jitter allows
+        with mock.patch('jobqueue.queue.random.uniform', side_effect=lambda low, high: high):
+            for attempt in (1, 2):
+                claimed, = queue.claim_jobs('worker-a')
+                self.assertEqual(claimed.attempts, attempt)
+                before = timezone.now()
+                queue.fail_job(claimed, 'worker-a', f'error {attempt}')
+
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.locked_by, job.error), ('queued', '', f'error {attempt}'))
+                delays.append(round((job.run_at - before).total_seconds()))
+                self.assertEqual(queue.claim_jobs('worker-a'), [])
+                Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        # 10s, then 20s capped at 15s
+        self.assertEqual(delays, [10, 15])
+        self.assertEqual(failures, [])
+
+        claimed, = queue.claim_jobs('worker-a')
+        queue.fail_job(claimed, 'worker-a', 'error 3')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('failed', 3, 'error 3'))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(failures, [(job.id.hex, 'error 3', 'model.step')])
+        self.assertEqual(queue.claim_jobs('worker-a'), [])
+
+    def test_fail_job_of_a_lost_job_does_nothing(self):
+        job = self.enqueue(max_attempts=1)
+        claimed, = queue.claim_jobs('worker-a')
+        Job.objects.filter(id=job.id).update(locked_by='worker-b')
+
+        queue.fail_job(claimed, 'worker-a', 'error')
+        self.assertEqual(Job.objects.get(id=job.id).status, 'running')
+        self.assertEqual(failures, [])
+
+    def test_failure_handler_errors_are_contained(self):
+        job = self.enqueue(max_attempts=1, on_failure='jobqueue.tests.missing_handler')
+        claimed, = queue.claim_jobs('worker-a')
+
+        with self.assertLogs('jobqueue.queue', 'ERROR') as logs:
+            queue.fail_job(claimed, 'worker-a', 'error')
+        self.assertIn('Failure handler', logs.output[-1])
+        self.assertEqual(Job.objects.get(id=job.id).status, 'failed')
+
+    def test_fail_expired_jobs(self):
+        last_attempt = self.enqueue('a', max_attempts=1)
+        retryable = self.enqueue('b', max_attempts=2)
+        alive = self.enqueue('c', max_attempts=1)
+        queue.claim_jobs('worker-a', limit=3)
+        expire_lease(last_attempt)
+        expire_lease(retryable)
+
+        self.assertEqual(queue.fail_expired_jobs(), 1)
+        last_attempt.refresh_from_db()
+        self.assertEqual(last_attempt.status, 'failed')
+        self.assertEqual(last_attempt.error, 'Worker worker-a stopped responding (attempt 1/1)')
+        self.assertEqual(failures, [(last_attempt.id.hex, last_attempt.error, 'a')])
+        # With attempts left the job is reclaimed instead; a live lease is left alone
+        self.assertEqual(Job.objects.get(id=retryable.id).status, 'running')
+        self.assertEqual(Job.objects.get(id=alive.id).status, 'running')
+        self.assertEqual([job.id for job in queue.claim_jobs('worker-b', limit=3)], [retryable.id])
+        self.assertEqual(queue.fail_expired_jobs(), 0)
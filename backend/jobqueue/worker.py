@@ -0,0 +1,148 @@
+"""
+Worker loop of the database job queue.
+
+A Worker claims jobs (see jobqueue/queue.py) and runs them on a
+ConversionExecutor, so each job gets a separate process with the CAD
+conversion time and memory limits, and a crashing job cannot take the
+worker down. While jobs run, the worker renews their leases; SIGTERM or
+SIGINT stops it from claiming new jobs and it exits once the running ones
+finished.
+
+With concurrency 0 jobs run inline in the worker process, one at a time and
+without heartbeats (a job must finish within JOBQUEUE_LEASE); meant for
+tests and development.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from cad_processing.executor import ConversionExecutor
+from .queue import claim_jobs, complete_job, fail_expired_jobs, fail_job, heartbeat
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Args:
+        queues: queue names to take jobs from (all queues when empty)
+        concurrency: jobs run at the same time, each in its own process (0 = inline)
+        poll_interval: seconds to sleep when there is nothing to do
+        worker_id: name recorded on claimed jobs (default host:pid)
+        executor: ConversionExecutor to run jobs on (built from the CAD settings if omitted)
+    """
+
+    def __init__(self, queues=None, concurrency=1, poll_interval=1.0, worker_id=None, executor=None):
+        self.queues = list(queues or [])
+        self.slots = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = executor or ConversionExecutor(
+            max_workers=concurrency,
+            max_jobs_per_worker=getattr(settings, 'CAD_CONVERSION_EXECUTOR_MAX_JOBS_PER_WORKER', 20),
+            max_pending=0,
+            time_limit=getattr(settings, 'CAD_CONVERSION_TIME_LIMIT', 600),
+            memory_limit=getattr(settings, 'CAD_CONVERSION_MEMORY_LIMIT', None),
+        )
+        self.running = {}  # executor job id -> Job
+        self.errors = {}
+        self.stopping = False
+        self.processed = 0
+        self._last_heartbeat = time.monotonic()
+
+    def _record_error(self, job_id, error_message, *args):
+        self.errors[job_id] = error_message
+
+    def _handle_signal(self, signum, frame):
+        if not self.stopping:
+            logger.info(f"Worker {self.worker_id} stopping after {len(self.running)} running job(s)")
+        self.stopping = True
+
+    def _start(self, job):
+        logger.info(f"Worker {self.worker_id} running job {job.id.hex} ({job.function}, attempt {job.attempts})")
+        self.running[job.id.hex] = job
+        try:
+            self.executor.submit(job.function, *job.args, job_id=job.id.hex, on_failure=self._record_error)
+        except Exception as e:
+            # Could not even be dispatched (bad function path, broken pool)
+            self.errors[job.id.hex] = str(e)
+
+    def _collect(self):
+        """Record the outcome of finished jobs; returns how many finished"""
+        finished = 0
+        for job_id, job in list(self.running.items()):
+            state = self.executor.job_status(job_id)
+            if job_id not in self.errors and state is not None and state['status'] != 'completed':
+                continue
+            del self.running[job_id]
+            error_message = self.errors.pop(job_id, None)
+            if error_message is None:
+                if not complete_job(job, self.worker_id):
+                    logger.warning(f"Job {job_id} finished after its lease was taken over")
+            else:
+                fail_job(job, self.worker_id, error_message)
+            self.processed += 1
+            finished += 1
+        return finished
+
+    def _heartbeat(self):
+        interval = getattr(settings, 'JOBQUEUE_LEASE', 120) / 3
+        if not self.running or time.monotonic() - self._last_heartbeat < interval:
+            return
+        renewed = heartbeat(list(self.running), self.worker_id)
+        if renewed < len(self.running):
+            logger.warning(f"Worker {self.worker_id} lost the lease of {len(self.running) - renewed} job(s)")
+        self._last_heartbeat = time.monotonic()
+
+    def run_once(self):
+        """
+        Claim jobs for the free slots, start them and collect finished ones.
+
+        Returns:
+            Number of jobs claimed plus jobs finished (0 when idle)
+        """
+        close_old_connections()
+        fail_expired_jobs()
+        claimed = []
+        free = self.slots - len(self.running)
+        if free > 0 and not self.stopping:
+            claimed = claim_jobs(self.worker_id, self.queues, free)
+            for job in claimed:
+                self._start(job)
+        finished = self._collect()
+        self._heartbeat()
+        return len(claimed) + finished
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Work until stopped by a signal.
+
+        Args:
+            burst: exit once the queues are empty and no job is running
+            max_jobs: exit after this many jobs finished
+        """
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        logger.info(
+            f"Worker {self.worker_id} started (queues: {', '.join(self.queues) or 'all'}, slots: {self.slots})"
+        )
+        try:
+            while True:
+                activity = self.run_once()
+                if max_jobs is not None and self.processed >= max_jobs:
+                    self.stopping = True
+                if self.stopping and not self.running:
+                    break
+                if burst and not activity and not self.running:
+                    break
+                if not activity:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.executor.shutdown(wait=False)
+        logger.info(f"Worker {self.worker_id} stopped after {self.processed} job(s)")
+        return self.processed
@@ -0,0 +1,157 @@
+"""
+Read-only serialization of a project's assembly from .values() rows.
+
+ProjectSerializer serializes every assembly item through
+AssemblyItemSerializer and its nested ComponentSerializer, and each item
+with a parent queries the parent chain for world_transform. project_data()
+produces the same output from one query: the items joined with their
+components and connection points as .values() rows, with world transforms
+computed from the rows already read.
+
+The output must stay identical to ProjectSerializer's (see the
+benchmark_serializers command).
+"""
+from components.fast_serializers import ComponentRowSerializer, iso_datetime
+
+from .models import AssemblyItem
+
+ITEM_COLUMNS = [
+    'id', 'custom_name',
+    'position_x', 'position_y', 'position_z',
+    'rotation_x', 'rotation_y', 'rotation_z', 'rotation_w',
+    'scale_x', 'scale_y', 'scale_z',
+    'parent_id', 'connected_to_id', 'connection_point_id', 'attached_at_point', 'metadata', 'order',
+]
+
+CONNECTION_POINT_COLUMNS = [
+    'connection_point__name', 'connection_point__connection_type',
+    'connection_point__position_x', 'connection_point__position_y', 'connection_point__position_z',
+    'connection_point__normal_x', 'connection_point__normal_y', 'connection_point__normal_z',
+    'connection_point__diameter', 'connection_point__compatible_types', 'connection_point__side_label',
+    'connection_point__metadata',
+]
+
+
+def _connection_point(row):
+    """ConnectionPointSerializer output for the item's connection point"""
+    if row['connection_point_id'] is None:
+        return None
+    return {
+        'id': row['connection_point_id'],
+        'name': row['connection_point__name'],
+        'connection_type': row['connection_point__connection_type'],
+        'position': [
+            row['connection_point__position_x'], row['connection_point__position_y'],
+            row['connection_point__position_z'],
+        ],
+        'normal': [
+            row['connection_point__normal_x'], row['connection_point__normal_y'],
+            row['connection_point__normal_z'],
+        ],
+        'diameter': row['connection_point__diameter'],
+        'compatible_types': row['connection_point__compatible_types'],
+        'side_label': row['connection_point__side_label'],
+        'metadata': row['connection_point__metadata'],
+    }
+
+
+class AssemblyItemRowSerializer:
+    """AssemblyItemSerializer output for the assembly items of a queryset"""
+
+    def __init__(self, request=None):
+        self.components = ComponentRowSerializer(request, prefix='component__')
+
+    def values(self, queryset):
+        return self.components.values(queryset, *ITEM_COLUMNS, *CONNECTION_POINT_COLUMNS)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        positions = self._world_positions(rows)
+        component = self.components.to_representation
+        data = []
+        for row in rows:
+            position = [row['position_x'], row['position_y'], row['position_z']]
+            rotation = [row['rotation_x'], row['rotation_y'], row['rotation_z'], row['rotation_w']]
+            scale = [row['scale_x'], row['scale_y'], row['scale_z']]
+            data.append({
+                'id': row['id'],
+                'component': component(row),
+                'custom_name': row['custom_name'],
+                'position_x': row['position_x'],
+                'position_y': row['position_y'],
+                'position_z': row['position_z'],
+                'rotation_x': row['rotation_x'],
+                'rotation_y': row['rotation_y'],
+                'rotation_z': row['rotation_z'],
+                'rotation_w': row['rotation_w'],
+                'scale_x': row['scale_x'],
+                'scale_y': row['scale_y'],
+                'scale_z': row['scale_z'],
+                'position': position,
+                'rotation': rotation,
+                'scale': scale,
+                'connected_to': row['connected_to_id'],
+                'connection_point': row['connection_point_id'],
+                'connection_point_details': _connection_point(row),
+                'attached_at_point': row['attached_at_point'],
+                'metadata': row['metadata'],
+                'order': row['order'],
+                'world_transform': {
+                    'position': positions[row['id']],
+                    'rotation': list(rotation),
+                    'scale': list(scale),
+                },
+            })
+        return data
+
+    def _world_positions(self, rows):
+        """
+        {item id: world position} as AssemblyItem.get_world_transform computes
+        it; parents outside the rows are read in one query per level.
+        """
+        items = {row['id']: row for row in rows}
+        missing = {row['parent_id'] for row in rows if row['parent_id'] is not None} - items.keys()
+        while missing:
+            parents = list(AssemblyItem.objects.filter(id__in=missing).values(
+                'id', 'parent_id', 'position_x', 'position_y', 'position_z'
+            ))
+            items.update((parent['id'], parent) for parent in parents)
+            missing = {parent['parent_id'] for parent in parents if parent['parent_id'] is not None} - items.keys()
+
+        positions = {}
+
+        def world_position(item_id):
+            if item_id not in positions:
+                row = items[item_id]
+                position = [row['position_x'], row['position_y'], row['position_z']]
+                if row['parent_id'] is not None:
+                    parent = world_position(row['parent_id'])
+                    position = [parent[0] + position[0], parent[1] + position[1], parent[2] + position[2]]
+                positions[item_id] = position
+            return positions[item_id]
+
+        for row in rows:
+            world_position(row['id'])
+        return positions
+
+
+def project_data(project, request=None):
+    """ProjectSerializer output for a project, its assembly read with AssemblyItemRowSerializer"""
+    items = AssemblyItemRowSerializer(request)
+    data = {
+        'id': project.id,
+        'name': project.name,
+        'description': project.description,
+        'owner': project.owner_id,
+    }
+    # Left out without an owner, as ProjectSerializer does
+    if project.owner_id is not None:
+        data['owner_username'] = project.owner.username
+    data.update({
+        'created_at': iso_datetime(project.created_at),
+        'updated_at': iso_datetime(project.updated_at),
+        'metadata': project.metadata,
+        'is_public': project.is_public,
+        'assembly_items': items.serialize(items.values(AssemblyItem.objects.filter(project=project))),
+    })
+    return data
@@ -14,7 +14,9 @@ from .serializers import (
     ProjectSerializer, ProjectListSerializer,
     AssemblyItemSerializer, AssemblyItemCreateSerializer
 )
+from .fast_serializers import project_data
 from components.models import Component, ConnectionPoint
+from components.renderers import FastJSONRenderer
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -23,11 +25,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]  # Allow unauthenticated access for development
     authentication_classes = [SessionAuthentication]  # Enable session authentication
     pagination_class = None  # Disable pagination for projects list
+    renderer_classes = [FastJSONRenderer]
     
     def get_queryset(self):
         # Filter projects by owner if authenticated, otherwise return empty queryset
         if self.request.user.is_authenticated:
-            queryset = Project.objects.filter(owner=self.request.user).prefetch_related('assembly_items__component')
+            queryset = Project.objects.filter(owner=self.request.user)
         else:
             # Return empty queryset for unauthenticated users (or public projects if needed)
             queryset = Project.objects.none()
@@ -35,12 +38,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
         # Allow filtering by public projects
         if self.request.query_params.get('include_public') == 'true':
             if self.request.user.is_authenticated:
-                queryset = Project.objects.filter(Q(owner=self.request.user) | Q(is_public=True)).prefetch_related('assembly_items__component')
+                queryset = Project.objects.filter(Q(owner=self.request.user) | Q(is_public=True))
             else:
-                queryset = Project.objects.filter(is_public=True).prefetch_related('assembly_items__component')
+                queryset = Project.objects.filter(is_public=True)
         
+        queryset = queryset.select_related('owner')
+        # retrieve reads the assembly itself (see retrieve)
+        if self.action != 'retrieve':
+            queryset = queryset.prefetch_related('assembly_items__component')
         return queryset
     
+    def retrieve(self, request, *args, **kwargs):
+        """The project with its assembly, serialized from .values() rows (see projects/fast_serializers.py)"""
+        return Response(project_data(self.get_object(), request))
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return ProjectListSerializer